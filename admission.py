@@ -0,0 +1,86 @@
+# admission.py
+import time
+from collections import OrderedDict, namedtuple
+
+Decision = namedtuple("Decision", "admitted reason retry_after notify")  # reason: None, "user", "global" or "shed"
+
+class TokenBucket:
+    """``capacity`` tokens, refilled continuously at ``rate`` per second."""
+    __slots__ = ("capacity", "rate", "tokens", "updated", "warned")
+
+    def __init__(self, capacity, rate, now):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+        self.warned = False
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, cost):
+        """Seconds until ``cost`` tokens are available (after a refill)."""
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+class AdmissionControl:
+    """Per-user and global token buckets in front of the command handlers.
+
+    A command costs ``costs.get(name, default_cost)`` tokens from both the
+    user's bucket and the shared one, and is only charged when both can pay.
+    While ``saturated()`` reports the persistence path is behind, commands
+    costing more than ``default_cost`` (the writes) are shed outright. A
+    user is told to slow down once per streak of rejections, so the
+    replies can't become a flood of their own. User buckets are kept for
+    the ``max_users`` most recent users; an evicted one comes back full,
+    which it would nearly be by then anyway.
+    """
+
+    def __init__(self, user_capacity, user_rate, global_capacity, global_rate, costs=None, default_cost=1,
+                 saturated=None, max_users=10000, clock=time.monotonic):
+        self.user_capacity = user_capacity
+        self.user_rate = user_rate
+        self.costs = costs or {}
+        self.default_cost = default_cost
+        self.saturated = saturated or (lambda: False)
+        self.max_users = max_users
+        self.clock = clock
+        self.shared = TokenBucket(global_capacity, global_rate, clock())
+        self._users = OrderedDict()  # user id -> TokenBucket, least recently used first
+        self.stats = {"admitted": 0, "rejected_user": 0, "rejected_global": 0, "shed": 0}
+
+    def cost(self, command):
+        return self.costs.get(command, self.default_cost)
+
+    def admit(self, user_id, command):
+        now = self.clock()
+        cost = self.cost(command)
+        bucket = self._bucket(user_id, now)
+        if cost > self.default_cost and self.saturated():
+            return self._reject(bucket, "shed", 0.0)
+        bucket.refill(now)
+        if bucket.tokens < cost:
+            return self._reject(bucket, "user", bucket.wait(cost))
+        self.shared.refill(now)
+        if self.shared.tokens < cost:
+            return self._reject(bucket, "global", self.shared.wait(cost))
+        bucket.tokens -= cost
+        self.shared.tokens -= cost
+        bucket.warned = False
+        self.stats["admitted"] += 1
+        return Decision(True, None, 0.0, False)
+
+    def _bucket(self, user_id, now):
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = self._users[user_id] = TokenBucket(self.user_capacity, self.user_rate, now)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return bucket
+
+    def _reject(self, bucket, reason, retry_after):
+        self.stats["shed" if reason == "shed" else f"rejected_{reason}"] += 1
+        notify, bucket.warned = not bucket.warned, True
+        return Decision(False, reason, retry_after, notify)
@@ -0,0 +1,228 @@
+# archive.py
+import gzip, json, os, threading, time, zlib
+from concurrent.futures import Future
+
+class HistoryArchive:
+    """Cold storage for settled bets that fell out of a user's in-memory history.
+
+    Entries are appended as gzip members to numbered segment files, so a
+    segment is only ever appended to and never rewritten. ``index.json``
+    maps each user id to the segments holding their entries, with the entry
+    count and placed_at range per segment; only the index is read at
+    startup, and a page read decompresses just the segments it needs.
+
+    Writes happen on one background thread: ``submit`` queues a batch and
+    returns a Future that completes once its member is fsynced. The index
+    is saved at most every ``index_interval`` seconds (and on ``close``),
+    with the committed size of the open segment; members written after the
+    last save are recovered from the segment itself at startup, and a
+    partially written one is cut off. Readers only ever see spans and bytes
+    of members that were completely written.
+    """
+
+    def __init__(self, directory, segment_entries=20000, default=None, decode=None, index_interval=5.0):
+        self.directory = directory
+        self.segment_entries = segment_entries
+        self.default = default  # json.dumps hook for bet records
+        self.decode = decode or (lambda bet: bet)
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        self._index_file = os.path.join(directory, "index.json")
+        try:
+            with open(self._index_file, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        self.segment = data.get("segment", 1)
+        self.segment_count = data.get("segment_count", 0)
+        self.segment_bytes = data.get("segment_bytes")  # committed size of the open segment
+        # user_id -> [[segment, count, first_placed_at, last_placed_at], ...] in segment order
+        self.users = data.get("users", {})
+
+        self._lock = threading.Lock()  # guards the index fields above
+        self._cond = threading.Condition()
+        self._queue = []  # [(batch, future)]
+        self._stopping = False
+        self._thread = None
+        self._index_dirty = False
+        self._recover()
+
+    # --- Writing ---
+    def submit(self, batch):
+        """Queue ``{user_id: [bet, ...]}`` (oldest first) to be archived as one gzip member.
+
+        The bets must no longer change; the returned Future resolves once
+        they are durable in the segment.
+        """
+        future = Future()
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("History archive is closed")
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="history-archive", daemon=True)
+                self._thread.start()
+            self._queue.append((batch, future))
+            self._cond.notify()
+        return future
+
+    def close(self, timeout=30):
+        """Write everything still queued, save the index and stop the writer."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._index_dirty:
+            self._save_index()
+
+    def _run(self):
+        saved = time.monotonic()
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    # Save the index once writes go quiet, but no more often than index_interval
+                    wait = None if not self._index_dirty else saved + self.index_interval - time.monotonic()
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                pending, self._queue = self._queue, []
+                if not pending and self._stopping:
+                    return
+            for batch, future in pending:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(None)
+            if self._index_dirty and time.monotonic() - saved >= self.index_interval:
+                try:
+                    self._save_index()
+                except OSError as e:
+                    print(f"⚠️ Could not save the history archive index: {e}")
+                saved = time.monotonic()
+
+    def _write(self, batch):
+        if self.segment_count >= self.segment_entries:
+            with self._lock:
+                self.segment += 1
+                self.segment_count = 0
+                self.segment_bytes = 0
+            # Saved right away, so recovery only ever has to look at the open segment
+            self._save_index()
+        lines = []
+        for uid, bets in batch.items():
+            lines += [json.dumps({"user_id": uid, "bet": bet}, separators=(",", ":"), default=self.default) for bet in bets]
+        if not lines:
+            return
+        member = gzip.compress(("\n".join(lines) + "\n").encode())
+        path = self._segment_path(self.segment)
+        with open(path, "ab") as f:
+            if f.tell() != self.segment_bytes:
+                f.truncate(self.segment_bytes)  # drop the tail of a write that failed part way
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self._add_spans(self.segment, {uid: bets for uid, bets in batch.items() if bets})
+            self.segment_count += len(lines)
+            self.segment_bytes += len(member)
+            self._index_dirty = True
+
+    def _add_spans(self, segment, batch):
+        for uid, bets in batch.items():
+            placed = [bet.get("placed_at") or 0 for bet in bets]
+            spans = self.users.setdefault(uid, [])
+            if spans and spans[-1][0] == segment:
+                spans[-1][1] += len(bets)
+                spans[-1][2] = min(spans[-1][2], *placed)
+                spans[-1][3] = max(spans[-1][3], *placed)
+            else:
+                spans.append([segment, len(bets), min(placed), max(placed)])
+
+    def _recover(self):
+        """Index the members written to the open segment after the last index save."""
+        path = self._segment_path(self.segment)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            self.segment_bytes = 0
+            return
+        if self.segment_bytes is None or size <= self.segment_bytes:
+            # Indexes from before segment_bytes was saved were rewritten after every member
+            self.segment_bytes = size
+            return
+        with open(path, "rb") as f:
+            f.seek(self.segment_bytes)
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            inflate = zlib.decompressobj(wbits=31)
+            try:
+                text = inflate.decompress(data[offset:])
+            except zlib.error:
+                break
+            if not inflate.eof:
+                break
+            batch = {}
+            for line in text.decode().splitlines():
+                entry = json.loads(line)
+                batch.setdefault(entry["user_id"], []).append(entry["bet"])
+            self._add_spans(self.segment, batch)
+            self.segment_count += sum(len(bets) for bets in batch.values())
+            offset = len(data) - len(inflate.unused_data)
+        if offset < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(self.segment_bytes + offset)
+        self.segment_bytes += offset
+        self._index_dirty = offset > 0
+        if self._index_dirty:
+            self._save_index()
+
+    # --- Reading ---
+    def count(self, user_id):
+        with self._lock:
+            return sum(span[1] for span in self.users.get(user_id, []))
+
+    def read(self, user_id, offset=0, limit=10):
+        """Archived bets for a user, newest first, skipping ``offset`` of them."""
+        spans, segment, committed = self._snapshot(user_id)
+        found = []
+        for seg, count, _, _ in reversed(spans):
+            if offset >= count:
+                offset -= count
+                continue
+            entries = self._read_segment(seg, user_id, committed if seg == segment else None)
+            newest_first = entries[::-1][offset:]
+            offset = 0
+            found += newest_first[:limit - len(found)]
+            if len(found) >= limit:
+                break
+        return found
+
+    def _snapshot(self, user_id):
+        """``(spans, open segment, its committed size)`` as of now, so a read never sees a half-written member."""
+        with self._lock:
+            return [list(span) for span in self.users.get(user_id, [])], self.segment, self.segment_bytes
+
+    def _read_segment(self, segment, user_id, size=None):
+        with open(self._segment_path(segment), "rb") as f:
+            data = f.read() if size is None else f.read(size)
+        lines = gzip.decompress(data).decode().splitlines()
+        return [self.decode(entry["bet"]) for entry in map(json.loads, lines) if entry["user_id"] == user_id]
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment_{segment:06d}.jsonl.gz")
+
+    def _save_index(self):
+        with self._lock:
+            data = json.dumps({"segment": self.segment, "segment_count": self.segment_count,
+                               "segment_bytes": self.segment_bytes, "users": self.users})
+            self._index_dirty = False
+        tmp = f"{self._index_file}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._index_file)
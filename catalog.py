@@ -0,0 +1,83 @@
+# catalog.py
+import json, os
+
+STATUSES = ("open", "locked", "settled")
+
+def matchup_status(matchup):
+    if matchup["settled"]:
+        return "settled"
+    return "locked" if matchup["locked"] else "open"
+
+class MatchupCatalog:
+    """Matchups bucketed by status, then by type (spread, overunder, prop, ...).
+
+    ``update`` re-files a matchup after its status or type changes, so
+    listing open matchups walks only the open bucket however many settled
+    ones have piled up. Settled matchups past their retention window are
+    moved out to an append-only JSON-lines archive by ``evict``.
+    """
+
+    def __init__(self, archive_file, default=None):
+        self.archive_file = archive_file
+        self.default = default  # json.dumps hook for matchup records
+        self._buckets = {status: {} for status in STATUSES}  # status -> type -> {matchup_id: matchup}
+        self._where = {}  # matchup_id -> (status, type)
+
+    def __len__(self):
+        return len(self._where)
+
+    def add(self, matchup):
+        key = (matchup_status(matchup), matchup["type"])
+        self._buckets[key[0]].setdefault(key[1], {})[matchup["id"]] = matchup
+        self._where[matchup["id"]] = key
+
+    def remove(self, matchup_id):
+        key = self._where.pop(matchup_id, None)
+        if key:
+            del self._buckets[key[0]][key[1]][matchup_id]
+
+    def update(self, matchup):
+        key = self._where.get(matchup["id"])
+        if key != (matchup_status(matchup), matchup["type"]):
+            self.remove(matchup["id"])
+            self.add(matchup)
+
+    def listing(self, status, kind=None):
+        """Matchups with a status, optionally of one type, in the order they were filed."""
+        by_type = self._buckets[status]
+        if kind is not None:
+            return list(by_type.get(kind, {}).values())
+        return [m for matchups in by_type.values() for m in matchups.values()]
+
+    def open(self, kind=None):
+        return self.listing("open", kind)
+
+    def open_for(self, guild_id, kind=None):
+        """Open matchups of one guild's partition (``guild_id`` None for the home guild)."""
+        return [m for m in self.listing("open", kind) if m.get("guild_id") == guild_id]
+
+    def count(self, status):
+        return sum(len(matchups) for matchups in self._buckets[status].values())
+
+    def rebuild(self, matchups):
+        self._buckets = {status: {} for status in STATUSES}
+        self._where = {}
+        for matchup in matchups.values():
+            self.add(matchup)
+
+    def evict(self, cutoff):
+        """Archive and drop settled matchups settled before ``cutoff`` (epoch seconds); returns them.
+
+        Matchups without a ``settled_at`` are kept; the loader stamps legacy ones.
+        """
+        expired = [m for m in self.listing("settled") if m.get("settled_at") is not None and m["settled_at"] < cutoff]
+        if not expired:
+            return []
+        with open(self.archive_file, "a") as f:
+            for matchup in expired:
+                f.write(json.dumps(matchup, separators=(",", ":"), default=self.default) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for matchup in expired:
+            self.remove(matchup["id"])
+        return expired
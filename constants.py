@@ -6,11 +6,20 @@ ADMIN_COMMANDS = {
     "editmatchup": "Edit a matchup field.",
     "removematchup": "Remove a matchup.",
     "settlematchup": "Settle a matchup and pay winners.",
+    "previewsettle": "Preview the payout liability of a result before settling.",
+    "liabilitycurve": "Show a numeric prop's total payout across a range of results.",
     "addmoney": "Add coins to a user.",
     "removemoney": "Remove coins from a user.",
     "lockmatchup": "Lock betting on a matchup.",
     "addprop": "Adds a prop bet.",
-    "editprop": "Edits a prop bet."
+    "importslate": "Create every matchup/prop in an attached CSV or JSON slate at once.",
+    "importresults": "Settle (or lock, with an empty result) every matchup in an attached results file.",
+    "editprop": "Edits a prop bet.",
+    "volumecheck": "Verify betting volume totals against stored bets.",
+    "reprice": "Reprice open matchups (optionally switch odds engine: legacy/pool).",
+    "perf": "Show command latency, persistence and sync metrics.",
+    "shards": "Show every shard process's state (sharded mode).",
+    "globallock": "Lock open matchups on every shard, optionally matching a title."
 }
 
 # User Commands
@@ -19,11 +28,45 @@ USER_COMMANDS = {
     "balance": "Check your balance (or another user's).",
     "history": "View your betting history (or another user's).",
     "leaderboard": "View the leaderboard.",
+    "globalleaderboard": "View the leaderboard across every shard.",
     "bet": "Place a bet on a matchup.",
     "pending": "View pending bets.",
     "parlay": "Create a parlay bet.",
     "volume": "Show betting volume for a matchup.",
-    "weekly": "Check weekly challenge progress.",
+    "weekly": "Check weekly challenge progress and achievements.",
     "props": "View all active props.",
     "betprop": "Bet on an active prop."
 }
+
+# Achievements and weekly challenges, each filed under the event that can satisfy it:
+# "bet_placed", "bet_settled" or "daily_claimed". Optional conditions: kind, min_amount,
+# won, min_payout, min_balance, min_stats ({stat: minimum}). "reward" is paid once, when
+# the achievement unlocks or the challenge's goal is reached. A challenge counts 1 per
+# matching event, or the stake with "measure": "amount"; progress resets every Monday (UTC).
+ACHIEVEMENTS = [
+    {"name": "First Bet", "event": "bet_placed", "description": "Place your first bet."},
+    {"name": "Parlay Player", "event": "bet_placed", "kind": "parlay", "description": "Place a parlay."},
+    {"name": "High Roller", "event": "bet_placed", "min_amount": 1000, "reward": 100, "description": "Stake 1,000 or more on one bet."},
+    {"name": "First Win", "event": "bet_settled", "won": True, "description": "Win a bet."},
+    {"name": "Parlay Hit", "event": "bet_settled", "kind": "parlay", "won": True, "reward": 250, "description": "Win a parlay."},
+    {"name": "Big Payday", "event": "bet_settled", "min_payout": 5000, "reward": 250, "description": "Win 5,000 or more on one bet."},
+    {"name": "Sharp", "event": "bet_settled", "min_stats": {"bets_won": 25}, "reward": 500, "description": "Win 25 bets."},
+    {"name": "Regular", "event": "daily_claimed", "description": "Claim your daily bonus."},
+]
+
+WEEKLY_CHALLENGES = [
+    {"id": "bets", "event": "bet_placed", "goal": 5, "reward": 150, "description": "Place 5 bets"},
+    {"id": "wagered", "event": "bet_placed", "measure": "amount", "goal": 2500, "reward": 200, "description": "Wager 2,500"},
+    {"id": "wins", "event": "bet_settled", "won": True, "goal": 3, "reward": 200, "description": "Win 3 bets"},
+    {"id": "dailies", "event": "daily_claimed", "goal": 5, "reward": 100, "description": "Claim your daily 5 times"},
+]
+
+# Admission cost of a command in tokens (see ADMISSION_* in main.py); unlisted commands cost 1.
+# Writes cost more than reads, so spamming them drains a user's bucket faster and they are
+# the ones shed while persistence is behind. Admins are never throttled.
+COMMAND_COSTS = {
+    "bet": 3,
+    "betprop": 3,
+    "parlay": 3,
+    "daily": 2,
+}
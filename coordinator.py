@@ -0,0 +1,196 @@
+# coordinator.py
+"""Local coordinator for a sharded deployment.
+
+Launches one bot process per Discord shard and links them over a Unix
+socket. Guilds map to shards by Discord's ``(guild_id >> 22) % shard_count``
+rule, so each worker owns its guilds' users and matchups outright and
+persists them under its own ``DATA_DIR`` (``shards/shard-<n>``); the
+coordinator only answers questions that span shards (global leaderboards)
+and fans admin operations out to every worker.
+
+    python coordinator.py --shards 4                    # run 4 shard processes
+    python coordinator.py --shards 4 --stub             # no gateway: load state and serve the link only
+    python coordinator.py --call global_top category=balance
+    python coordinator.py --call broadcast method=stats
+
+Keep ``--shards`` fixed once a deployment has data: changing it moves
+guilds to shards that don't hold their state. State from a single-process
+deployment (``users.json``, ``matchups.json`` and the files beside them
+in the working directory) is moved into the shard of ``HOME_GUILD_ID`` on
+the first sharded start, which refuses to run without it.
+"""
+import argparse, asyncio, heapq, json, os, signal, subprocess, sys
+
+import shardlink
+
+SOCKET_PATH = os.getenv("COORDINATOR_SOCKET", "/tmp/sportsbook-coordinator.sock")
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+# What a single-process deployment keeps in its working directory (see the paths in main.py)
+ROOT_STATE = ("users.json", "matchups.json", "ledger.jsonl", os.getenv("SQLITE_FILE", "sportsbook.db"),
+              "history", "matchups_archive.jsonl")
+
+class Coordinator:
+    """Tracks connected shard workers and answers cross-shard requests."""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.workers = {}  # shard id -> Peer
+        self.server = None
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        self.server = await asyncio.start_unix_server(self._accept, self.path)
+        return self.server
+
+    async def _accept(self, reader, writer):
+        shard = None
+
+        def hello(shard_id):
+            nonlocal shard
+            shard = shard_id
+            self.workers[shard] = peer
+            print(f"🔗 Shard {shard} connected ({len(self.workers)} online)")
+            return True
+
+        peer = shardlink.Peer(reader, writer, {
+            "hello": hello,
+            "global_top": self.global_top,
+            "broadcast": self.broadcast,
+        })
+        try:
+            await peer.start()
+        finally:
+            if shard is not None and self.workers.get(shard) is peer:
+                del self.workers[shard]
+                print(f"🔌 Shard {shard} disconnected ({len(self.workers)} online)")
+            writer.close()
+
+    async def fan_out(self, method, params=None):
+        """``{shard: result}`` from every connected worker; failures become ``{"error": ...}``."""
+        shards = sorted(self.workers)
+        results = await asyncio.gather(*(self.workers[s].request(method, params) for s in shards),
+                                       return_exceptions=True)
+        return {s: {"error": str(r)} if isinstance(r, Exception) else r for s, r in zip(shards, results)}
+
+    async def global_top(self, category, k=10):
+        """Merge every shard's top-k into one ranking of ``[shard, account key, value, name, guild name]``."""
+        rows = []
+        for shard, top in (await self.fan_out("top", {"category": category, "k": k})).items():
+            if isinstance(top, dict):
+                continue  # shard failed to answer; rank the others
+            rows.extend([shard, *row] for row in top)
+        return heapq.nlargest(k, rows, key=lambda row: row[2])
+
+    async def broadcast(self, method, params=None):
+        return await self.fan_out(method, params)
+
+# =============================
+# Launcher
+# =============================
+def shard_dir(shard):
+    return os.path.join("shards", f"shard-{shard}")
+
+def shard_of(guild_id, shard_count):
+    """Discord's guild -> shard rule."""
+    return (guild_id >> 22) % shard_count
+
+def migrate_root_state(shard_count, home_guild_id):
+    """Move single-process state into the shard that owns the home guild; returns the moved names.
+
+    Raises SystemExit if there is root state but no home guild to give it to,
+    or if that shard already has state of its own.
+    """
+    present = [name for name in ROOT_STATE if os.path.exists(name)]
+    if not present:
+        return []
+    if not home_guild_id:
+        raise SystemExit(f"❌ Found single-process state ({', '.join(present)}) but HOME_GUILD_ID is not set; "
+                         "set it to the guild that state belongs to before starting shards")
+    target = shard_dir(shard_of(home_guild_id, shard_count))
+    clashes = [name for name in present if os.path.exists(os.path.join(target, name))]
+    if clashes:
+        raise SystemExit(f"❌ Both the working directory and {target} hold {', '.join(clashes)}; "
+                         "move one of them aside before starting shards")
+    os.makedirs(target, exist_ok=True)
+    for name in present:
+        os.replace(name, os.path.join(target, name))
+    print(f"📦 Moved {', '.join(present)} into {target}, the shard of home guild {home_guild_id}")
+    return present
+
+def worker_env(shard, shard_count, port, stub):
+    env = dict(os.environ,
+               SHARD_COUNT=str(shard_count),
+               SHARD_IDS=str(shard),
+               DATA_DIR=shard_dir(shard),
+               COORDINATOR_SOCKET=SOCKET_PATH,
+               PORT=str(port + shard))
+    if stub:
+        env["GATEWAY_STUB"] = "1"
+    return env
+
+async def run(shard_count, port, stub):
+    coordinator = Coordinator()
+    server = await coordinator.serve()
+    procs = [subprocess.Popen([sys.executable, MAIN_SCRIPT], env=worker_env(shard, shard_count, port, stub))
+             for shard in range(shard_count)]
+    print(f"🚀 Coordinator on {SOCKET_PATH} with {shard_count} shard process(es)")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    try:
+        while not stopping.is_set() and all(p.poll() is None for p in procs):
+            try:
+                await asyncio.wait_for(stopping.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.send_signal(signal.SIGINT)  # workers compact and flush GitHub sync on the way out
+        # Waited off the loop so the links see their workers hang up
+        await asyncio.gather(*(asyncio.to_thread(p.wait) for p in procs))
+        server.close()
+        if os.path.exists(SOCKET_PATH):
+            os.unlink(SOCKET_PATH)
+
+async def call(method, params):
+    """Send one request to a running coordinator and print the answer."""
+    peer = await shardlink.connect(SOCKET_PATH, {})
+    try:
+        print(json.dumps(await peer.request(method, params), indent=2))
+    finally:
+        peer.close()
+
+def parse_params(pairs):
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+def cli():
+    parser = argparse.ArgumentParser(description="Run the sportsbook as several shard processes.")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")), help="health port of shard 0; shard n uses port + n")
+    parser.add_argument("--stub", action="store_true", help="don't connect to Discord; workers load state and serve the link only")
+    parser.add_argument("--call", nargs="+", metavar=("METHOD", "KEY=VALUE"), help="query a running coordinator instead")
+    args = parser.parse_args()
+    if args.call:
+        method, *pairs = args.call
+        params = parse_params(pairs)
+        if method == "broadcast":
+            # Everything but the broadcast method name is passed through to the workers
+            params = {"method": params.pop("method"), "params": params}
+        asyncio.run(call(method, params))
+    else:
+        migrate_root_state(args.shards, int(os.getenv("HOME_GUILD_ID", "0")))
+        asyncio.run(run(args.shards, args.port, args.stub))
+
+if __name__ == "__main__":
+    cli()
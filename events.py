@@ -0,0 +1,23 @@
+# events.py
+
+class EventBus:
+    """Synchronous publish/subscribe keyed by event name.
+
+    ``publish`` runs every handler subscribed to the event, in subscription
+    order, on the caller's stack (so under whatever locks it holds), and
+    returns the concatenation of what the handlers return.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, event, handler):
+        self._handlers.setdefault(event, []).append(handler)
+
+    def publish(self, event, **payload):
+        results = []
+        for handler in self._handlers.get(event, ()):
+            result = handler(**payload)
+            if result:
+                results.extend(result)
+        return results
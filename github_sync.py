@@ -0,0 +1,257 @@
+# github_sync.py
+import hashlib, json, threading, time
+import requests
+
+GITHUB_API_URL = "https://api.github.com"
+REJECTED_STATUSES = (401, 403, 404)  # bad token, no access or no such repo: retrying right away won't help
+
+class GitHubSync:
+    """Mirror local JSON files to a GitHub repo from a background thread.
+
+    Commands only mark a file dirty; the worker wakes up, waits out the
+    coalescing interval so a burst of saves becomes a single push, then
+    commits the latest contents of every dirty file together through the
+    Git Data API (tree + commit + ref update). The branch head, its tree and
+    each file's blob SHA are cached, so a steady-state push costs three
+    calls no matter how many files changed, and unchanged files cost none.
+
+    When GitHub rejects the push outright (401/403/404) the worker backs off,
+    doubling the wait up to ``max_backoff``; the files stay dirty meanwhile.
+    """
+
+    def __init__(self, repo, token, branch="main", interval=5.0, api_url=GITHUB_API_URL, max_backoff=600.0):
+        self.repo = repo
+        self.branch = branch
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.api_url = api_url.rstrip("/")
+        self.enabled = bool(repo and token)
+
+        # One pooled session for every request the worker makes
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+        })
+
+        # Last known remote state; refreshed only on a 409/422 conflict
+        self._head_sha = None
+        self._tree_sha = None
+        self._blob_shas = {}
+
+        # Totals for the metrics endpoint; only the worker (or a final flush) writes them
+        self.stats = {"pushes": 0, "push_failures": 0, "api_calls": 0, "bytes_pushed": 0,
+                      "serialize_seconds": 0.0, "network_seconds": 0.0,
+                      "ratelimit_remaining": None, "ratelimit_limit": None, "ratelimit_reset": None}
+
+        self._dirty = set()
+        self._dirty_since = None  # when the oldest change still waiting in _dirty was marked
+        self._inflight_since = None  # when the push running right now took its files
+        self._failures = 0  # pushes failed in a row
+        self._backoff_until = None  # no pushes from the worker before this, after GitHub rejected one
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    # --- Public API ---
+    def start(self):
+        """Start the worker thread (no-op if already running or disabled)."""
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="github-sync", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, filename):
+        """Schedule a file for the next push. Never blocks on the network."""
+        if not self.enabled:
+            return
+        with self._cond:
+            if not self._dirty:
+                self._dirty_since = time.monotonic()
+            self._dirty.add(filename)
+            self._cond.notify()
+
+    def queue_depth(self):
+        """Number of files waiting to be pushed."""
+        with self._cond:
+            return len(self._dirty)
+
+    def lag(self, now=None):
+        """Seconds the oldest change not yet on GitHub has been waiting (0 when caught up).
+
+        Counts both files still queued and a push that is running, so a
+        stalled request shows up here even once the queue is empty.
+        """
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            since = [t for t in (self._dirty_since, self._inflight_since) if t is not None]
+        return now - min(since) if since else 0.0
+
+    def failing(self):
+        """True while the most recent push failed."""
+        return self._failures > 0
+
+    def behind(self, max_lag, now=None):
+        """True while pushes are going through but the mirror is more than ``max_lag`` seconds behind.
+
+        A failing mirror doesn't count: its lag only grows until GitHub comes
+        back, and the saves are safe on disk in the meantime.
+        """
+        return not self.failing() and self.lag(now) > max_lag
+
+    def ratelimit_low(self, reserve, now=None):
+        """True while fewer than ``reserve`` API calls remain, until the window resets."""
+        remaining, reset = self.stats["ratelimit_remaining"], self.stats["ratelimit_reset"]
+        if remaining is None or remaining >= reserve:
+            return False
+        return reset is None or (time.time() if now is None else now) < reset
+
+    def flush(self):
+        """Push every dirty file right now on the calling thread, in one commit."""
+        with self._cond:
+            pending, self._dirty = self._dirty, set()
+            if not pending:
+                return
+            self._inflight_since, self._dirty_since = self._dirty_since, None
+        pushed = self.push_files(sorted(pending))
+        with self._cond:
+            if not pushed:
+                self._dirty |= pending
+                self._dirty_since = min(t for t in (self._dirty_since, self._inflight_since) if t is not None)
+            self._inflight_since = None
+
+    def stop(self, timeout=30):
+        """Stop the worker and push whatever is still dirty."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.enabled:
+            self.flush()
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                # Let further saves pile up on the same files before pushing, and wait out any backoff
+                deadline = max(time.monotonic() + self.interval, self._backoff_until or 0)
+                while not self._stopping and (remaining := deadline - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def push_files(self, filenames, retries=2):
+        """Commit the given files to the branch atomically. Returns True on success."""
+        started = time.perf_counter()
+        contents = {}
+        for filename in filenames:
+            try:
+                with open(filename, "r") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                print(f"❌ {filename} missing locally, skipping GitHub push")
+                continue
+            # Skip files whose contents already match what we last pushed
+            if git_blob_sha(content) != self._blob_shas.get(filename):
+                contents[filename] = content
+        self.stats["serialize_seconds"] += time.perf_counter() - started
+        if not contents:
+            return True
+
+        names = ", ".join(contents)
+        for _ in range(retries + 1):
+            try:
+                if not self._head_sha:
+                    self._fetch_head()
+
+                tree = self._api("POST", "git/trees", {
+                    "base_tree": self._tree_sha,
+                    "tree": [{"path": name, "mode": "100644", "type": "blob", "content": content}
+                             for name, content in contents.items()]
+                })
+                commit = self._api("POST", "git/commits", {
+                    "message": f"Update {names}",
+                    "tree": tree["sha"],
+                    "parents": [self._head_sha]
+                })
+                self._api("PATCH", f"git/refs/heads/{self.branch}", {"sha": commit["sha"]})
+            except GitHubConflict:
+                # Someone else moved the branch; re-fetch and rebuild on the new head
+                self._head_sha = self._tree_sha = None
+                self._blob_shas.clear()
+                continue
+            except (requests.RequestException, GitHubError) as e:
+                self._head_sha = self._tree_sha = None
+                self._failed(getattr(e, "status", None))
+                print(f"❌ Failed to push {names} to GitHub: {e}")
+                return False
+
+            self._head_sha, self._tree_sha = commit["sha"], tree["sha"]
+            for name, content in contents.items():
+                self._blob_shas[name] = git_blob_sha(content)
+            self.stats["pushes"] += 1
+            self._failures, self._backoff_until = 0, None
+            self.stats["bytes_pushed"] += sum(len(content) for content in contents.values())
+            print(f"✅ {names} saved to GitHub")
+            return True
+
+        self._failed()
+        print(f"❌ Failed to push {names} to GitHub: branch kept moving")
+        return False
+
+    def _failed(self, status=None):
+        self.stats["push_failures"] += 1
+        self._failures += 1
+        if status in REJECTED_STATUSES:
+            delay = min(self.max_backoff, self.interval * 2 ** (self._failures - 1))
+            self._backoff_until = time.monotonic() + delay
+            print(f"⚠️ GitHub answered {status}, holding pushes for {delay:g}s")
+
+    # --- HTTP helpers ---
+    def _fetch_head(self):
+        ref = self._api("GET", f"git/ref/heads/{self.branch}")
+        self._head_sha = ref["object"]["sha"]
+        commit = self._api("GET", f"git/commits/{self._head_sha}")
+        self._tree_sha = commit["tree"]["sha"]
+
+    def _api(self, method, path, payload=None):
+        url = f"{self.api_url}/repos/{self.repo}/{path}"
+        started = time.perf_counter()
+        data = json.dumps(payload) if payload is not None else None
+        sent = time.perf_counter()
+        try:
+            r = self.session.request(method, url, data=data, timeout=15)
+        finally:
+            self.stats["serialize_seconds"] += sent - started
+            self.stats["network_seconds"] += time.perf_counter() - sent
+            self.stats["api_calls"] += 1
+        if "X-RateLimit-Remaining" in r.headers:
+            self.stats["ratelimit_remaining"] = int(r.headers["X-RateLimit-Remaining"])
+            self.stats["ratelimit_limit"] = int(r.headers.get("X-RateLimit-Limit", 0))
+            if "X-RateLimit-Reset" in r.headers:
+                self.stats["ratelimit_reset"] = int(r.headers["X-RateLimit-Reset"])  # epoch seconds
+        if r.status_code in (409, 422):
+            raise GitHubConflict(r.text, r.status_code)
+        if r.status_code not in (200, 201):
+            raise GitHubError(f"{method} {path} -> {r.status_code}: {r.text}", r.status_code)
+        return r.json()
+
+class GitHubError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class GitHubConflict(GitHubError):
+    pass
+
+def git_blob_sha(content):
+    """SHA-1 git assigns to a blob with this content."""
+    data = content.encode()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
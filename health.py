@@ -0,0 +1,34 @@
+# health.py
+import threading
+from flask import Flask, Response, jsonify
+
+def create_app(status, metrics=None):
+    """The bot's one HTTP server: "/" for uptime pings, "/health" for readiness probes.
+
+    ``status()`` returns the health payload; "/health" answers 503 until it
+    reports ``ready``. ``metrics()``, if given, is served at "/metrics" in
+    the Prometheus text format.
+    """
+    app = Flask("sportsbook")
+
+    @app.route("/")
+    def home():
+        return "Bot is alive!"
+
+    @app.route("/health")
+    def health():
+        payload = status()
+        return jsonify(payload), 200 if payload["ready"] else 503
+
+    if metrics:
+        @app.route("/metrics")
+        def prometheus():
+            return Response(metrics(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+def serve(app, host="0.0.0.0", port=8080):
+    """Run the app on a daemon thread so it never holds the process open."""
+    thread = threading.Thread(target=app.run, kwargs={"host": host, "port": port}, name="health", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,87 @@
+# ids.py
+import threading, time
+
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"  # Crockford base32, lowercase; sorts in ASCII order
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+TIME_CHARS, WORKER_CHARS, SEQUENCE_CHARS = 9, 2, 2  # 45 bits of ms, 10 bits of worker, 10 bits of sequence
+CODE_LENGTH = TIME_CHARS + WORKER_CHARS + SEQUENCE_CHARS
+MAX_WORKER = MAX_SEQUENCE = 32 ** 2 - 1
+_DECODE = {c: i for i, c in enumerate(ALPHABET)}
+_PAIRS = [ALPHABET[i >> 5] + ALPHABET[i & 31] for i in range(32 ** 2)]
+
+def encode(value, width):
+    chars = []
+    for _ in range(width):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def decode(code):
+    value = 0
+    for c in code:
+        value = value * 32 + _DECODE[c]
+    return value
+
+class IdGenerator:
+    """Snowflake-style ids: ``<prefix>_<time><worker><sequence>`` in fixed-width base32.
+
+    The code is 13 characters: milliseconds since 2024 (good for a thousand
+    years), the worker (the shard, so processes never collide) and a
+    per-millisecond sequence. Ids from one generator strictly increase, and
+    sort (as strings, within a prefix) in creation order. If the clock steps
+    back, or a millisecond's 1024 sequence numbers run out, the generator
+    keeps counting from the last millisecond it issued rather than reuse one.
+    ``observe`` moves that point past ids already in the data, so a restart
+    onto a clock that is behind can't reissue them either.
+    """
+
+    def __init__(self, worker=0, clock=time.time_ns):
+        if not 0 <= worker <= MAX_WORKER:
+            raise ValueError(f"worker must be between 0 and {MAX_WORKER}")
+        self.worker = _PAIRS[worker]
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._ms = -1
+        self._time = ""
+        self._sequence = 0
+
+    def next(self, prefix):
+        with self._lock:
+            ms = self.clock() // 1_000_000 - EPOCH_MS
+            if ms > self._ms:
+                self._ms, self._sequence = ms, 0
+                self._time = encode(ms, TIME_CHARS)
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._ms, self._sequence = self._ms + 1, 0
+                self._time = encode(self._ms, TIME_CHARS)
+            return f"{prefix}_{self._time}{self.worker}{_PAIRS[self._sequence]}"
+
+    def observe(self, ids):
+        """Never issue an id at or before the newest of these (legacy ids are ignored)."""
+        # Codes are fixed-width and sort like their values, so the newest is just the largest string
+        code = max((i[-CODE_LENGTH:] for i in ids if len(i) > CODE_LENGTH and i[-CODE_LENGTH - 1] == "_"), default="")
+        newest = code_ms(code)
+        with self._lock:
+            if newest is not None and newest >= self._ms:
+                self._ms, self._sequence = newest, MAX_SEQUENCE  # the next id moves on to newest + 1
+                self._time = encode(newest, TIME_CHARS)
+
+def code_ms(id_):
+    """Milliseconds since EPOCH_MS encoded in a generated id, or None for legacy ``b_123456`` ids."""
+    code = id_.rpartition("_")[2]
+    if len(code) != CODE_LENGTH or not all(c in _DECODE for c in code):
+        return None
+    return decode(code[:TIME_CHARS])
+
+def id_time(id_):
+    """Creation time (epoch seconds) of a generated id, or None for a legacy one."""
+    ms = code_ms(id_)
+    return None if ms is None else (ms + EPOCH_MS) / 1000
+
+def id_bounds(prefix, start, end):
+    """``(low, high)`` such that generated ids created in ``[start, end]`` (epoch seconds) satisfy ``low <= id <= high``."""
+    to_ms = lambda t: max(0, int(t * 1000) - EPOCH_MS)
+    return (f"{prefix}_{encode(to_ms(start), TIME_CHARS)}{'0' * (WORKER_CHARS + SEQUENCE_CHARS)}",
+            f"{prefix}_{encode(to_ms(end), TIME_CHARS)}{'z' * (WORKER_CHARS + SEQUENCE_CHARS)}")
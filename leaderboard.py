@@ -0,0 +1,86 @@
+# leaderboard.py
+import heapq, itertools
+from bisect import bisect_left, insort
+from collections import Counter
+
+CATEGORIES = ("balance", "spent", "won", "lost", "bets_won", "bets_lost")
+
+def stat_value(user, category):
+    if category == "balance":
+        return user.get("balance", 0)
+    return user.get("stats", {}).get(category, 0)
+
+class Leaderboard:
+    """Per-category rankings kept sorted as balances and stats change.
+
+    Users are ranked within their group (``group(user_id)``, e.g. the
+    guild an account belongs to). Each (group, category) is a list of
+    ``(-value, user_id)`` kept in order with bisect, so a top-k read is a
+    slice, "my rank" is one bisect, and an update is a remove + insert.
+    """
+
+    def __init__(self, categories=CATEGORIES, top=10, group=lambda user_id: None):
+        self.categories = categories
+        self.top_size = top
+        self.group = group
+        self._values = {}  # user_id -> tuple of values in category order
+        self._ranked = {}  # (group, category) -> [(-value, user_id)]
+        self._sizes = Counter()  # group -> users ranked in it
+
+    def __len__(self):
+        return len(self._values)
+
+    def size(self, group=None):
+        return self._sizes[group]
+
+    def update(self, user_id, user):
+        """Re-rank a user after a change (``user=None`` removes them)."""
+        old = self._values.get(user_id)
+        new = tuple(stat_value(user, c) for c in self.categories) if user is not None else None
+        if old == new:
+            return
+        group = self.group(user_id)
+        for i, category in enumerate(self.categories):
+            if old and new and old[i] == new[i]:
+                continue
+            ranked = self._ranked.setdefault((group, category), [])
+            if old:
+                del ranked[bisect_left(ranked, (-old[i], user_id))]
+            if new:
+                insort(ranked, (-new[i], user_id))
+        if new is None:
+            del self._values[user_id]
+            self._sizes[group] -= 1
+        else:
+            if old is None:
+                self._sizes[group] += 1
+            self._values[user_id] = new
+
+    def top(self, category, k=None, group=None):
+        """``[(user_id, value), ...]`` for the k highest users of a group in a category."""
+        return [(uid, -neg) for neg, uid in self._ranked.get((group, category), [])[:k or self.top_size]]
+
+    def top_all(self, category, k=None):
+        """Like ``top``, but over every group at once."""
+        k = k or self.top_size
+        heads = [ranked[:k] for (_, c), ranked in self._ranked.items() if c == category]
+        return [(uid, -neg) for neg, uid in itertools.islice(heapq.merge(*heads), k)]
+
+    def rank(self, category, user_id):
+        """1-based position of a user within their group in a category, or None if unknown."""
+        values = self._values.get(user_id)
+        if values is None:
+            return None
+        i = self.categories.index(category)
+        return bisect_left(self._ranked[(self.group(user_id), category)], (-values[i], user_id)) + 1
+
+    def rebuild(self, users):
+        self._values = {uid: tuple(stat_value(u, c) for c in self.categories) for uid, u in users.items()}
+        self._sizes = Counter(self.group(uid) for uid in self._values)
+        self._ranked = {}
+        for uid, values in self._values.items():
+            group = self.group(uid)
+            for i, category in enumerate(self.categories):
+                self._ranked.setdefault((group, category), []).append((-values[i], uid))
+        for ranked in self._ranked.values():
+            ranked.sort()
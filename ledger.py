@@ -0,0 +1,138 @@
+# ledger.py
+import json, os, time
+
+class Ledger:
+    """Append-only write-ahead log of state changes.
+
+    Each line records one operation (bet placed, bet settled, daily claim,
+    admin adjust, ...) as the absolute new value of every path it touched,
+    e.g. ``["users", uid, "balance"]`` -> 450. Because values are absolute,
+    replaying a line that is already reflected in the snapshot is harmless,
+    so a crash between writing a snapshot and truncating the log can never
+    double-apply anything. Writes are flushed per line and fsynced in
+    batches; ``sync()`` forces the batch out. ``mark()``/``drop()`` trim only
+    the records a snapshot covers when more arrived while it was written.
+    """
+
+    def __init__(self, path, fsync_every=20, fsync_interval=1.0, default=None, stats=None):
+        self.path = path
+        self.stats = stats  # optional I/O totals (see storage.io_stats)
+        self.default = default  # json.dumps hook for values that aren't plain JSON
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0  # lines since the last truncate
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._file = None
+
+    # --- Public API ---
+    def append(self, op, changes):
+        """Write one record. ``changes`` is a list of ``(path, value)`` or ``(path,)`` for a delete."""
+        started = time.perf_counter()
+        record = {"op": op, "at": time.time(), "changes": [list(c) for c in changes]}
+        line = json.dumps(record, separators=(",", ":"), default=self.default) + "\n"
+        serialized = time.perf_counter()
+        f = self._open()
+        f.write(line)
+        f.flush()
+        if self.stats is not None:
+            self.stats["serialize_seconds"] += serialized - started
+            self.stats["write_seconds"] += time.perf_counter() - serialized
+            self.stats["bytes_written"] += len(line)
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """fsync everything written so far."""
+        if self._file and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def replay(self, state):
+        """Apply every complete record in the log to ``state``. Returns the number applied."""
+        applied = good = 0
+        try:
+            with open(self.path, "rb+") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append; cut it off so new lines follow good ones
+                        print(f"⚠️ Dropping partial record at the end of {self.path}")
+                        f.truncate(good)
+                        break
+                    for change in record["changes"]:
+                        apply_change(state, *change)
+                    applied += 1
+                    good += len(line)
+        except FileNotFoundError:
+            pass
+        self.count = applied
+        return applied
+
+    def truncate(self):
+        """Start an empty log once a snapshot covering it is safely on disk."""
+        self.drop(self.mark())
+
+    def mark(self):
+        """The current end of the log, for ``drop`` once a snapshot taken from here on is on disk."""
+        if self._file:
+            self._file.flush()
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        return self.count, size
+
+    def drop(self, mark):
+        """Remove the records written before ``mark``, keeping any appended since."""
+        count, size = mark
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(size)
+                tail = f.read()
+        except FileNotFoundError:
+            tail = b""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.count -= count
+
+    def close(self):
+        if self._file:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if not self._file:
+            self._file = open(self.path, "a")
+        return self._file
+
+_DELETE = object()
+
+def apply_change(state, path, value=_DELETE):
+    """Set (or delete, when no value is given) ``path`` inside nested dicts/lists."""
+    *parents, key = path
+    node = state
+    for p in parents:
+        if isinstance(node, list):
+            node = node[p]
+        else:
+            node = node.setdefault(p, {})
+    if value is _DELETE:
+        if isinstance(node, dict):
+            node.pop(key, None)
+        elif key < len(node):
+            del node[key]
+    elif isinstance(node, list) and key >= len(node):
+        node.append(value)
+    else:
+        node[key] = value
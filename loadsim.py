@@ -0,0 +1,365 @@
+# loadsim.py
+"""Deterministic load simulation for the betting core.
+
+Builds a seeded synthetic population (users, matchups, pending bets and
+parlays), installs it into ``main`` behind a persistence stub that does the
+JSON encoding the real engines do but never touches disk, then drives the
+command coroutines with fake contexts and reports throughput and p50/p99
+latency per operation.
+
+    python loadsim.py                                   # default population
+    python loadsim.py --users 100000 --matchups 5000 --bets 2000000
+    python loadsim.py --save-baseline baseline.json     # record a baseline
+    python loadsim.py --baseline baseline.json          # exit 1 on a slowdown
+    python loadsim.py --ops 0 --imports 5 --import-rows 1000   # bulk import benchmark
+
+Runs need the bot's requirements installed (``main`` imports discord.py)
+but no token, network or data files.
+"""
+import argparse, asyncio, json, os, random, sys, tempfile, time
+
+import main
+from archive import HistoryArchive
+from models import User, Stats, Bet, ParlayLeg, Matchup, encode
+from storage import io_stats
+
+OPERATIONS = ("bet", "betprop", "parlay", "leaderboard", "settle", "save", "importslate", "importresults")
+
+# =============================
+# Persistence stub
+# =============================
+class NullStorage:
+    """Stands in for JsonStorage: pays the JSON encoding cost of every change and snapshot, writes nothing."""
+
+    def __init__(self):
+        self.pending = 0
+        self.stats = io_stats()
+
+    def record(self, op, changes, state):
+        started = time.perf_counter()
+        line = json.dumps({"op": op, "changes": [list(c) for c in changes]}, separators=(",", ":"), default=encode)
+        self.stats["serialize_seconds"] += time.perf_counter() - started
+        self.stats["bytes_written"] += len(line)
+        self.pending += 1
+
+    def compact(self, users, matchups):
+        self.write_snapshots(users, matchups)
+        self.pending = 0
+
+    def begin_compaction(self):
+        return self.pending
+
+    def write_snapshots(self, users, matchups):
+        started = time.perf_counter()
+        size = len(json.dumps(users, default=encode)) + len(json.dumps(matchups, default=encode))
+        self.stats["serialize_seconds"] += time.perf_counter() - started
+        self.stats["bytes_written"] += size
+
+    def end_compaction(self, pending):
+        self.pending -= pending
+
+    def close(self):
+        pass
+
+# =============================
+# Fake Discord objects
+# =============================
+class FakePermissions:
+    def __init__(self, administrator):
+        self.administrator = administrator
+
+class FakeMember:
+    def __init__(self, user_id, administrator=False):
+        self.id = int(user_id)
+        self.display_name = f"user{user_id[-6:]}"
+        self.guild_permissions = FakePermissions(administrator)
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+class FakeGuild:
+    id = 1
+    name = "Load Test"
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_member(self, user_id):
+        return FakeMember(str(user_id))
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+    async def query_members(self, user_ids=(), limit=None, cache=False):
+        return [FakeMember(str(uid)) for uid in user_ids]
+
+class FakeAttachment:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.data = data
+
+    async def read(self):
+        return self.data
+
+class FakeMessage:
+    def __init__(self, attachments=()):
+        self.attachments = list(attachments)
+
+class FakeContext:
+    def __init__(self, guild, author, attachments=()):
+        self.guild = guild
+        self.channel = guild.channel
+        self.author = author
+        self.message = FakeMessage(attachments)
+
+    async def send(self, content=None, **kwargs):
+        self.channel.sent += 1
+
+# =============================
+# Population
+# =============================
+def build_population(rng, users, matchups, bets, parlay_share=0.02):
+    """Seeded users and matchups with ``bets`` pending bets spread across them."""
+    start_time = int(time.time()) + 30 * 24 * 3600
+    user_ids = [str(10**17 + i) for i in range(users)]
+    population = {uid: User(
+        balance=rng.randint(10_000, 1_000_000),
+        bets={},
+        history=[],
+        stats=Stats(spent=rng.randint(0, 50_000), won=rng.randint(0, 50_000), lost=rng.randint(0, 50_000),
+                    bets_won=rng.randint(0, 500), bets_lost=rng.randint(0, 500)),
+        achievements=[],
+        last_claim=None,
+        weekly={"week_start": None, "progress": {}, "claimed": []}
+    ) for uid in user_ids}
+
+    board = {}
+    for i in range(matchups):
+        mid = f"m_{i}"
+        roll = rng.random()
+        if roll < 0.8:
+            board[mid] = Matchup(id=mid, type="spread", title=f"Team {2 * i} vs Team {2 * i + 1}", home=f"T{2 * i}",
+                                 away=f"T{2 * i + 1}", spread=0.0, overunder=0.0, bets={}, locked=False, settled=False,
+                                 result=None, start_time=start_time)
+        else:
+            board[mid] = Matchup(id=mid, type="prop", prop_type="numeric" if roll < 0.9 else "choice",
+                                 title=f"Prop {i}", bets={}, locked=False, settled=False, result=None)
+    spreads = [m for m in board.values() if m["type"] == "spread"]
+    props = [m for m in board.values() if m["type"] == "prop"]
+
+    placed_at = int(time.time())
+    for n in range(bets):
+        uid = rng.choice(user_ids)
+        bid = f"b_{n}"
+        if spreads and rng.random() < parlay_share:
+            legs = [ParlayLeg(matchup_id=m["id"], selection=rng.choice((m["home"], m["away"])).upper(), odds=1.9)
+                    for m in rng.sample(spreads, min(len(spreads), rng.randint(2, 4)))]
+            bet = Bet(id=bid, user_id=uid, matchup_id=None, kind="parlay", selection=legs, amount=rng.randint(5, 200),
+                      odds=None, placed_at=placed_at, resolved=False, payout=None)
+        else:
+            matchup = rng.choice(spreads if not props or rng.random() < 0.8 else props)
+            if matchup["type"] == "spread":
+                selection, odds, prop_type = rng.choice((matchup["home"], matchup["away"])).upper(), 1.9, None
+            elif matchup["prop_type"] == "numeric":
+                selection, odds, prop_type = float(rng.randint(0, 60)), 1.0, "numeric"
+            else:
+                selection, odds, prop_type = rng.choice(("yes", "no")), 1.0, "choice"
+            bet = Bet(id=bid, user_id=uid, matchup_id=matchup["id"], kind=matchup["type"], prop_type=prop_type,
+                      selection=selection, amount=rng.randint(5, 500), odds=odds, placed_at=placed_at,
+                      resolved=False, payout=None)
+            matchup["bets"][bid] = bet
+        population[uid]["bets"][bid] = bet
+    return population, board
+
+def install(population, board, workdir):
+    """Point ``main`` at the synthetic state and the persistence stub, then build its indexes."""
+    main.USERS, main.MATCHUPS = population, board
+    main.HOME_GUILD_ID = FakeGuild.id  # the only guild, as resolve_home_guild would pick
+    main.storage = NullStorage()
+    main.archive = HistoryArchive(os.path.join(workdir, "history"), default=encode, decode=Bet.from_json)
+    main.catalog.archive_file = os.path.join(workdir, "matchups_archive.jsonl")
+    main.ANNOUNCE_INTERVAL_SECONDS = 0
+    main.build_indexes()
+    main.STARTUP["ready"] = True
+
+# =============================
+# Operations
+# =============================
+class Simulation:
+    def __init__(self, rng, guild, import_rows=1000, slate_size=20):
+        self.rng = rng
+        self.guild = guild
+        self.user_ids = list(main.USERS)
+        self.admin = FakeContext(guild, FakeMember(self.user_ids[0], administrator=True))
+        self.import_rows = import_rows
+        self.slate_size = slate_size
+        self.imports = 0
+
+    def ctx(self):
+        return FakeContext(self.guild, FakeMember(self.rng.choice(self.user_ids)))
+
+    def open_spreads(self):
+        return main.catalog.open("spread")
+
+    async def bet(self):
+        matchup = self.rng.choice(self.open_spreads())
+        await main.bet(self.ctx(), matchup["id"], self.rng.choice((matchup["home"], matchup["away"])), self.rng.randint(5, 500))
+
+    async def betprop(self):
+        props = main.catalog.open("prop")
+        if not props:
+            return await self.bet()
+        matchup = self.rng.choice(props)
+        value = str(self.rng.randint(0, 60)) if matchup.get("prop_type") == "numeric" else self.rng.choice(("yes", "no"))
+        await main.bet_prop(self.ctx(), matchup["id"], value, self.rng.randint(5, 500))
+
+    async def parlay(self):
+        # The same call the parlay builder's stake modal makes
+        legs = self.rng.sample(self.open_spreads(), self.rng.randint(2, 4))
+        picks = [(m["id"], self.rng.choice((m["home"], m["away"]))) for m in legs]
+        await main.place_parlay(self.rng.choice(self.user_ids), picks, self.rng.randint(5, 200))
+
+    async def leaderboard(self):
+        await main.leaderboard(self.ctx(), self.rng.choice(main.CATEGORIES))
+
+    async def settle(self):
+        matchup = self.rng.choice(self.open_spreads())
+        await main.settle_matchup(self.admin, matchup["id"], self.rng.choice((matchup["home"], matchup["away"])))
+
+    async def save(self):
+        await main.compact_in_background()
+
+    async def importslate(self):
+        """One CSV slate of ``import_rows`` spreads and choice props through !importslate."""
+        self.imports += 1
+        start = int(time.time()) + 7 * 24 * 3600
+        lines = ["type,title,home,away,spread,overunder,start_time,prop_type,options"]
+        for i in range(self.import_rows):
+            if i % 10 == 9:
+                lines.append(f"prop,Import {self.imports} prop {i},,,,,{start},choice,yes|no")
+            else:
+                lines.append(f"spread,Import {self.imports} game {i},H{i},A{i},{self.rng.randint(-14, 14) / 2},"
+                             f"{self.rng.randint(80, 120) / 2},{start},,")
+        data = "\n".join(lines).encode()
+        await main.import_slate(FakeContext(self.guild, self.admin.author, [FakeAttachment("slate.csv", data)]))
+
+    async def importresults(self):
+        """Settle ``slate_size`` open spreads from one results file through !importresults."""
+        slate = self.rng.sample(self.open_spreads(), min(self.slate_size, len(self.open_spreads())))
+        data = json.dumps([{"matchup_id": m["id"], "result": self.rng.choice((m["home"], m["away"]))} for m in slate]).encode()
+        await main.import_results(FakeContext(self.guild, self.admin.author, [FakeAttachment("results.json", data)]))
+
+def schedule(rng, counts):
+    """Interleaved, seeded order of operations so each one runs against state the others keep changing."""
+    order = [op for op, count in counts.items() for _ in range(count)]
+    rng.shuffle(order)
+    return order
+
+async def run(sim, order):
+    timings = {op: [] for op in OPERATIONS}
+    for op in order:
+        started = time.perf_counter()
+        await getattr(sim, op)()
+        timings[op].append(time.perf_counter() - started)
+    return timings
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def summarize(timings):
+    report = {}
+    for op, samples in timings.items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        report[op] = {
+            "count": len(samples),
+            "throughput": round(len(samples) / sum(samples), 1),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        }
+    return report
+
+def compare(report, baseline, tolerance):
+    """Operations whose p50 or throughput regressed by more than ``tolerance`` against the baseline."""
+    regressions = []
+    for op, base in baseline["ops"].items():
+        now = report.get(op)
+        if not now:
+            continue
+        if now["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{op}: p50 {base['p50_ms']}ms -> {now['p50_ms']}ms")
+        if now["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{op}: throughput {base['throughput']}/s -> {now['throughput']}/s")
+    return regressions
+
+# =============================
+# Entry point
+# =============================
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Seeded load simulation of the sportsbook betting core.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--matchups", type=int, default=500)
+    parser.add_argument("--bets", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=2_000, help="bet operations; the other operations scale from it")
+    parser.add_argument("--settles", type=int, default=10)
+    parser.add_argument("--saves", type=int, default=3)
+    parser.add_argument("--imports", type=int, default=3, help="!importslate runs")
+    parser.add_argument("--import-rows", type=int, default=1000, help="rows per imported slate")
+    parser.add_argument("--result-imports", type=int, default=3, help="!importresults runs")
+    parser.add_argument("--slate-size", type=int, default=20, help="matchups settled per results file")
+    parser.add_argument("--baseline", help="compare against this baseline and exit 1 on a regression")
+    parser.add_argument("--save-baseline", help="write this run's report as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    population, board = build_population(rng, args.users, args.matchups, args.bets)
+    print(f"Built {args.users} users, {args.matchups} matchups and {args.bets} bets in {time.perf_counter() - started:.1f}s")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        install(population, board, workdir)
+        print(f"Built indexes in {time.perf_counter() - started:.1f}s")
+
+        counts = {"bet": args.ops, "betprop": args.ops // 4, "parlay": args.ops // 4,
+                  "leaderboard": args.ops // 2, "settle": args.settles, "save": args.saves,
+                  "importslate": args.imports, "importresults": args.result_imports}
+        sim = Simulation(rng, FakeGuild(FakeChannel()), args.import_rows, args.slate_size)
+        report = summarize(asyncio.run(run(sim, schedule(rng, counts))))
+        main.archive.close()
+
+    print(f"{'operation':<12}{'count':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for op, row in report.items():
+        print(f"{op:<12}{row['count']:>8}{row['throughput']:>12}{row['p50_ms']:>10}{row['p99_ms']:>10}")
+
+    params = {k: getattr(args, k) for k in ("seed", "users", "matchups", "bets", "ops", "settles", "saves",
+                                            "imports", "import_rows", "result_imports", "slate_size")}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"params": params, "ops": report}, f, indent=4)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"⚠️ Baseline was recorded with {baseline.get('params')}; comparing anyway")
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,46 @@
+# locks.py
+import asyncio, weakref, zlib
+from contextlib import asynccontextmanager
+
+class LockManager:
+    """asyncio locks guarding balances and matchups across awaits.
+
+    Users map onto a fixed pool of striped locks (memory stays constant no
+    matter how many users exist); matchups get one lock each, kept only
+    while something holds or waits on it, so ids that were typed but never
+    existed don't pile up. ``hold``
+    always acquires matchup locks before user stripes, each group in sorted
+    order, so commands touching several matchups (parlays) can't deadlock
+    against each other or against a settlement.
+    """
+
+    def __init__(self, stripes=256):
+        self._user_locks = [asyncio.Lock() for _ in range(stripes)]
+        self._matchup_locks = weakref.WeakValueDictionary()
+
+    def user_lock(self, user_id):
+        return self._user_locks[self._stripe(user_id)]
+
+    def matchup_lock(self, matchup_id):
+        lock = self._matchup_locks.get(matchup_id)
+        if lock is None:
+            lock = self._matchup_locks[matchup_id] = asyncio.Lock()
+        return lock
+
+    @asynccontextmanager
+    async def hold(self, users=(), matchups=()):
+        """Acquire every lock needed for the given user and matchup ids in a fixed global order."""
+        ordered = [self.matchup_lock(mid) for mid in sorted(set(m for m in matchups if m))]
+        ordered += [self._user_locks[i] for i in sorted(set(self._stripe(uid) for uid in users))]
+        acquired = []
+        try:
+            for lock in ordered:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _stripe(self, user_id):
+        return zlib.crc32(str(user_id).encode()) % len(self._user_locks)
@@ -1,18 +1,51 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import os, json, random, math, asyncio, base64, requests
-from constants import USER_COMMANDS, ADMIN_COMMANDS
-from datetime import datetime, timedelta
-from flask import Flask
-import threading
+import os, math, asyncio, time, signal, functools, itertools
+from constants import USER_COMMANDS, ADMIN_COMMANDS, ACHIEVEMENTS, WEEKLY_CHALLENGES, COMMAND_COSTS
+from github_sync import GitHubSync
+from storage import JsonStorage, SqliteStorage, freeze, thaw
+from locks import LockManager
+from volume import VolumeIndex
+from settlement import Settlement, SettlementEngine, calculate_payout, paginate
+from parlays import ParlayIndex
+from leaderboard import Leaderboard, CATEGORIES
+from models import User, Stats, Bet, ParlayLeg, Matchup, decode_state, encode, intern_selection, to_epoch
+from archive import HistoryArchive
+from names import NameCache
+from parlay_builder import ParlayBuilder, parlay_sides
+from catalog import MatchupCatalog
+from scheduler import LockScheduler
+from odds import ENGINES, QuoteBook
+from numeric import NumericPropIndex, liability_curve, total_payout, worst_case
+from health import create_app, serve
+from metrics import Metrics
+from slate import read_rows, parse_slate, parse_results, error_report
+from events import EventBus
+from rules import RuleEngine, touched_fields
+from admission import AdmissionControl
+from ids import IdGenerator
+import shardlink
 
 # --- Load Environment Variables ---
 TOKEN = os.getenv("TOKENFORBOTHERE")   # Discord bot token
-ADMIN_ID = int(os.getenv("ADMIN_ID"))  # Admin Discord ID
+ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))  # Admin Discord ID
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")  # "username/repo"
 GITHUB_BRANCH = "main"
+GITHUB_SYNC_INTERVAL = float(os.getenv("GITHUB_SYNC_INTERVAL", "5"))  # seconds to coalesce saves
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "json")  # "json" (snapshots + ledger) or "sqlite"
+LEDGER_COMPACT_EVERY = int(os.getenv("LEDGER_COMPACT_EVERY", "500"))  # changes before a fresh snapshot
+SQLITE_EXPORT_INTERVAL = float(os.getenv("SQLITE_EXPORT_INTERVAL", "60"))  # seconds between JSON exports of the sqlite engine
+FREEZE_SLICE = 2000  # records (users, matchups, their bets and history) copied per event-loop turn for a background snapshot
+ODDS_ENGINE = os.getenv("ODDS_ENGINE", "legacy")  # "legacy" (spread volume formula) or "pool" (vig-aware, all selections)
+HEALTH_PORT = int(os.getenv("PORT", "8080"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))  # 0 runs the single-process commands.Bot
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s] or None  # shards this process runs (default all)
+DATA_DIR = os.getenv("DATA_DIR", "")  # per-shard state directory, set by coordinator.py
+COORDINATOR_SOCKET = os.getenv("COORDINATOR_SOCKET")  # Unix socket of the local coordinator, if sharded
+GATEWAY_STUB = bool(os.getenv("GATEWAY_STUB"))  # load state and serve the coordinator link without connecting to Discord
+HOME_GUILD_ID = int(os.getenv("HOME_GUILD_ID", "0")) or None  # guild that keeps the accounts and matchups from before state was split by guild, DMs too; unsharded, defaults to the guild joined first
 
 # --- Bot Configuration ---
 CURRENCY_SYMBOL = "💵"
@@ -20,149 +53,647 @@ DAILY_CLAIM_AMOUNT = 50
 STARTING_BALANCE = 500
 BET_LOCK_BUFFER_SECONDS = 300
 PAYOUT_CHANNEL_ID = 1401259843834216528
+NAME_CACHE_TTL_SECONDS = 3600
+NAME_CACHE_SIZE = 10000
+HISTORY_HOT_WINDOW = 50          # settled bets kept in memory per user
+HISTORY_SPILL_BATCH = 50         # extra entries allowed before the oldest move to the archive
+SETTLE_CHUNK_SIZE = 500          # bets applied (and persisted) per settlement batch
+ANNOUNCE_INTERVAL_SECONDS = 1.0  # gap between payout announcement pages
+SETTLED_RETENTION_DAYS = 14      # settled matchups stay listed this long before moving to the archive file
+ADMISSION_USER_BURST = 10        # command tokens one user can spend at once (costs in constants.COMMAND_COSTS)
+ADMISSION_USER_RATE = 0.5        # tokens per second refilled per user
+ADMISSION_GLOBAL_BURST = 300     # tokens shared by everyone
+ADMISSION_GLOBAL_RATE = 100.0    # tokens per second refilled to the shared bucket
+GITHUB_RATELIMIT_RESERVE = 100   # API calls held back; write commands are shed below it until the window resets
+GITHUB_SYNC_MAX_LAG_SECONDS = 60 # write commands are shed while pushes succeed but the oldest unpushed save is older than this
 
 # --- Discord Intents ---
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+# --- Startup (state loads in a worker thread while the gateway connects) ---
+STARTUP = {"ready": False, "error": None, "load_seconds": None}
+STILL_LOADING = "⏳ The sportsbook is still loading, try again in a moment."
+
+class SportsbookTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        if not STARTUP["ready"]:
+            await interaction.response.send_message(STILL_LOADING, ephemeral=True)
+            return False
+        if interaction.command and not is_admin_member(interaction.user):
+            decision = admission.admit(interaction.user.id, interaction.command.name)
+            if not decision.admitted:
+                # Every interaction needs an answer; ephemeral ones only reach the sender
+                await interaction.response.send_message(slow_down(decision), ephemeral=True)
+                return False
+        return True
+
+# Sharded mode: each process owns the guilds of its shards and keeps their state in DATA_DIR
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, help_command=None, tree_cls=SportsbookTree,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, help_command=None, tree_cls=SportsbookTree)
 tree = bot.tree
 
-# --- Flask Keep Alive ---
-app = Flask('')
-@app.route('/')
-def home(): 
-    return "Bot is alive!"
-
-def run_keep_alive():
-    app.run(host="0.0.0.0", port=8080)
-
-threading.Thread(target=run_keep_alive).start()
+@bot.check
+async def ready_for_commands(ctx):
+    if STARTUP["ready"]:
+        return True
+    await ctx.send(STILL_LOADING)
+    return False
+
+# --- Admission control (per-user and global token buckets; writes shed while persistence is behind) ---
+def persistence_saturated():
+    return (github_sync.behind(GITHUB_SYNC_MAX_LAG_SECONDS)
+            or github_sync.ratelimit_low(GITHUB_RATELIMIT_RESERVE))
+
+admission = AdmissionControl(ADMISSION_USER_BURST, ADMISSION_USER_RATE, ADMISSION_GLOBAL_BURST, ADMISSION_GLOBAL_RATE,
+                             costs=COMMAND_COSTS, saturated=persistence_saturated)
+
+def slow_down(decision):
+    if decision.reason == "shed":
+        return "🐢 The sportsbook is busy saving, try that again in a moment."
+    return f"🐢 Slow down a little, try again in {max(1, math.ceil(decision.retry_after))}s."
+
+class Throttled(commands.CheckFailure):
+    pass
+
+@bot.check
+async def admitted(ctx):
+    if is_admin(ctx):
+        return True
+    decision = admission.admit(ctx.author.id, ctx.command.qualified_name)
+    if decision.admitted:
+        return True
+    if decision.notify:
+        await ctx.send(slow_down(decision))
+    raise Throttled()
+
+# --- Instrumentation (command latency, persistence, settlement; served at /metrics and by !perf) ---
+metrics = Metrics()
+
+@bot.event
+async def on_command(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.event
+async def on_command_completion(ctx):
+    metrics.observe("sportsbook_command_seconds", time.perf_counter() - ctx.started_at,
+                    command=ctx.command.qualified_name, via="prefix")
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    # Measured from the interaction's creation, so it includes the gateway hop
+    metrics.observe("sportsbook_command_seconds", (discord.utils.utcnow() - interaction.created_at).total_seconds(),
+                    command=command.qualified_name, via="slash")
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, Throttled):
+        return  # counted in admission.stats, answered (at most once per streak) by admitted
+    metrics.inc("sportsbook_command_errors_total", command=ctx.command.qualified_name if ctx.command else "unknown")
+    if isinstance(error, commands.CheckFailure) and not STARTUP["ready"]:
+        return  # already answered by ready_for_commands
+    await commands.Bot.on_command_error(bot, ctx, error)
+
+# --- Display names (shared by every command that renders users) ---
+names = NameCache(ttl=NAME_CACHE_TTL_SECONDS, capacity=NAME_CACHE_SIZE)
+
+@bot.event
+async def setup_hook():
+    STARTUP["loader"] = asyncio.create_task(load_in_background())  # held so the task isn't collected
+    await tree.sync()
+
+@bot.event
+async def on_member_join(member):
+    names.put(member.guild.id, member.id, member.display_name)
+
+@bot.event
+async def on_member_update(before, after):
+    names.put(after.guild.id, after.id, after.display_name)
+
+@bot.event
+async def on_member_remove(member):
+    names.forget(member.guild.id, member.id)
 
 # --- JSON File Paths ---
-USERS_FILE = "users.json"
-MATCHUPS_FILE = "matchups.json"
+USERS_FILE = os.path.join(DATA_DIR, "users.json")
+MATCHUPS_FILE = os.path.join(DATA_DIR, "matchups.json")
+LEDGER_FILE = os.path.join(DATA_DIR, "ledger.jsonl")
+SQLITE_FILE = os.path.join(DATA_DIR, os.getenv("SQLITE_FILE", "sportsbook.db"))
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+MATCHUP_ARCHIVE_FILE = os.path.join(DATA_DIR, "matchups_archive.jsonl")
 USERS = {}
 MATCHUPS = {}
 
-# --- GitHub Push Helper ---
-def push_to_github(filename):
-    """Push or update a JSON file to GitHub repository."""
-    with open(filename, "r") as f:
-        content = f.read()
-    
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{filename}"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-
-    # Check for existing file to get SHA
-    r = requests.get(url, headers=headers)
-    sha = r.json().get("sha") if r.status_code == 200 else None
-
-    payload = {
-        "message": f"Update {filename}",
-        "content": base64.b64encode(content.encode()).decode(),
-        "branch": GITHUB_BRANCH
-    }
-    if sha:
-        payload["sha"] = sha
-
-    response = requests.put(url, headers=headers, data=json.dumps(payload))
-    if response.status_code in [200, 201]:
-        print(f"✅ {filename} saved to GitHub")
-    else:
-        print(f"❌ Failed to push {filename} to GitHub: {response.json()}")
-
-# --- Load / Save Functions ---
-def load_users():
-    try:
-        with open(USERS_FILE, "r") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_users():
-    with open(USERS_FILE, "w") as f:
-        json.dump(USERS, f, indent=4)
-    push_to_github(USERS_FILE)
-
-def load_matchups():
+# --- GitHub Sync (background thread, never blocks commands; started by main) ---
+github_sync = GitHubSync(GITHUB_REPO, GITHUB_TOKEN, branch=GITHUB_BRANCH, interval=GITHUB_SYNC_INTERVAL)
+
+# --- Storage engine (JSON snapshots + ledger by default, SQLite optional; opened by load_data) ---
+storage = None
+
+def open_storage():
+    if STORAGE_ENGINE == "sqlite":
+        return SqliteStorage(SQLITE_FILE, USERS_FILE, MATCHUPS_FILE, mirror=github_sync)
+    return JsonStorage(USERS_FILE, MATCHUPS_FILE, LEDGER_FILE, mirror=github_sync)
+
+# --- Guild partitions (each guild has its own accounts and matchups) ---
+def partition(guild):
+    """Partition of a guild: None for the home guild (and DMs), else the guild id."""
+    gid = guild.id if guild else HOME_GUILD_ID
+    return None if gid is None or gid == HOME_GUILD_ID else gid
+
+def first_joined(guilds):
+    """The guild the bot has been in longest (the only one, for most single-process bots), or None."""
+    joined = [(g.me.joined_at, g.id, g) for g in guilds if g.me and g.me.joined_at]
+    return min(joined, key=lambda entry: entry[:2])[2] if joined else None
+
+async def resolve_home_guild():
+    """Unsharded with no HOME_GUILD_ID: the guild joined first keeps the accounts and matchups from before the split."""
+    global HOME_GUILD_ID
+    if HOME_GUILD_ID is not None or SHARD_COUNT or GATEWAY_STUB:
+        return
+    await bot.wait_until_ready()
+    home = first_joined(bot.guilds)
+    if home:
+        HOME_GUILD_ID = home.id
+        print(f"🏠 Home guild: {home.name} ({home.id}); set HOME_GUILD_ID to choose another")
+
+def member_key(guild, user_id):
+    """USERS key of a member's account in a guild: the plain id in the home guild, ``"<guild_id>:<user_id>"`` elsewhere."""
+    part = partition(guild)
+    return str(user_id) if part is None else f"{part}:{user_id}"
+
+def key_partition(key):
+    gid, sep, _ = key.partition(":")
+    return int(gid) if sep else None
+
+def discord_id(key):
+    """The Discord user id an account key belongs to."""
+    return key.rpartition(":")[2]
+
+def find_matchup(part, matchup_id):
+    """A matchup of this partition, or None; other guilds' matchups don't exist as far as a command can tell."""
+    matchup = MATCHUPS.get(matchup_id)
+    return matchup if matchup is not None and matchup.get("guild_id") == part else None
+
+# Rankings are re-evaluated for every user a recorded change touches, within the user's guild
+rankings = Leaderboard(group=key_partition)
+
+def record(op, *paths):
+    """Persist the current value (or absence) of each path, e.g. ("users", uid, "balance"), as one change."""
+    root = {"users": USERS, "matchups": MATCHUPS}
+    changes = []
+    touched_users = set()
+    for path in paths:
+        if path[0] == "users":
+            touched_users.add(path[1])
+        node = root
+        try:
+            for key in path:
+                node = node[key]
+            changes.append((path, node))
+        except (KeyError, IndexError):
+            changes.append((path,))
+    started = time.perf_counter()
+    storage.record(op, changes, root)
+    metrics.observe("sportsbook_persist_seconds", time.perf_counter() - started, op=op)
+    for uid in touched_users:
+        rankings.update(uid, USERS.get(uid))
+    # Startup (a worker thread, no event loop yet) compacts once at the end of load_data instead
+    if storage.pending >= LEDGER_COMPACT_EVERY and STARTUP["ready"]:
+        start_compaction()
+
+def compact():
+    """Snapshot on the calling thread (startup, shutdown); commands use start_compaction."""
+    started = time.perf_counter()
+    storage.compact(USERS, MATCHUPS)
+    metrics.observe("sportsbook_compact_seconds", time.perf_counter() - started)
+
+compaction = None  # the background compaction task, if one is running
+
+def start_compaction():
+    global compaction
+    if compaction is None or compaction.done():
+        compaction = asyncio.create_task(compact_in_background())
+
+async def frozen(mapping):
+    """Pickled slices of ``mapping``, taken one per event-loop turn so commands keep running in between."""
+    slices, keys, size = [], [], 0
+    for key in list(mapping):
+        entry = mapping.get(key)
+        if entry is None:
+            continue  # removed while an earlier slice was taken
+        keys.append(key)
+        size += 1 + len(entry["bets"]) + len(entry.get("history") or ())
+        if size >= FREEZE_SLICE:
+            slices.append(freeze(mapping, keys))
+            keys, size = [], 0
+            await asyncio.sleep(0)
+    if keys:
+        slices.append(freeze(mapping, keys))
+    return slices
+
+async def compact_in_background():
+    """Write fresh snapshots from a frozen copy of the state in a worker thread, then trim the ledger they cover."""
+    started = time.perf_counter()
     try:
-        with open(MATCHUPS_FILE, "r") as f:
-            data = json.load(f)
-            return data if isinstance(data, dict) else {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_matchups():
-    with open(MATCHUPS_FILE, "w") as f:
-        json.dump(MATCHUPS, f, indent=4)
-    push_to_github(MATCHUPS_FILE)
+        token = storage.begin_compaction()
+        users, matchups = await frozen(USERS), await frozen(MATCHUPS)
+        await asyncio.to_thread(lambda: storage.write_snapshots(thaw(users), thaw(matchups)))
+        storage.end_compaction(token)
+    except Exception as e:
+        # The ledger still holds everything; the next change past the threshold tries again
+        print(f"⚠️ Background compaction failed: {e}")
+        return
+    metrics.observe("sportsbook_compact_seconds", time.perf_counter() - started)
+
+async def compact_now():
+    """Compact right away, once any background compaction in flight has finished writing; returns the backlog left."""
+    if compaction is not None and not compaction.done():
+        await compaction
+    compact()
+    return storage.pending
+
+def load_state():
+    """Load users and matchups from the storage engine, migrating the JSON files into an empty database."""
+    if isinstance(storage, SqliteStorage) and storage.is_empty():
+        users, matchups = JsonStorage(USERS_FILE, MATCHUPS_FILE, LEDGER_FILE).load()
+        if users or matchups:
+            storage.import_state({uid: upgrade_user(u) for uid, u in users.items()}, matchups)
+            print(f"📦 Migrated {len(users)} users and {len(matchups)} matchups into {SQLITE_FILE}")
+    users, matchups = storage.load()
+    return decode_state({uid: upgrade_user(u) for uid, u in users.items()}, matchups)
+
+# --- Concurrency (balance/matchup locks held across awaits) ---
+locks = LockManager()
 
 # --- Helper Functions ---
 def format_currency(amount):
     return f"{CURRENCY_SYMBOL}{amount}"
 
+# Time-ordered ids, unique per shard; legacy m_######/b_###### ids stay valid keys
+ids = IdGenerator(worker=SHARD_IDS[0] if SHARD_IDS else 0)
+
 def gen_id(prefix="id"):
-    return f"{prefix}_{random.randint(100000, 999999)}"
+    return ids.next(prefix)
+
+def new_user(balance=STARTING_BALANCE, last_claim=None):
+    return User(
+        balance=balance,
+        bets={},
+        history=[],
+        stats=Stats(spent=0, won=0, lost=0, bets_won=0, bets_lost=0),
+        achievements=[],
+        last_claim=last_claim,
+        weekly={"week_start": None, "progress": {}, "claimed": []}
+    )
+
+def upgrade_user(data):
+    """Convert the legacy {"money", "last_daily", ...} user shape to the current one."""
+    if "balance" in data:
+        return data
+    return new_user(data.get("money", STARTING_BALANCE), to_epoch(data.get("last_daily")))
 
 def get_user(user_id):
     """Retrieve or create user."""
     if user_id not in USERS:
-        USERS[user_id] = {
-            "balance": STARTING_BALANCE,
-            "bets": {},
-            "history": [],
-            "stats": {"spent":0,"won":0,"lost":0,"bets_won":0,"bets_lost":0},
-            "achievements": [],
-            "last_claim": None,
-            "weekly": {"week_start": None, "progress": {"bets":0}, "claimed_this_week": False}
-        }
-        save_users()
+        USERS[user_id] = new_user()
+        record("user_created", ("users", user_id))
     return USERS[user_id]
 
-# --- Load existing data ---
-USERS = load_users()
-MATCHUPS = load_matchups()
+def history_overflow(user_ids):
+    """``{user_id: [bet, ...]}``: all but the newest HISTORY_HOT_WINDOW settled bets of users over the spill threshold."""
+    batch = {}
+    for uid in user_ids:
+        user = USERS.get(uid)
+        if uid not in spilling and user and len(user["history"]) > HISTORY_HOT_WINDOW + HISTORY_SPILL_BATCH:
+            batch[uid] = user["history"][:len(user["history"]) - HISTORY_HOT_WINDOW]
+    return batch
+
+def drop_spilled(batch):
+    """Remove archived bets from the front of their users' hot history and log it."""
+    for uid, bets in batch.items():
+        del USERS[uid]["history"][:len(bets)]
+    record("history_archived", *[("users", uid, "history") for uid in batch])
+
+async def spill_history(user_ids):
+    """Move all but the newest HISTORY_HOT_WINDOW settled bets of these users to the cold archive.
+
+    The archive writes (and fsyncs) on its own thread; the bets stay in the
+    hot history until that is done, and only then are they dropped.
+    """
+    batch = history_overflow(user_ids)
+    if not batch:
+        return
+    spilling.update(batch)
+    try:
+        # Archive first: a crash before the record below can duplicate entries, never lose them
+        await asyncio.wrap_future(archive.submit(batch))
+        drop_spilled(batch)
+    finally:
+        spilling.difference_update(batch)
+
+def archive_settled_matchups():
+    """Move matchups settled more than SETTLED_RETENTION_DAYS ago from MATCHUPS to the archive file."""
+    expired = catalog.evict(int(time.time()) - SETTLED_RETENTION_DAYS * 24 * 3600)
+    for matchup in expired:
+        MATCHUPS.pop(matchup["id"], None)
+        volumes.discard(matchup["id"])
+        quotes.forget(matchup["id"])
+        numeric_props.pop(matchup["id"])
+    if expired:
+        record("matchups_archived", *[("matchups", m["id"]) for m in expired])
+
+# --- Derived indexes (rebuilt from the stored bets by load_data) ---
+archive = None
+spilling = set()  # users whose overflow is being written to the archive right now
+volumes = VolumeIndex()
+quotes = QuoteBook(ENGINES[ODDS_ENGINE](), volumes)
+parlays = ParlayIndex()
+numeric_props = NumericPropIndex()
+catalog = MatchupCatalog(MATCHUP_ARCHIVE_FILE, default=encode)
+
+# --- Achievements & weekly challenges (rules in constants.py, checked as events are published) ---
+events = EventBus()
+rule_engine = RuleEngine(ACHIEVEMENTS, WEEKLY_CHALLENGES)
+for event_name in rule_engine.events():
+    events.subscribe(event_name, functools.partial(rule_engine.apply, event_name))
+
+def reward_paths(uid, awards):
+    """Paths to persist along with the change that earned these awards."""
+    return [("users", uid, field) for field in sorted(touched_fields(awards))]
+
+def with_awards(embed, awards):
+    """Note unlocked achievements and completed challenges on a command's reply."""
+    lines = [("🏅 Achievement unlocked: " if a.kind == "achievement" else "📅 Weekly challenge complete: ") + a.name
+             + (f" (+{format_currency(a.reward)})" if a.reward else "") for a in awards if a.kind != "progress"]
+    if lines:
+        embed.add_field(name="Rewards", value="\n".join(lines), inline=False)
+    return embed
+
+settler = SettlementEngine(get_user, record, chunk_size=SETTLE_CHUNK_SIZE, metrics=metrics, events=events)
+
+# --- Automatic locking BET_LOCK_BUFFER_SECONDS before each start_time ---
+def lock_deadline(matchup):
+    start = matchup.get("start_time")
+    return None if start is None else start - BET_LOCK_BUFFER_SECONDS
+
+def betting_closed(matchup):
+    """Locked by hand, or inside the buffer before kickoff even if the scheduler hasn't run yet."""
+    deadline = lock_deadline(matchup)
+    return matchup["locked"] or (deadline is not None and time.time() >= deadline)
+
+async def auto_lock(matchup_id):
+    async with locks.hold(matchups=[matchup_id]):
+        matchup = MATCHUPS.get(matchup_id)
+        if not matchup or matchup["locked"] or matchup["settled"]:
+            return
+        matchup["locked"] = True
+        catalog.update(matchup)
+        record("matchup_auto_locked", ("matchups", matchup_id, "locked"))
+
+lock_scheduler = LockScheduler(auto_lock)
+
+# --- Loading ---
+def load_data():
+    """Open storage, load and validate state, and build the derived indexes (runs in a worker thread)."""
+    global storage, archive, USERS, MATCHUPS
+    if DATA_DIR:
+        os.makedirs(DATA_DIR, exist_ok=True)
+    storage = open_storage()
+    USERS, MATCHUPS = load_state()
+    ids.observe(itertools.chain(MATCHUPS, *(m["bets"] for m in MATCHUPS.values()), *(u["bets"] for u in USERS.values())))
+    archive = HistoryArchive(HISTORY_DIR, default=encode, decode=Bet.from_json)
+    batch = history_overflow(USERS)
+    if batch:
+        archive.submit(batch).result()
+        drop_spilled(batch)
+    if storage.pending:
+        compact()
+    if isinstance(storage, SqliteStorage):
+        storage.start(SQLITE_EXPORT_INTERVAL)
+    stamp_legacy_settled()
+    build_indexes()
+
+    problems = validate_state()
+    for problem in problems[:20]:
+        print(f"⚠️ {problem}")
+    if len(problems) > 20:
+        print(f"⚠️ ...and {len(problems) - 20} more inconsistencies")
+
+def stamp_legacy_settled():
+    """Start the retention window now for matchups settled before settled_at was recorded."""
+    now = int(time.time())
+    legacy = [m for m in MATCHUPS.values() if m["settled"] and m.get("settled_at") is None]
+    for matchup in legacy:
+        matchup["settled_at"] = now
+    if legacy:
+        record("legacy_settled_stamped", *[("matchups", m["id"], "settled_at") for m in legacy])
+
+def build_indexes():
+    """Rebuild every derived index from USERS and MATCHUPS."""
+    volumes.rebuild(MATCHUPS)
+    parlays.rebuild(USERS)
+    numeric_props.rebuild(MATCHUPS)
+    rankings.rebuild(USERS)
+    catalog.rebuild(MATCHUPS)
+    archive_settled_matchups()
+
+def validate_state():
+    """Cross-check users against matchups; returns one description per inconsistency."""
+    problems = []
+    for mid, matchup in MATCHUPS.items():
+        for bid, bet in matchup["bets"].items():
+            if not bet.get("resolved") and bid not in USERS.get(bet["user_id"], {}).get("bets", {}):
+                problems.append(f"Open bet {bid} on {mid} is missing from user {bet['user_id']}")
+    for uid, user in USERS.items():
+        for bid, bet in user["bets"].items():
+            if bet["kind"] != "parlay" and bet["matchup_id"] not in MATCHUPS:
+                problems.append(f"Pending bet {bid} of user {uid} is on unknown matchup {bet['matchup_id']}")
+    return problems
+
+async def load_in_background():
+    """Load state off the event loop, then start the lock scheduler and open the gate to commands."""
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(load_data)
+    except Exception as e:
+        STARTUP["error"] = f"{type(e).__name__}: {e}"
+        print(f"❌ Failed to load state: {STARTUP['error']}")
+        await bot.close()
+        return
+    lock_scheduler.rebuild({m["id"]: lock_deadline(m) for m in catalog.open() if lock_deadline(m) is not None})
+    lock_scheduler.start()
+    STARTUP["load_seconds"] = round(time.perf_counter() - started, 3)
+    # Commands stay gated until the home guild is known, so no account is looked up under the wrong key
+    await resolve_home_guild()
+    STARTUP["ready"] = True
+    print(f"✅ Loaded {len(USERS)} users and {len(MATCHUPS)} matchups in {STARTUP['load_seconds']}s")
+    if COORDINATOR_SOCKET:
+        await link_coordinator()
+
+def health_status():
+    return {
+        "ready": STARTUP["ready"],
+        "error": STARTUP["error"],
+        "load_seconds": STARTUP["load_seconds"],
+        "users": len(USERS),
+        "matchups": len(MATCHUPS),
+        "scheduled_locks": len(lock_scheduler),
+        "ledger_pending": storage.pending if storage else 0,
+        "sync_queue": github_sync.queue_depth(),
+    }
+
+def collected_metrics():
+    """Totals other components already keep, read when /metrics is scraped."""
+    values = {f"sportsbook_storage_{key}_total": value for key, value in (storage.stats if storage else {}).items()}
+    for key, value in github_sync.stats.items():
+        values[f"sportsbook_github_{key}" if key.startswith("ratelimit") else f"sportsbook_github_{key}_total"] = value
+    for key, value in names.stats().items():
+        values[f"sportsbook_name_cache_{key}"] = value
+    for key, value in admission.stats.items():
+        values[f"sportsbook_admission_{key}_total"] = value
+    values["sportsbook_ready"] = int(STARTUP["ready"])
+    values["sportsbook_users"] = len(USERS)
+    values["sportsbook_matchups"] = len(MATCHUPS)
+    values["sportsbook_ledger_pending"] = storage.pending if storage else 0
+    values["sportsbook_github_sync_queue"] = github_sync.queue_depth()
+    values["sportsbook_github_sync_lag_seconds"] = round(github_sync.lag(), 3)
+    values["sportsbook_github_sync_failing"] = int(github_sync.failing())
+    return values
+
+metrics.collect(collected_metrics)
+
+# --- Coordinator link (sharded mode: cross-shard leaderboards and admin broadcasts) ---
+coordinator = None
+
+async def link_coordinator():
+    global coordinator
+    try:
+        coordinator = await shardlink.connect(COORDINATOR_SOCKET, {
+            "top": shard_top,
+            "stats": health_status,
+            "lock": lock_open_matchups,
+            "compact": compact_now,
+        })
+        await coordinator.request("hello", {"shard_id": SHARD_IDS[0] if SHARD_IDS else 0})
+    except (OSError, shardlink.RemoteError) as e:
+        coordinator = None
+        print(f"⚠️ Coordinator unreachable at {COORDINATOR_SOCKET}, running without cross-shard commands: {e}")
+
+async def shard_top(category, k=None):
+    """``[[account key, value, display name, guild name], ...]``: this shard's top accounts across all its guilds."""
+    top = rankings.top_all(category, k)
+    by_guild = {}
+    for key, _ in top:
+        by_guild.setdefault(key_partition(key) or HOME_GUILD_ID, []).append(discord_id(key))
+    labels = {}
+    for gid, user_ids in by_guild.items():
+        guild = bot.get_guild(gid)
+        display = await names.resolve(guild, user_ids)
+        label = guild.name if guild else ("Direct messages" if gid is None else f"Guild {gid}")
+        labels.update({(gid, uid): (name, label) for uid, name in display.items()})
+    return [[key, value, *labels[(key_partition(key) or HOME_GUILD_ID, discord_id(key))]] for key, value in top]
+
+async def lock_open_matchups(match=""):
+    """Lock every open matchup whose title contains ``match``; returns the locked titles."""
+    locked = []
+    for matchup in catalog.open():
+        if match.lower() not in matchup["title"].lower():
+            continue
+        async with locks.hold(matchups=[matchup["id"]]):
+            if matchup["locked"] or matchup["settled"]:
+                continue
+            matchup["locked"] = True
+            catalog.update(matchup)
+            lock_scheduler.cancel(matchup["id"])
+            record("matchup_locked", ("matchups", matchup["id"], "locked"))
+        locked.append(matchup["title"])
+    return locked
+
+async def ask_coordinator(method, params=None):
+    """Result of a coordinator request, or an error string for the command to send."""
+    if coordinator is None:
+        return "❌ Cross-shard commands need the bot running under coordinator.py."
+    try:
+        return await coordinator.request(method, params)
+    except (ConnectionError, asyncio.TimeoutError, shardlink.RemoteError) as e:
+        return f"❌ Coordinator request failed: {e}"
 
 # =============================
 # Odds & Payout Logic
 # =============================
 
-def implied_decimal_from_moneyline(ml: int):
-    """Convert moneyline to decimal odds."""
-    return (ml / 100 + 1) if ml > 0 else (100 / abs(ml) + 1)
-
-def moneyline_from_decimal(dec: float):
-    """Convert decimal odds to moneyline."""
-    return int(round((dec - 1) * 100)) if dec >= 2 else int(round(-100 / (dec - 1)))
-
-def calculate_dynamic_moneylines(matchup):
-    """Adjust odds based on current betting volume."""
-    home_vol, away_vol = 0, 0
-    for bet in matchup.get("bets", {}).values():
-        if bet["kind"] == "spread":
-            sel = bet["selection"].upper()
-            if sel == matchup["home"].upper(): home_vol += bet["amount"]
-            if sel == matchup["away"].upper(): away_vol += bet["amount"]
-    total = home_vol + away_vol
-    if total == 0: return {"home_ml": -110, "away_ml": -110}
-    
-    home_share = home_vol / total
-    away_share = away_vol / total
-    home_odds = 1.8 + (away_share - home_share) * 0.5
-    away_odds = 1.8 + (home_share - away_share) * 0.5
-    return {"home_ml": moneyline_from_decimal(home_odds), "away_ml": moneyline_from_decimal(away_odds)}
-
-def calculate_payout(bet):
-    """Calculate payout for single or parlay bets."""
-    if bet["kind"] == "parlay":
-        combined_odds = 1
-        for leg in bet["selection"]:
-            combined_odds *= leg["odds"]
-        return int(bet["amount"] * combined_odds)
-    return int(bet["amount"] * bet["odds"])
+def selection_wins(matchup, result, selection):
+    """Whether a pick on this matchup (or a parlay leg on it) wins for the given result."""
+    if matchup.get("prop_type") == "numeric":
+        try: return float(selection) == float(result)
+        except ValueError: return False
+    if matchup["type"] == "prop":
+        return str(selection).lower() == str(result).lower()
+    return str(selection).upper() == str(result).upper()
+
+def numeric_payout(bet, actual):
+    try: prediction = float(bet["selection"])
+    except (TypeError, ValueError): return 0
+    return total_payout([(prediction, bet["amount"])], actual)
+
+def grade_matchup(matchup, result):
+    """Pair every unresolved bet on a matchup or prop with what it pays for this result."""
+    if matchup.get("prop_type") == "numeric":
+        # Graded in one pass over the prop's prediction/stake arrays
+        actual = float(result)
+        book = numeric_props.book(matchup["id"])
+        bets = matchup["bets"]
+        graded = list(zip([bets[bid] for bid in book.bet_ids], book.payouts(actual)))
+        # Open bets the book doesn't hold (their prediction never parsed) are still resolved
+        in_book = set(book.bet_ids)
+        graded += [(bet, numeric_payout(bet, actual)) for bid, bet in bets.items() if not bet.get("resolved") and bid not in in_book]
+        return Settlement(matchup["id"], graded)
+    if matchup["type"] == "prop":
+        # Flat-priced prop bets (odds 1.0) keep the original fixed 2x payout
+        payout = lambda bet: (calculate_payout(bet) if bet["odds"] > 1 else bet["amount"] * 2) if selection_wins(matchup, result, bet["selection"]) else 0
+    else:
+        payout = lambda bet: calculate_payout(bet) if selection_wins(matchup, result, bet["selection"]) else 0
+    return Settlement(matchup["id"], [(bet, payout(bet)) for bet in matchup["bets"].values() if not bet.get("resolved")])
+
+async def settle_parlay_legs(matchup, result):
+    """Grade every parlay leg on a settled matchup and resolve the parlays that are now decided.
+
+    A losing leg loses the parlay immediately; a parlay pays through
+    calculate_payout once its last leg wins. Returns the Settlement applied.
+    """
+    decided, graded_paths = grade_parlay_legs(matchup, result)
+    if graded_paths:
+        record("parlay_legs_graded", *graded_paths)
+    settlement = Settlement(matchup["id"], decided)
+    await settler.commit(settlement)
+    await spill_history(settlement.by_user)
+    return settlement
+
+def grade_parlay_legs(matchup, result):
+    """``(decided, graded_paths)``: parlays this result decides with their payouts, and paths of the ones still open."""
+    return parlays.grade(matchup["id"], USERS, lambda selection: selection_wins(matchup, result, selection), calculate_payout)
+
+def quote_odds(matchup, selection):
+    """Decimal odds offered right now for a pick, from the active odds engine."""
+    return quotes.price(matchup, selection)
+
+# =============================
+# Command Results
+# =============================
+# The hot commands are implemented once below, as functions returning an
+# embed (or a plain error string). Prefix commands send that with ctx.send;
+# slash commands defer first and send it as the interaction followup.
+
+async def reply(send, result):
+    if isinstance(result, discord.Embed):
+        await send(embed=result)
+    else:
+        await send(result)
 
 # =============================
 # Currency & User Commands
@@ -171,11 +702,12 @@ def calculate_payout(bet):
 @bot.command(name="daily")
 async def daily(ctx):
     """Claim daily coins."""
-    user = get_user(str(ctx.author.id))
-    now = datetime.utcnow()
+    uid = member_key(ctx.guild, ctx.author.id)
+    user = get_user(uid)
+    now = int(time.time())
     last_claim = user.get("last_claim")
     
-    if last_claim and datetime.fromisoformat(last_claim) > now - timedelta(hours=24):
+    if last_claim and last_claim > now - 24 * 3600:
         return await ctx.send(embed=discord.Embed(
             title="❌ Daily Already Claimed",
             description="Come back in 24 hours to claim again!",
@@ -183,34 +715,55 @@ async def daily(ctx):
         ))
 
     user["balance"] += DAILY_CLAIM_AMOUNT
-    user["last_claim"] = now.isoformat()
-    save_users()
+    user["last_claim"] = now
+    awards = events.publish("daily_claimed", user=user)
+    record("daily_claim", ("users", uid, "balance"), ("users", uid, "last_claim"), *reward_paths(uid, awards))
 
-    await ctx.send(embed=discord.Embed(
+    await ctx.send(embed=with_awards(discord.Embed(
         title="✅ Daily Claimed",
         description=f"You received {format_currency(DAILY_CLAIM_AMOUNT)}.\nNew balance: {format_currency(user['balance'])}",
         color=discord.Colour.green()
-    ))
+    ), awards))
 
-@bot.command(name="balance")
-async def balance(ctx, member: discord.Member = None):
-    """Check your balance or another user's."""
-    member = member or ctx.author
-    user = get_user(str(member.id))
-    await ctx.send(embed=discord.Embed(
+def balance_embed(guild, member):
+    user = get_user(member_key(guild, member.id))
+    return discord.Embed(
         title=f"{member.display_name}'s Balance",
         description=f"{format_currency(user['balance'])}",
         color=discord.Colour.gold()
-    ))
+    )
+
+@bot.command(name="balance")
+async def balance(ctx, member: discord.Member = None):
+    """Check your balance or another user's."""
+    await reply(ctx.send, balance_embed(ctx.guild, member or ctx.author))
+
+@tree.command(name="balance", description="Check your balance or another user's.")
+async def balance_slash(interaction: discord.Interaction, member: discord.Member = None):
+    await interaction.response.defer(thinking=True)
+    await reply(interaction.followup.send, balance_embed(interaction.guild, member or interaction.user))
+
+HISTORY_PAGE_SIZE = 10
 
 @bot.command(name="history")
-async def history(ctx, member: discord.Member = None):
-    """View betting history (last 10 bets)."""
+async def history(ctx, member: discord.Member = None, page: int = 1):
+    """View betting history, 10 bets per page (page 1 is the most recent)."""
     member = member or ctx.author
-    user = get_user(str(member.id))
+    uid = member_key(ctx.guild, member.id)
+    user = get_user(uid)
+
+    hot = user["history"]
+    total = len(hot) + archive.count(uid)
+    pages = max(1, math.ceil(total / HISTORY_PAGE_SIZE))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * HISTORY_PAGE_SIZE  # counted from the newest bet
+    entries = hot[::-1][start:start + HISTORY_PAGE_SIZE]
+    if len(entries) < HISTORY_PAGE_SIZE and start + len(entries) < total:
+        # Older pages come from the cold archive, read off the event loop
+        entries += await asyncio.to_thread(archive.read, uid, max(0, start - len(hot)), HISTORY_PAGE_SIZE - len(entries))
 
     history_text = ""
-    for h in user["history"][-10:]:
+    for h in reversed(entries):
         outcome = "✅ WIN" if h.get("payout",0) > 0 else "❌ LOSS"
         selection = h["selection"] if isinstance(h["selection"], str) else "Parlay"
         history_text += f"• {h['kind']} on {selection} — {outcome} ({format_currency(h['amount'])})\n"
@@ -218,51 +771,90 @@ async def history(ctx, member: discord.Member = None):
     if not history_text:
         history_text = "No history yet."
 
-    await ctx.send(embed=discord.Embed(
+    embed = discord.Embed(
         title=f"{member.display_name}'s Betting History",
         description=history_text,
         color=discord.Colour.blue()
-    ))
+    )
+    embed.set_footer(text=f"Page {page}/{pages}")
+    await ctx.send(embed=embed)
 
-@bot.command(name="leaderboard")
-async def leaderboard(ctx, category: str = "balance"):
-    """Show top 10 users by a category (balance/stats)."""
-    valid = ["balance", "spent", "won", "lost", "bets_won", "bets_lost"]
-    if category not in valid:
-        return await ctx.send(embed=discord.Embed(
+LEADERBOARD_SIZE = 10
+
+async def leaderboard_embed(guild, viewer_id, category):
+    if category not in CATEGORIES:
+        return discord.Embed(
             title="❌ Invalid Category",
-            description=f"Choose from: {', '.join(valid)}",
+            description=f"Choose from: {', '.join(CATEGORIES)}",
             color=discord.Colour.red()
-        ))
-
-    sorted_users = sorted(
-        USERS.items(),
-        key=lambda x: x[1]["balance"] if category == "balance" else x[1]["stats"][category],
-        reverse=True
-    )[:10]
+        )
 
+    # Names resolve per guild, so only the ranking is shared; the text is built for each render
     desc = ""
-    for i, (uid, data) in enumerate(sorted_users, start=1):
-        member = ctx.guild.get_member(int(uid))
-        name = member.display_name if member else f"User {uid}"
-        stat = data["balance"] if category == "balance" else data["stats"][category]
+    top = rankings.top(category, LEADERBOARD_SIZE, partition(guild))
+    display = await names.resolve(guild or bot.get_guild(HOME_GUILD_ID), [discord_id(key) for key, _ in top])
+    for i, (key, stat) in enumerate(top, start=1):
+        name = display[discord_id(key)]
         if category in ["balance","spent","won","lost"]:
             desc += f"**{i}. {name}** — {format_currency(stat)}\n"
         else:
             desc += f"**{i}. {name}** — {stat}\n"
 
-    await ctx.send(embed=discord.Embed(
+    embed = discord.Embed(
         title=f"🏆 Leaderboard: {category.title()}",
         description=desc,
         color=discord.Colour.gold()
-    ))
+    )
+    rank = rankings.rank(category, member_key(guild, viewer_id))
+    if rank:
+        embed.set_footer(text=f"Your rank: #{rank} of {rankings.size(partition(guild))}")
+    return embed
+
+@bot.command(name="leaderboard")
+async def leaderboard(ctx, category: str = "balance"):
+    """Show top 10 users by a category (balance/stats)."""
+    await reply(ctx.send, await leaderboard_embed(ctx.guild, ctx.author.id, category))
+
+@tree.command(name="leaderboard", description="Show the top 10 users by balance or a stat.")
+@app_commands.guild_only()
+@app_commands.choices(category=[app_commands.Choice(name=c, value=c) for c in CATEGORIES])
+async def leaderboard_slash(interaction: discord.Interaction, category: str = "balance"):
+    await interaction.response.defer(thinking=True)
+    await reply(interaction.followup.send, await leaderboard_embed(interaction.guild, interaction.user.id, category))
+
+async def global_leaderboard_embed(category):
+    if category not in CATEGORIES:
+        return f"❌ Invalid category. Choose from: {', '.join(CATEGORIES)}"
+    top = await ask_coordinator("global_top", {"category": category, "k": LEADERBOARD_SIZE})
+    if isinstance(top, str):
+        return top
+    # Every guild keeps its own accounts, so each row is one account in one guild, named by the shard that owns it
+    desc = ""
+    for i, (shard, key, stat, name, guild_name) in enumerate(top, start=1):
+        value = format_currency(stat) if category in ["balance","spent","won","lost"] else stat
+        desc += f"**{i}. {name}** ({guild_name}) — {value}\n"
+    return discord.Embed(
+        title=f"🌐 Global Leaderboard: {category.title()}",
+        description=desc or "No users yet.",
+        color=discord.Colour.gold()
+    )
+
+@bot.command(name="globalleaderboard")
+async def global_leaderboard(ctx, category: str = "balance"):
+    """Show the top 10 users across every shard."""
+    await reply(ctx.send, await global_leaderboard_embed(category))
 
 # =============================
 # Admin Check Utility
 # =============================
 def is_admin(ctx):
     """Check if a user is an admin (ID or Discord perms)."""
-    return ctx.author.id == ADMIN_ID or ctx.author.guild_permissions.administrator
+    return is_admin_member(ctx.author)
+
+def is_admin_member(member):
+    # Users in DMs aren't guild members and have no guild permissions
+    permissions = getattr(member, "guild_permissions", None)
+    return member.id == ADMIN_ID or bool(permissions and permissions.administrator)
 
 # =============================
 # Admin Commands — Matchups
@@ -274,21 +866,24 @@ async def add_matchup(ctx, kind: str, title: str, home: str = None, away: str =
     if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
 
     mid = gen_id("m")
-    MATCHUPS[mid] = {
-        "id": mid,
-        "type": kind,
-        "title": title,
-        "home": home,
-        "away": away,
-        "spread": spread,
-        "overunder": overunder,
-        "bets": {},
-        "locked": False,
-        "settled": False,
-        "result": None,
-        "start_time": (datetime.utcnow() + timedelta(hours=1)).isoformat()
-    }
-    save_matchups()
+    MATCHUPS[mid] = Matchup(
+        id=mid,
+        guild_id=partition(ctx.guild),
+        type=kind,
+        title=title,
+        home=home,
+        away=away,
+        spread=spread,
+        overunder=overunder,
+        bets={},
+        locked=False,
+        settled=False,
+        result=None,
+        start_time=int(time.time()) + 3600
+    )
+    catalog.add(MATCHUPS[mid])
+    lock_scheduler.schedule(mid, lock_deadline(MATCHUPS[mid]))
+    record("matchup_added", ("matchups", mid))
 
     await ctx.send(embed=discord.Embed(
         title="✅ Matchup Created",
@@ -300,7 +895,7 @@ async def add_matchup(ctx, kind: str, title: str, home: str = None, away: str =
 async def edit_matchup(ctx, matchup_id: str, field: str, *, value: str):
     """Edit matchup field (title, home, away, spread, overunder, type)."""
     if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
-    matchup = MATCHUPS.get(matchup_id)
+    matchup = find_matchup(partition(ctx.guild), matchup_id)
     if not matchup: return await ctx.send("❌ Matchup not found.")
     if field not in ["title", "home", "away", "spread", "overunder", "type"]:
         return await ctx.send("❌ Invalid field. Allowed: title, home, away, spread, overunder, type.")
@@ -310,7 +905,8 @@ async def edit_matchup(ctx, matchup_id: str, field: str, *, value: str):
         except ValueError: return await ctx.send("❌ Spread/Overunder must be a number.")
 
     matchup[field] = value
-    save_matchups()
+    catalog.update(matchup)
+    record("matchup_edited", ("matchups", matchup_id, field))
     await ctx.send(embed=discord.Embed(
         title="✅ Matchup Updated",
         description=f"{field} set to `{value}` for {matchup['title']}",
@@ -321,9 +917,17 @@ async def edit_matchup(ctx, matchup_id: str, field: str, *, value: str):
 async def remove_matchup(ctx, matchup_id: str):
     """Delete a matchup."""
     if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
-    matchup = MATCHUPS.pop(matchup_id, None)
+    async with locks.hold(matchups=[matchup_id]):
+        matchup = find_matchup(partition(ctx.guild), matchup_id)
+        if matchup:
+            del MATCHUPS[matchup_id]
+            catalog.remove(matchup_id)
+            record("matchup_removed", ("matchups", matchup_id))
     if not matchup: return await ctx.send("❌ Matchup not found.")
-    save_matchups()
+    lock_scheduler.cancel(matchup_id)
+    volumes.discard(matchup_id)
+    quotes.forget(matchup_id)
+    numeric_props.pop(matchup_id)
     await ctx.send(embed=discord.Embed(
         title="✅ Matchup Removed",
         description=f"Removed matchup: {matchup['title']}",
@@ -334,10 +938,13 @@ async def remove_matchup(ctx, matchup_id: str):
 async def lock_matchup(ctx, matchup_id: str):
     """Lock a matchup to prevent further bets."""
     if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
-    matchup = MATCHUPS.get(matchup_id)
+    matchup = find_matchup(partition(ctx.guild), matchup_id)
     if not matchup: return await ctx.send("❌ Matchup not found.")
-    matchup["locked"] = True
-    save_matchups()
+    async with locks.hold(matchups=[matchup_id]):
+        matchup["locked"] = True
+        catalog.update(matchup)
+        lock_scheduler.cancel(matchup_id)
+        record("matchup_locked", ("matchups", matchup_id, "locked"))
     await ctx.send(embed=discord.Embed(
         title="🔒 Matchup Locked",
         description=f"Betting is now locked for {matchup['title']}.",
@@ -349,97 +956,139 @@ async def settle_matchup(ctx, matchup_id: str, winning_selection: str):
     """Settle a matchup and pay winners."""
     if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
 
-    matchup = MATCHUPS.get(matchup_id)
+    # Hold the matchup so no bet can slip in while it is being paid out
+    async with locks.hold(matchups=[matchup_id]):
+        matchup = find_matchup(partition(ctx.guild), matchup_id)
+        if not matchup: return await ctx.send("❌ Matchup not found.")
+        if matchup["settled"]: return await ctx.send("❌ Already settled.")
+
+        settlement = grade_matchup(matchup, winning_selection)
+        await settler.commit(settlement)
+        numeric_props.pop(matchup_id)
+        await spill_history(settlement.by_user)
+        parlay_settlement = await settle_parlay_legs(matchup, winning_selection)
+        # Flagged only once every payout is committed, so a failed commit leaves the matchup settleable
+        matchup["settled"] = True
+        matchup["result"] = {"winner": winning_selection.upper()}
+        matchup["settled_at"] = int(time.time())
+        catalog.update(matchup)
+        # Logged last so a crash mid-settle leaves the matchup open to be settled again
+        record("matchup_settled", ("matchups", matchup_id, "settled"), ("matchups", matchup_id, "result"),
+               ("matchups", matchup_id, "settled_at"))
+    archive_settled_matchups()
+
+    lines = [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)} on {matchup['title']}!" for bet, payout in settlement.winners]
+    lines += [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)} on a parlay!" for bet, payout in parlay_settlement.winners]
+    await announce(payout_channel(ctx), f"🏁 Matchup Settled: {matchup['title']}", lines, "Nobody won this time!")
+
+@bot.command(name="previewsettle")
+async def preview_settle(ctx, matchup_id: str, *, result):
+    """Show the payout liability of a result without settling."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    matchup = find_matchup(partition(ctx.guild), matchup_id)
     if not matchup: return await ctx.send("❌ Matchup not found.")
     if matchup["settled"]: return await ctx.send("❌ Already settled.")
+    if matchup.get("prop_type") == "numeric":
+        try: float(result)
+        except ValueError: return await ctx.send("❌ Result must be a number for this prop.")
 
-    matchup["settled"] = True
-    matchup["result"] = {"winner": winning_selection.upper()}
-
-    payout_messages = []
-    for bet_id, bet in list(matchup["bets"].items()):
-        user = get_user(bet["user_id"])
-        if bet["selection"].upper() == winning_selection.upper():
-            payout = calculate_payout(bet)
-            user["balance"] += payout
-            bet["payout"] = payout
-            user["stats"]["won"] += payout
-            user["stats"]["bets_won"] += 1
-            payout_messages.append(f"<@{bet['user_id']}> won {format_currency(payout)} on {matchup['title']}!")
-        else:
-            user["stats"]["lost"] += bet["amount"]
-            user["stats"]["bets_lost"] += 1
-            bet["payout"] = 0
-        bet["resolved"] = True
-        user["history"].append(bet)
-        del user["bets"][bet_id]
+    settlement = grade_matchup(matchup, result)
+    await ctx.send(embed=discord.Embed(
+        title=f"🧮 Settlement Preview: {matchup['title']}",
+        description=f"If the result is **{result}**:\n{settlement.summary(format_currency)}",
+        color=discord.Colour.orange()
+    ))
 
-    save_users()
-    save_matchups()
+LIABILITY_CURVE_MAX_POINTS = 25
 
-    msg = "\n".join(payout_messages) if payout_messages else "Nobody won this time!"
+@bot.command(name="liabilitycurve")
+async def liability_curve(ctx, matchup_id: str, low: float, high: float, points: int = 11):
+    """Show the total payout of a numeric prop across a range of possible results."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    matchup = find_matchup(partition(ctx.guild), matchup_id)
+    if not matchup: return await ctx.send("❌ Matchup not found.")
+    if matchup.get("prop_type") != "numeric": return await ctx.send("❌ Liability curves are for numeric props.")
+    if matchup["settled"]: return await ctx.send("❌ Already settled.")
+    points = min(max(points, 2), LIABILITY_CURVE_MAX_POINTS)
+    if high < low: low, high = high, low
+
+    book = numeric_props.book(matchup_id)
+    # Bets keep landing in the book while the thread prices it, so it works on a copy
+    grouped, bet_count, staked = book.grouped(), len(book), book.staked()
+    results = [low + (high - low) * i / (points - 1) for i in range(points)]
+    curve, worst = await asyncio.to_thread(lambda: (liability_curve(grouped, results), worst_case(grouped, low, high)))
+    desc = "\n".join(f"• {result:g}: {format_currency(payout)} "
+                     f"(house {'+' if staked >= payout else '-'}{format_currency(abs(staked - payout))})"
+                     for result, payout in curve)
     embed = discord.Embed(
-        title=f"🏁 Matchup Settled: {matchup['title']}",
-        description=msg,
-        color=discord.Colour.green()
+        title=f"📈 Liability Curve: {matchup['title']}",
+        description=desc,
+        color=discord.Colour.orange()
     )
-    channel = ctx.guild.get_channel(PAYOUT_CHANNEL_ID) if PAYOUT_CHANNEL_ID else ctx.channel
-    await channel.send(embed=embed)
+    embed.set_footer(text=f"{bet_count} bets, {format_currency(staked)} staked. "
+                          f"{'⚠️ ' if worst[1] > staked else ''}Worst case: {worst[0]:g} pays {format_currency(worst[1])}")
+    await ctx.send(embed=embed)
 
 # =============================
 # User Commands — Betting
 # =============================
 
+async def place_bet(uid, matchup_id, selection, amount):
+    async with locks.hold(users=[uid], matchups=[matchup_id]):
+        user = get_user(uid)
+        if amount <= 0 or user["balance"] < amount:
+            return "❌ Invalid bet amount."
+
+        matchup = find_matchup(key_partition(uid), matchup_id)
+        if not matchup: return "❌ Matchup not found."
+        if matchup["type"] == "prop": return "❌ That's a prop bet, place it with !betprop."
+        if betting_closed(matchup): return "❌ Betting is locked for this matchup."
+
+        odds = quote_odds(matchup, selection)
+
+        user["balance"] -= amount
+        bet_id = gen_id("b")
+        bet_obj = Bet(
+            id=bet_id,
+            user_id=uid,
+            matchup_id=matchup_id,
+            kind=matchup["type"],
+            selection=intern_selection(selection.upper()),
+            amount=amount,
+            odds=odds,
+            placed_at=int(time.time()),
+            resolved=False,
+            payout=None
+        )
+        user["bets"][bet_id] = bet_obj
+        matchup["bets"][bet_id] = bet_obj
+        volumes.add(matchup_id, bet_obj)
+        user["stats"]["spent"] += amount
+        awards = events.publish("bet_placed", user=user, bet=bet_obj)
+
+        record("bet_placed", ("users", uid, "balance"), ("users", uid, "stats", "spent"),
+               ("users", uid, "bets", bet_id), ("matchups", matchup_id, "bets", bet_id), *reward_paths(uid, awards))
+
+    return with_awards(discord.Embed(
+        title="🎟️ Bet Slip",
+        description=f"Matchup: {matchup['title']}\nPick: **{selection.upper()}**\nWager: {format_currency(amount)}\nOdds: {odds:.2f}",
+        color=discord.Colour.blue()
+    ), awards)
+
 @bot.command(name="bet")
 async def bet(ctx, matchup_id: str, selection: str, amount: int):
     """Place a bet on a matchup."""
-    user = get_user(str(ctx.author.id))
-    if amount <= 0 or user["balance"] < amount:
-        return await ctx.send("❌ Invalid bet amount.")
-
-    matchup = MATCHUPS.get(matchup_id)
-    if not matchup: return await ctx.send("❌ Matchup not found.")
-    if matchup["locked"]: return await ctx.send("❌ Betting is locked for this matchup.")
-
-    odds_data = calculate_dynamic_moneylines(matchup)
-    odds = 1.9  # default
-    if selection.upper() == matchup["home"].upper(): odds = implied_decimal_from_moneyline(odds_data["home_ml"])
-    elif selection.upper() == matchup["away"].upper(): odds = implied_decimal_from_moneyline(odds_data["away_ml"])
-
-    user["balance"] -= amount
-    bet_id = gen_id("b")
-    bet_obj = {
-        "id": bet_id,
-        "user_id": str(ctx.author.id),
-        "matchup_id": matchup_id,
-        "kind": matchup["type"],
-        "selection": selection.upper(),
-        "amount": amount,
-        "odds": odds,
-        "placed_at": datetime.utcnow().isoformat(),
-        "resolved": False,
-        "payout": None
-    }
-    user["bets"][bet_id] = bet_obj
-    matchup["bets"][bet_id] = bet_obj
-    user["stats"]["spent"] += amount
+    await reply(ctx.send, await place_bet(member_key(ctx.guild, ctx.author.id), matchup_id, selection, amount))
 
-    save_users()
-    save_matchups()
-
-    await ctx.send(embed=discord.Embed(
-        title="🎟️ Bet Slip",
-        description=f"Matchup: {matchup['title']}\nPick: **{selection.upper()}**\nWager: {format_currency(amount)}\nOdds: {odds:.2f}",
-        color=discord.Colour.blue()
-    ))
+@tree.command(name="bet", description="Place a bet on a matchup.")
+async def bet_slash(interaction: discord.Interaction, matchup_id: str, selection: str, amount: int):
+    await interaction.response.defer(thinking=True)
+    await reply(interaction.followup.send, await place_bet(member_key(interaction.guild, interaction.user.id), matchup_id, selection, amount))
 
-@bot.command(name="pending")
-async def pending(ctx, member: discord.Member = None):
-    """View pending bets for a user."""
-    member = member or ctx.author
-    user = get_user(str(member.id))
+def pending_embed(guild, member):
+    user = get_user(member_key(guild, member.id))
     if not user["bets"]:
-        return await ctx.send(f"{member.display_name} has no pending bets.")
+        return f"{member.display_name} has no pending bets."
 
     desc = ""
     for b in user["bets"].values():
@@ -447,133 +1096,125 @@ async def pending(ctx, member: discord.Member = None):
         matchup_title = matchup["title"] if matchup else "Parlay"
         desc += f"• {b['selection']} on {matchup_title} ({format_currency(b['amount'])})\n"
 
-    await ctx.send(embed=discord.Embed(
+    return discord.Embed(
         title=f"📋 Pending Bets: {member.display_name}",
         description=desc,
         color=discord.Colour.orange()
-    ))
+    )
+
+@bot.command(name="pending")
+async def pending(ctx, member: discord.Member = None):
+    """View pending bets for a user."""
+    await reply(ctx.send, pending_embed(ctx.guild, member or ctx.author))
+
+@tree.command(name="pending", description="View your pending bets or another user's.")
+async def pending_slash(interaction: discord.Interaction, member: discord.Member = None):
+    await interaction.response.defer(thinking=True)
+    await reply(interaction.followup.send, pending_embed(interaction.guild, member or interaction.user))
 
 # =============================
 # User Command — Parlay
 # =============================
-@bot.command(name="parlay")
-async def parlay(ctx):
-    """Let users create a parlay bet (2-5 legs)."""
-    user = get_user(str(ctx.author.id))
-
-    # Step 1: List open matchups
-    open_matchups = [m for m in MATCHUPS.values() if not m["locked"] and not m["settled"]]
-    if not open_matchups: return await ctx.send("❌ No open matchups available for parlays.")
-
-    desc = "\n".join([f"{i+1}. {m['home']} vs {m['away']} (Type: {m['type']})" if m.get("home") else f"{i+1}. {m['title']} (Type: {m['type']})" for i, m in enumerate(open_matchups)])
-    await ctx.send(embed=discord.Embed(title="📋 Open Matchups", description=desc, color=discord.Colour.blurple()))
+PARLAY_BUILDER_PROMPT = "🎟️ Build your parlay: choose 2–5 matchups, pick a side for each, then enter your stake."
+
+def parlay_builder(guild, owner_id):
+    """A ParlayBuilder over the guild's open matchups that can be legs, or an error string if there aren't enough of them."""
+    open_matchups = [m for m in catalog.open_for(partition(guild)) if parlay_sides(m)]
+    if len(open_matchups) < 2: return "❌ Not enough open matchups available for parlays."
+    uid = member_key(guild, owner_id)
+    return ParlayBuilder(owner_id, open_matchups, lambda picks, amount: place_parlay(uid, picks, amount))
+
+async def place_parlay(uid, picks, amount):
+    """Place a parlay from ``[(matchup_id, selection), ...]`` picks."""
+    if not 2 <= len(picks) <= 5: return "❌ Parlays must have 2–5 legs."
+    # Everything is checked under the locks since the balance and the legs
+    # may have changed while the builder was open
+    async with locks.hold(users=[uid], matchups=[mid for mid, _ in picks]):
+        user = get_user(uid)
+        if amount <= 0 or amount > user["balance"]: return "❌ Invalid stake amount."
+        legs = []
+        for mid, sel in picks:
+            m = find_matchup(key_partition(uid), mid)
+            if not m or m["settled"] or betting_closed(m):
+                return "❌ One of your legs is no longer open for betting."
+            sides = parlay_sides(m)
+            if not sides: return f"❌ {m['title']} can't be a parlay leg."
+            if sel.upper() not in {side.upper() for side in sides}:
+                return f"❌ Pick one of {', '.join(sides)} for {m['title']}."
+            legs.append(ParlayLeg(matchup_id=mid, selection=intern_selection(sel.upper()), odds=quote_odds(m, sel)))
+
+        user["balance"] -= amount
+        bet_id = gen_id("b")
+        parlay_bet = Bet(
+            id=bet_id,
+            user_id=uid,
+            matchup_id=None,
+            kind="parlay",
+            selection=legs,
+            amount=amount,
+            odds=None,  # calculated from legs
+            placed_at=int(time.time()),
+            resolved=False,
+            payout=None
+        )
+        user["bets"][bet_id] = parlay_bet
+        parlays.add(parlay_bet)
+        awards = events.publish("bet_placed", user=user, bet=parlay_bet)
+        record("bet_placed", ("users", uid, "balance"), ("users", uid, "bets", bet_id), *reward_paths(uid, awards))
 
-    # Step 2: Ask for leg numbers
-    await ctx.send("Enter the numbers of the matchups you want in your parlay (2-5), separated by commas:")
-    try:
-        msg = await bot.wait_for("message", check=lambda m: m.author == ctx.author, timeout=60)
-        indices = [int(x.strip()) - 1 for x in msg.content.split(",")]
-        if not 2 <= len(indices) <= 5: return await ctx.send("❌ Parlays must have 2–5 legs.")
-    except Exception:
-        return await ctx.send("❌ Invalid input or timed out.")
-
-    selected_matchups = [open_matchups[i] for i in indices]
-
-    # Step 3: Ask selection for each leg
-    legs = []
-    for m in selected_matchups:
-        teams = [m['home'], m['away']] if m.get("home") else ["Option1", "Option2"]
-        await ctx.send(f"Select for **{m['title']}**:\n{teams[0]} or {teams[1]}?")
-        try:
-            msg = await bot.wait_for("message", check=lambda m: m.author == ctx.author, timeout=60)
-            sel = msg.content.strip().upper()
-            if sel not in [t.upper() for t in teams]: return await ctx.send("❌ Invalid selection.")
-            odds_data = calculate_dynamic_moneylines(m)
-            odds = implied_decimal_from_moneyline(odds_data["home_ml"]) if sel.upper() == m["home"].upper() else implied_decimal_from_moneyline(odds_data["away_ml"])
-            legs.append({"matchup_id": m["id"], "selection": sel, "odds": odds})
-        except Exception:
-            return await ctx.send("❌ Timed out or error in selection.")
-
-    # Step 4: Ask for total stake
-    await ctx.send(f"Enter your total stake (you have {format_currency(user['balance'])}):")
-    try:
-        msg = await bot.wait_for("message", check=lambda m: m.author == ctx.author, timeout=60)
-        amount = int(msg.content.strip())
-        if amount <= 0 or amount > user["balance"]: return await ctx.send("❌ Invalid stake amount.")
-    except Exception:
-        return await ctx.send("❌ Invalid input or timed out.")
-
-    # Step 5: Deduct balance, record bet
-    user["balance"] -= amount
-    bet_id = gen_id("b")
-    parlay_bet = {
-        "id": bet_id,
-        "user_id": str(ctx.author.id),
-        "matchup_id": None,
-        "kind": "parlay",
-        "selection": legs,
-        "amount": amount,
-        "odds": None,  # calculated from legs
-        "placed_at": datetime.utcnow().isoformat(),
-        "resolved": False,
-        "payout": None
-    }
-    user["bets"][bet_id] = parlay_bet
-    save_users()
-
-    # Step 6: Calculate combined odds
     combined_odds = math.prod([leg["odds"] for leg in legs])
-
-    # Step 7: Send confirmation
     desc = "\n".join([f"• {leg['selection']} on {MATCHUPS.get(leg['matchup_id'], {}).get('title','Prop Bet')} (Odds: {leg['odds']:.2f})" for leg in legs])
     embed = discord.Embed(title="🎟️ Parlay Bet Slip", description=desc, color=discord.Colour.blue())
     embed.add_field(name="Stake", value=format_currency(amount))
     embed.add_field(name="Combined Odds", value=f"{combined_odds:.2f}")
     embed.set_footer(text=f"Bet ID: {bet_id}")
-    await ctx.send(embed=embed)
+    return with_awards(embed, awards)
+
+@bot.command(name="parlay")
+async def parlay(ctx):
+    """Let users create a parlay bet (2-5 legs)."""
+    builder = parlay_builder(ctx.guild, ctx.author.id)
+    if isinstance(builder, str): return await ctx.send(builder)
+    await ctx.send(PARLAY_BUILDER_PROMPT, view=builder)
+
+@tree.command(name="parlay", description="Build a parlay bet (2-5 legs).")
+async def parlay_slash(interaction: discord.Interaction):
+    builder = parlay_builder(interaction.guild, interaction.user.id)
+    if isinstance(builder, str):
+        return await interaction.response.send_message(builder, ephemeral=True)
+    await interaction.response.send_message(PARLAY_BUILDER_PROMPT, view=builder, ephemeral=True)
 
 # =============================
 # Extras — Achievements / Weekly
 # =============================
-def check_achievements(user, bet):
-    if "First Bet" not in user["achievements"]: user["achievements"].append("First Bet")
-
-WEEKLY_CHALLENGE_PAYOUT = 150
-
 @bot.command(name="weekly")
 async def weekly(ctx):
     """Track weekly challenge progress."""
-    user = get_user(str(ctx.author.id))
-    week_start = datetime.utcnow() - timedelta(days=datetime.utcnow().weekday())
-    if not user.get("weekly") or datetime.fromisoformat(user.get("weekly", {}).get("week_start","1970-01-01")) < week_start:
-        user["weekly"] = {"week_start": week_start.isoformat(), "progress": {"bets": 0}, "claimed_this_week": False}
-    save_users()
-
-    progress = user["weekly"]["progress"]["bets"]
-    desc = f"Bets Placed: {progress}/5\n"
-    if progress >= 5 and not user["weekly"]["claimed_this_week"]:
-        user["balance"] += WEEKLY_CHALLENGE_PAYOUT
-        user["weekly"]["claimed_this_week"] = True
-        desc += f"✅ Challenge Complete! You earned {format_currency(WEEKLY_CHALLENGE_PAYOUT)}"
-        save_users()
-
-    await ctx.send(embed=discord.Embed(
-        title=f"📅 Weekly Challenge — {ctx.author.display_name}",
-        description=desc,
+    user = USERS.get(member_key(ctx.guild, ctx.author.id))  # a read: never creates, rolls over or saves the user
+    lines = []
+    for rule, progress, claimed in rule_engine.weekly_view(user):
+        reward = format_currency(rule.get("reward", 0))
+        if claimed:
+            lines.append(f"✅ {rule['description']} — earned {reward}")
+        else:
+            lines.append(f"• {rule['description']}: {min(progress, rule['goal'])}/{rule['goal']} ({reward})")
+    embed = discord.Embed(
+        title=f"📅 Weekly Challenges — {ctx.author.display_name}",
+        description="\n".join(lines) + "\nRewards are paid as soon as a goal is reached.",
         color=discord.Colour.teal()
-    ))
+    )
+    earned = user["achievements"] if user else []
+    embed.add_field(name=f"Achievements ({len(earned)}/{len(ACHIEVEMENTS)})", value=", ".join(earned) or "None yet.", inline=False)
+    await ctx.send(embed=embed)
 
 @bot.command(name="volume")
 async def volume(ctx, matchup_id: str):
     """Show betting volume for a matchup."""
-    matchup = MATCHUPS.get(matchup_id)
+    matchup = find_matchup(partition(ctx.guild), matchup_id)
     if not matchup: return await ctx.send("❌ Matchup not found.")
 
-    total = sum(b["amount"] for b in matchup["bets"].values())
-    desc = f"Total Bet Volume: {format_currency(total)}\n"
-    by_sel = {}
-    for b in matchup["bets"].values(): by_sel[b["selection"]] = by_sel.get(b["selection"], 0) + b["amount"]
-    for sel, amt in by_sel.items(): desc += f"• {sel}: {format_currency(amt)}\n"
+    desc = f"Total Bet Volume: {format_currency(volumes.total(matchup_id))}\n"
+    for sel, amt in volumes.by_selection(matchup_id).items(): desc += f"• {sel}: {format_currency(amt)}\n"
 
     await ctx.send(embed=discord.Embed(
         title=f"📊 Bet Volume: {matchup['title']}",
@@ -581,6 +1222,90 @@ async def volume(ctx, matchup_id: str):
         color=discord.Colour.purple()
     ))
 
+@bot.command(name="volumecheck")
+async def volume_check(ctx):
+    """Admin verifies the running volume totals against the stored bets."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    drifted = volumes.verify(MATCHUPS)
+    if not drifted:
+        return await ctx.send("✅ Volume totals match the stored bets.")
+    volumes.rebuild(MATCHUPS)
+    await ctx.send(f"⚠️ Rebuilt volume totals for {len(drifted)} matchup(s): {', '.join(drifted[:20])}")
+
+@bot.command(name="reprice")
+async def reprice(ctx, engine: str = None):
+    """Admin reprices every open matchup, optionally switching odds engine."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    if engine is not None and engine not in ENGINES:
+        return await ctx.send(f"❌ Unknown odds engine. Choose from: {', '.join(ENGINES)}")
+    count = quotes.reprice(catalog.open(), ENGINES[engine]() if engine else None)
+    await ctx.send(f"✅ Repriced {count} open matchup(s) with the {quotes.engine.name} engine.")
+
+@bot.command(name="perf")
+async def perf(ctx):
+    """Admin view of command latency, persistence, GitHub sync and settlement costs."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    ms = lambda seconds: f"{seconds * 1000:.1f}ms"
+
+    commands_by_count = sorted(metrics.histograms("sportsbook_command_seconds").items(), key=lambda item: -item[1].count)
+    command_lines = [f"`{dict(labels)['command']}` ({dict(labels)['via']}): {h.count} calls, "
+                     f"p50 {ms(h.quantile(0.5))}, p95 {ms(h.quantile(0.95))}, max {ms(h.max)}"
+                     for labels, h in commands_by_count[:10]]
+    persist = list(metrics.histograms("sportsbook_persist_seconds").values())
+    persist_count = sum(h.count for h in persist)
+    io = storage.stats
+    gh = github_sync.stats
+    settle = metrics.histograms("sportsbook_settle_seconds_per_bet").get(())
+    cache = names.stats()
+
+    embed = discord.Embed(title="⏱️ Performance", color=discord.Colour.dark_grey())
+    embed.add_field(name="Commands", value="\n".join(command_lines) or "No commands timed yet.", inline=False)
+    embed.add_field(name="Persistence", value=(
+        f"{persist_count} changes, avg {ms(sum(h.sum for h in persist) / max(1, persist_count))}\n"
+        f"Serialize {io['serialize_seconds']:.2f}s / write {io['write_seconds']:.2f}s, {io['bytes_written'] / 1e6:.1f} MB written\n"
+        f"Ledger backlog: {storage.pending}"), inline=False)
+    embed.add_field(name="GitHub Sync", value=(
+        f"{gh['pushes']} pushes ({gh['push_failures']} failed), {gh['api_calls']} API calls, {gh['bytes_pushed'] / 1e6:.1f} MB\n"
+        f"Serialize {gh['serialize_seconds']:.2f}s / network {gh['network_seconds']:.2f}s\n"
+        f"Rate limit: {gh['ratelimit_remaining'] if gh['ratelimit_remaining'] is not None else '?'}/{gh['ratelimit_limit'] or '?'}, "
+        f"queue {github_sync.queue_depth()}, lag {github_sync.lag():.1f}s{' (failing)' if github_sync.failing() else ''}"), inline=False)
+    embed.add_field(name="Settlement", value=(
+        f"{settle.count} settlements, p50 {settle.quantile(0.5) * 1e6:.0f}µs per bet" if settle else "No settlements yet."))
+    embed.add_field(name="Name Cache", value=f"{cache['entries']} entries, {cache['hits']} hits / {cache['misses']} misses, {cache['fetches']} fetches")
+    gate = admission.stats
+    embed.add_field(name="Admission", value=(
+        f"{gate['admitted']} admitted, {gate['rejected_user'] + gate['rejected_global']} throttled "
+        f"({gate['rejected_global']} global), {gate['shed']} shed"))
+    await ctx.send(embed=embed)
+
+@bot.command(name="shards")
+async def shards(ctx):
+    """Admin view of every shard process's state."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    results = await ask_coordinator("broadcast", {"method": "stats"})
+    if isinstance(results, str): return await ctx.send(results)
+    embed = discord.Embed(title="🧩 Shards", color=discord.Colour.dark_grey())
+    for shard, status in sorted(results.items(), key=lambda item: int(item[0])):
+        embed.add_field(name=f"Shard {shard}", value=f"❌ {status['error']}" if "error" in status else (
+            f"{'ready' if status['ready'] else 'loading'}, {status['users']} users, {status['matchups']} matchups\n"
+            f"ledger {status['ledger_pending']}, sync queue {status['sync_queue']}"))
+    await ctx.send(embed=embed)
+
+@bot.command(name="globallock")
+async def global_lock(ctx, *, match: str = ""):
+    """Admin locks open matchups on every shard, optionally only titles containing some text."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    results = await ask_coordinator("broadcast", {"method": "lock", "params": {"match": match}})
+    if isinstance(results, str): return await ctx.send(results)
+    failed = [shard for shard, locked in results.items() if isinstance(locked, dict)]
+    total = sum(len(locked) for locked in results.values() if isinstance(locked, list))
+    await ctx.send(embed=discord.Embed(
+        title="🔒 Matchups Locked on Every Shard",
+        description=f"Locked {total} open matchup(s) across {len(results) - len(failed)} shard(s)."
+                    + (f"\n⚠️ No answer from shard(s): {', '.join(failed)}" if failed else ""),
+        color=discord.Colour.red()
+    ))
+
 # =============================
 # Admin Commands — Money Management
 # =============================
@@ -591,9 +1316,10 @@ async def add_money(ctx, member: discord.Member, amount: int):
         return await ctx.send("❌ You are not an admin.")
     if amount <= 0: 
         return await ctx.send("❌ Amount must be positive.")
-    user = get_user(str(member.id))
+    uid = member_key(ctx.guild, member.id)
+    user = get_user(uid)
     user["balance"] += amount
-    save_users()
+    record("admin_adjust", ("users", uid, "balance"))
     await ctx.send(embed=discord.Embed(
         title="✅ Money Added",
         description=f"{format_currency(amount)} added to {member.display_name}. New balance: {format_currency(user['balance'])}",
@@ -607,9 +1333,10 @@ async def remove_money(ctx, member: discord.Member, amount: int):
         return await ctx.send("❌ You are not an admin.")
     if amount <= 0: 
         return await ctx.send("❌ Amount must be positive.")
-    user = get_user(str(member.id))
+    uid = member_key(ctx.guild, member.id)
+    user = get_user(uid)
     user["balance"] = max(user["balance"] - amount, 0)
-    save_users()
+    record("admin_adjust", ("users", uid, "balance"))
     await ctx.send(embed=discord.Embed(
         title="✅ Money Removed",
         description=f"{format_currency(amount)} removed from {member.display_name}. New balance: {format_currency(user['balance'])}",
@@ -626,17 +1353,19 @@ async def add_prop(ctx, prop_type: str, *, question: str):
         return await ctx.send("❌ You are not an admin.")
 
     mid = gen_id("m")
-    MATCHUPS[mid] = {
-        "id": mid,
-        "type": "prop",
-        "prop_type": prop_type.lower(),  # numeric or choice
-        "title": question,
-        "bets": {},
-        "locked": False,
-        "settled": False,
-        "result": None
-    }
-    save_matchups()
+    MATCHUPS[mid] = Matchup(
+        id=mid,
+        guild_id=partition(ctx.guild),
+        type="prop",
+        prop_type=prop_type.lower(),  # numeric or choice
+        title=question,
+        bets={},
+        locked=False,
+        settled=False,
+        result=None
+    )
+    catalog.add(MATCHUPS[mid])
+    record("matchup_added", ("matchups", mid))
 
     await ctx.send(embed=discord.Embed(
         title="✅ Prop Bet Created",
@@ -644,48 +1373,68 @@ async def add_prop(ctx, prop_type: str, *, question: str):
         color=discord.Colour.green()
     ))
 
-@bot.command(name="betprop")
-async def bet_prop(ctx, matchup_id: str, value, amount: int):
-    """Place a bet on a prop matchup."""
-    user = get_user(str(ctx.author.id))
-    if amount <= 0 or user["balance"] < amount:
-        return await ctx.send("❌ Invalid bet amount.")
+async def place_prop_bet(uid, matchup_id, value, amount):
+    async with locks.hold(users=[uid], matchups=[matchup_id]):
+        user = get_user(uid)
+        if amount <= 0 or user["balance"] < amount:
+            return "❌ Invalid bet amount."
 
-    matchup = MATCHUPS.get(matchup_id)
-    if not matchup:
-        return await ctx.send("❌ Matchup not found.")
-    if matchup["locked"] or matchup["settled"]:
-        return await ctx.send("❌ Betting is locked or this prop has been settled.")
+        matchup = find_matchup(key_partition(uid), matchup_id)
+        if not matchup:
+            return "❌ Matchup not found."
+        if matchup["settled"] or betting_closed(matchup):
+            return "❌ Betting is locked or this prop has been settled."
 
-    # numeric prop
-    if matchup.get("prop_type") == "numeric":
-        try: value = float(value)
-        except ValueError: return await ctx.send("❌ You must enter a number for this prop.")
-
-    user["balance"] -= amount
-    bet_id = gen_id("b")
-    bet_obj = {
-        "id": bet_id,
-        "user_id": str(ctx.author.id),
-        "matchup_id": matchup_id,
-        "kind": "prop",
-        "prop_type": matchup.get("prop_type"),
-        "selection": value,
-        "amount": amount,
-        "odds": 1.0,
-        "placed_at": datetime.utcnow().isoformat(),
-        "resolved": False,
-        "payout": None
-    }
-    user["bets"][bet_id] = bet_obj
-    matchup["bets"][bet_id] = bet_obj
-    save_users(); save_matchups()
+        # numeric prop
+        if matchup.get("prop_type") == "numeric":
+            try: value = float(value)
+            except ValueError: return "❌ You must enter a number for this prop."
+        # choice prop with a fixed list of options (set by !importslate)
+        elif matchup.get("options"):
+            value = next((o for o in matchup["options"] if o.lower() == str(value).lower()), None)
+            if value is None: return f"❌ Pick one of: {', '.join(matchup['options'])}."
+
+        odds = quote_odds(matchup, value)
+        user["balance"] -= amount
+        bet_id = gen_id("b")
+        bet_obj = Bet(
+            id=bet_id,
+            user_id=uid,
+            matchup_id=matchup_id,
+            kind="prop",
+            prop_type=matchup.get("prop_type"),
+            selection=intern_selection(value),
+            amount=amount,
+            odds=odds,
+            placed_at=int(time.time()),
+            resolved=False,
+            payout=None
+        )
+        user["bets"][bet_id] = bet_obj
+        matchup["bets"][bet_id] = bet_obj
+        volumes.add(matchup_id, bet_obj)
+        if matchup.get("prop_type") == "numeric":
+            numeric_props.add(matchup_id, bet_obj)
+        awards = events.publish("bet_placed", user=user, bet=bet_obj)
+        record("bet_placed", ("users", uid, "balance"), ("users", uid, "bets", bet_id), ("matchups", matchup_id, "bets", bet_id),
+               *reward_paths(uid, awards))
 
-    await ctx.send(embed=discord.Embed(
+    return with_awards(discord.Embed(
         title="🎟️ Prop Bet Placed",
-        description=f"Question: {matchup['title']}\nYour Pick: **{value}**\nWager: {format_currency(amount)}",
+        description=f"Question: {matchup['title']}\nYour Pick: **{value}**\nWager: {format_currency(amount)}"
+                    + (f"\nOdds: {odds:.2f}" if odds > 1 else ""),
         color=discord.Colour.blue()
-    ))
+    ), awards)
+
+@bot.command(name="betprop")
+async def bet_prop(ctx, matchup_id: str, value, amount: int):
+    """Place a bet on a prop matchup."""
+    await reply(ctx.send, await place_prop_bet(member_key(ctx.guild, ctx.author.id), matchup_id, value, amount))
+
+@tree.command(name="betprop", description="Place a bet on a prop.")
+async def bet_prop_slash(interaction: discord.Interaction, matchup_id: str, value: str, amount: int):
+    await interaction.response.defer(thinking=True)
+    await reply(interaction.followup.send, await place_prop_bet(member_key(interaction.guild, interaction.user.id), matchup_id, value, amount))
 
 @bot.command(name="settleprop")
 async def settle_prop(ctx, matchup_id: str, *, result):
@@ -693,44 +1442,48 @@ async def settle_prop(ctx, matchup_id: str, *, result):
     if not is_admin(ctx):
         return await ctx.send("❌ You are not an admin.")
 
-    matchup = MATCHUPS.get(matchup_id)
-    if not matchup:
-        return await ctx.send("❌ Matchup not found.")
-    if matchup["settled"]:
-        return await ctx.send("❌ Already settled.")
-
-    matchup["settled"] = True
-    matchup["result"] = result
-    payout_messages = []
-
-    for bet_id, bet in matchup["bets"].items():
-        user = get_user(bet["user_id"])
-        payout = 0
+    async with locks.hold(matchups=[matchup_id]):
+        matchup = find_matchup(partition(ctx.guild), matchup_id)
+        if not matchup:
+            return await ctx.send("❌ Matchup not found.")
+        if matchup["settled"]:
+            return await ctx.send("❌ Already settled.")
 
         if matchup.get("prop_type") == "numeric":
-            actual = float(result)
-            predicted = float(bet["selection"])
-            distance = max(1, abs(actual - predicted))
-            payout = int(bet["amount"] * (1 + 100 / distance))
-        else:
-            if str(bet["selection"]).lower() == str(result).lower():
-                payout = bet["amount"] * 2
-
-        bet["payout"] = payout
-        user["balance"] += payout
-        bet["resolved"] = True
-        user["history"].append(bet)
-        del user["bets"][bet_id]
-        payout_messages.append(f"<@{bet['user_id']}> won {format_currency(payout)}!")
-
-    save_users(); save_matchups()
-
-    msg = "\n".join(payout_messages) if payout_messages else "Nobody won this prop."
-    await ctx.send(embed=discord.Embed(
-        title=f"🏁 Prop Bet Settled: {matchup['title']}",
-        description=msg,
-        color=discord.Colour.green()
-    ))
+            try: float(result)
+            except ValueError: return await ctx.send("❌ Result must be a number for this prop.")
+
+        settlement = grade_matchup(matchup, result)
+        await settler.commit(settlement)
+        numeric_props.pop(matchup_id)
+        await spill_history(settlement.by_user)
+        parlay_settlement = await settle_parlay_legs(matchup, result)
+        matchup["settled"] = True
+        matchup["result"] = result
+        matchup["settled_at"] = int(time.time())
+        catalog.update(matchup)
+        record("matchup_settled", ("matchups", matchup_id, "settled"), ("matchups", matchup_id, "result"),
+               ("matchups", matchup_id, "settled_at"))
+    archive_settled_matchups()
+
+    lines = [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)}!" for bet, payout in settlement.winners]
+    lines += [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)} on a parlay!" for bet, payout in parlay_settlement.winners]
+    await announce(ctx.channel, f"🏁 Prop Bet Settled: {matchup['title']}", lines, "Nobody won this prop.")
+
+def payout_channel(ctx):
+    """The payout channel, or where the command ran in guilds without it (every other guild, and DMs)."""
+    return (ctx.guild and ctx.guild.get_channel(PAYOUT_CHANNEL_ID)) or ctx.channel
+
+async def announce(channel, title, lines, empty_message):
+    """Post payout lines as numbered embed pages, spaced out to stay under the channel rate limit."""
+    pages = paginate(lines) or [empty_message]
+    for i, page in enumerate(pages):
+        if i: await asyncio.sleep(ANNOUNCE_INTERVAL_SECONDS)
+        await channel.send(embed=discord.Embed(
+            title=title if len(pages) == 1 else f"{title} ({i + 1}/{len(pages)})",
+            description=page,
+            color=discord.Colour.green()
+        ))
 
 # =============================
 # User Command — View Active Props
@@ -738,7 +1491,7 @@ async def settle_prop(ctx, matchup_id: str, *, result):
 @bot.command(name="props")
 async def props(ctx):
     """List all currently active prop bets."""
-    active_props = [m for m in MATCHUPS.values() if m["type"] == "prop" and not m["locked"] and not m["settled"]]
+    active_props = catalog.open_for(partition(ctx.guild), "prop")
     if not active_props:
         return await ctx.send(embed=discord.Embed(
             title="📋 Active Prop Bets",
@@ -756,6 +1509,136 @@ async def props(ctx):
         color=discord.Colour.blurple()
     ))
 
+# =============================
+# Admin Commands — Bulk Slates
+# =============================
+SLATE_MAX_ROWS = 5000
+
+async def attached_rows(ctx):
+    """Rows of the CSV or JSON file attached to the command, or an error string."""
+    attachment = ctx.message.attachments[0] if ctx.message.attachments else None
+    if not attachment or not attachment.filename.lower().endswith((".csv", ".json")):
+        return "❌ Attach a .csv or .json file."
+    try:
+        rows = read_rows(attachment.filename, await attachment.read())
+    except ValueError as e:
+        return f"❌ Couldn't read {attachment.filename}: {e}"
+    if not rows: return "❌ The file has no rows."
+    if len(rows) > SLATE_MAX_ROWS: return f"❌ At most {SLATE_MAX_ROWS} rows per file."
+    return rows
+
+@bot.command(name="importslate")
+async def import_slate(ctx):
+    """Admin creates every matchup and prop in an attached slate, persisted as one change."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    rows = await attached_rows(ctx)
+    if isinstance(rows, str): return await ctx.send(rows)
+
+    # Nothing is created unless every row is valid
+    entries, errors = parse_slate(rows)
+    if errors:
+        return await ctx.send(embed=discord.Embed(
+            title="❌ Slate Rejected",
+            description=f"Nothing was imported.\n{error_report(errors)}",
+            color=discord.Colour.red()
+        ))
+
+    created = []
+    for entry in entries:
+        mid = gen_id("m")
+        MATCHUPS[mid] = Matchup(id=mid, guild_id=partition(ctx.guild), bets={}, locked=False, settled=False, result=None, **entry)
+        catalog.add(MATCHUPS[mid])
+        if lock_deadline(MATCHUPS[mid]) is not None:
+            lock_scheduler.schedule(mid, lock_deadline(MATCHUPS[mid]))
+        created.append(MATCHUPS[mid])
+    record("slate_imported", *[("matchups", m["id"]) for m in created])
+
+    props_created = sum(m["type"] == "prop" for m in created)
+    pages = paginate([f"• {m['id']} — {m['title']}" for m in created])
+    await ctx.send(embed=discord.Embed(
+        title="✅ Slate Imported",
+        description=f"Created {len(created) - props_created} matchup(s) and {props_created} prop(s).\n{pages[0]}"
+                    + (f"\n...and {len(pages) - 1} more page(s)" if len(pages) > 1 else ""),
+        color=discord.Colour.green()
+    ))
+
+@bot.command(name="importresults")
+async def import_results(ctx):
+    """Admin settles (or, with an empty result, locks) every matchup in an attached results file in one batch."""
+    if not is_admin(ctx): return await ctx.send("❌ You are not an admin.")
+    rows = await attached_rows(ctx)
+    if isinstance(rows, str): return await ctx.send(rows)
+    results, errors = parse_results(rows)
+
+    async with locks.hold(matchups=[mid for mid, _ in results]):
+        for n, (mid, result) in enumerate(results, start=1):
+            matchup = find_matchup(partition(ctx.guild), mid)
+            if not mid: continue
+            if not matchup: errors.append(f"Row {n}: matchup {mid} not found")
+            elif matchup["settled"]: errors.append(f"Row {n}: {mid} is already settled")
+            elif result is not None and matchup.get("prop_type") == "numeric":
+                try: float(result)
+                except ValueError: errors.append(f"Row {n}: {mid} needs a numeric result")
+            elif result is not None and matchup.get("options") and result.lower() not in {o.lower() for o in matchup["options"]}:
+                errors.append(f"Row {n}: {mid} result must be one of {', '.join(matchup['options'])}")
+        if errors:
+            return await ctx.send(embed=discord.Embed(
+                title="❌ Results Rejected",
+                description=f"Nothing was settled.\n{error_report(errors)}",
+                color=discord.Colour.red()
+            ))
+
+        # Grade the whole slate, then pay it out as one settlement
+        locked, settled, settlements = [], [], []
+        for mid, result in results:
+            matchup = MATCHUPS[mid]
+            if result is None:
+                if not matchup["locked"]:
+                    matchup["locked"] = True
+                    lock_scheduler.cancel(mid)
+                    catalog.update(matchup)
+                    locked.append(mid)
+                continue
+            settlements.append(grade_matchup(matchup, result))
+            settled.append((matchup, result))
+        settlement = Settlement.combine(settlements)
+        await settler.commit(settlement)
+        await spill_history(settlement.by_user)
+
+        decided, graded_paths = [], []
+        for matchup, result in settled:
+            numeric_props.pop(matchup["id"])
+            parlay_decided, parlay_paths = grade_parlay_legs(matchup, result)
+            decided += parlay_decided
+            graded_paths += parlay_paths
+        if graded_paths:
+            record("parlay_legs_graded", *graded_paths)
+        parlay_settlement = Settlement(None, decided)
+        await settler.commit(parlay_settlement)
+        await spill_history(parlay_settlement.by_user)
+
+        settled_at = int(time.time())
+        for matchup, result in settled:
+            matchup["settled"] = True
+            matchup["result"] = result if matchup["type"] == "prop" else {"winner": result.upper()}
+            matchup["settled_at"] = settled_at
+            catalog.update(matchup)
+        # Logged last so a crash mid-batch leaves the slate open to be settled again
+        record("slate_settled", *[("matchups", mid, "locked") for mid in locked],
+               *[("matchups", m["id"], field) for m, _ in settled for field in ("settled", "result", "settled_at")])
+    archive_settled_matchups()
+
+    titles = {m["id"]: m["title"] for m, _ in settled}
+    lines = [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)} on {titles[bet['matchup_id']]}!" for bet, payout in settlement.winners]
+    lines += [f"<@{discord_id(bet['user_id'])}> won {format_currency(payout)} on a parlay!" for bet, payout in parlay_settlement.winners]
+    await ctx.send(embed=discord.Embed(
+        title="🏁 Results Imported",
+        description=f"Settled {len(settled)} and locked {len(locked)} matchup(s).\n{settlement.summary(format_currency)}",
+        color=discord.Colour.green()
+    ))
+    if settled:
+        await announce(payout_channel(ctx), f"🏁 Slate Settled: {len(settled)} matchup(s)", lines, "Nobody won this time!")
+
 # =============================
 # Help Commands
 # =============================
@@ -773,9 +1656,36 @@ async def admin_help(ctx):
 # =============================
 # Run the Bot
 # =============================
-print("🚀 Bot Starting...")
-print("🚀 Connecting to the Sweat...")
-print("🚀 Loading Oregon National Championship...")
-print("🚀 Initiated the bot...")
-print("WELCOME SUPREME LEADER KOLTON")
-bot.run(TOKEN)
+async def run_without_gateway():
+    """Local shard testing: load state and answer the coordinator until the process is stopped."""
+    stopping = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stopping.set)
+    await load_in_background()
+    await stopping.wait()
+
+def main():
+    github_sync.start()
+    serve(create_app(health_status, metrics.render), port=HEALTH_PORT)
+    print("🚀 Bot Starting...")
+    print("🚀 Connecting to the Sweat...")
+    print("🚀 Loading Oregon National Championship...")
+    print("🚀 Initiated the bot...")
+    print("WELCOME SUPREME LEADER KOLTON")
+    try:
+        if GATEWAY_STUB:
+            asyncio.run(run_without_gateway())
+        else:
+            bot.run(TOKEN)
+    finally:
+        # Fold pending changes into fresh snapshots and push anything still queued before the process exits
+        if STARTUP["ready"]:
+            compact()
+        if archive:
+            archive.close()
+        if storage:
+            storage.close()
+        github_sync.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# models.py
+import sys
+from datetime import datetime, timezone
+
+def to_epoch(value):
+    """ISO-8601 string (naive UTC, as the bot has always written them) -> epoch seconds."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def to_iso(epoch):
+    """Epoch seconds -> the naive-UTC ISO string stored in the JSON files."""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
+def intern_selection(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class Record:
+    """Slotted record that still answers ``record["field"]`` like the dicts it replaces.
+
+    ``FIELDS`` become slots; keys outside them (from older or newer files)
+    are kept in ``extra`` so a load/save round trip never drops data.
+    ``OPTIONAL`` fields are left out of the JSON while None and
+    ``TIMESTAMPS`` are epoch ints in memory but ISO strings on disk.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = ()
+    OPTIONAL = ()
+    TIMESTAMPS = ()
+
+    def __init__(self, **values):
+        self.extra = None
+        for field in self.FIELDS:
+            setattr(self, field, values.pop(field, None))
+        if values:
+            self.extra = values
+
+    # --- dict-style access ---
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        if key in self.FIELDS:
+            return key not in self.OPTIONAL or getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None and key in self.OPTIONAL else value
+
+    # --- JSON codec ---
+    @classmethod
+    def from_json(cls, data):
+        if isinstance(data, cls):
+            return data
+        values = dict(data)
+        for field in cls.TIMESTAMPS:
+            if field in values:
+                values[field] = to_epoch(values[field])
+        return cls(**values)
+
+    def to_json(self):
+        out = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is None and field in self.OPTIONAL:
+                continue
+            out[field] = to_iso(value) if field in self.TIMESTAMPS else value
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+class Stats(Record):
+    FIELDS = ("spent", "won", "lost", "bets_won", "bets_lost")
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**{**{field: 0 for field in cls.FIELDS}, **data})
+
+class ParlayLeg(Record):
+    FIELDS = ("matchup_id", "selection", "odds", "won")
+    OPTIONAL = ("won",)
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, data):
+        leg = super().from_json(data)
+        leg.selection = intern_selection(leg.selection)
+        return leg
+
+class Bet(Record):
+    FIELDS = ("id", "user_id", "matchup_id", "kind", "prop_type", "selection", "amount", "odds",
+              "placed_at", "resolved", "payout")
+    OPTIONAL = ("prop_type",)
+    TIMESTAMPS = ("placed_at",)
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, data):
+        bet = super().from_json(data)
+        if isinstance(bet.selection, list):
+            bet.selection = [ParlayLeg.from_json(leg) for leg in bet.selection]
+        else:
+            bet.selection = intern_selection(bet.selection)
+        bet.kind = intern_selection(bet.kind)
+        bet.user_id = intern_selection(bet.user_id)
+        return bet
+
+class Matchup(Record):
+    FIELDS = ("id", "type", "prop_type", "title", "home", "away", "spread", "overunder", "options", "bets",
+              "locked", "settled", "result", "start_time", "settled_at", "guild_id")
+    OPTIONAL = ("prop_type", "home", "away", "spread", "overunder", "options", "start_time", "settled_at", "guild_id")
+    TIMESTAMPS = ("start_time", "settled_at")
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, data, shared=None):
+        matchup = super().from_json(data)
+        matchup.bets = {bid: _shared_bet(bet, shared) for bid, bet in (matchup.bets or {}).items()}
+        return matchup
+
+class User(Record):
+    FIELDS = ("balance", "bets", "history", "stats", "achievements", "last_claim", "weekly")
+    TIMESTAMPS = ("last_claim",)
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, data, shared=None):
+        user = super().from_json(data)
+        user.bets = {bid: _shared_bet(bet, shared) for bid, bet in (user.bets or {}).items()}
+        user.history = [_shared_bet(bet, shared) for bet in user.history or []]
+        user.stats = Stats.from_json(user.stats or {})
+        if user.achievements is None:
+            user.achievements = []
+        return user
+
+def _shared_bet(data, shared):
+    """Decode a bet once per id so user bets, matchup bets and history share one object."""
+    if shared is None:
+        return Bet.from_json(data)
+    bet_id = data["id"]
+    bet = shared.get(bet_id)
+    if bet is None:
+        bet = shared[bet_id] = Bet.from_json(data)
+    return bet
+
+def decode_state(users, matchups):
+    """Turn loaded JSON dicts into records, sharing one Bet object per bet id."""
+    shared = {}
+    matchups = {mid: Matchup.from_json(m, shared) for mid, m in matchups.items()}
+    users = {uid: User.from_json(u, shared) for uid, u in users.items()}
+    return users, matchups
+
+def as_json(obj):
+    """A record's JSON dict, or the object itself if it is already plain data."""
+    return obj.to_json() if isinstance(obj, Record) else obj
+
+def encode(obj):
+    """``json.dump(default=...)`` hook for records."""
+    if isinstance(obj, Record):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
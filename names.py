@@ -0,0 +1,84 @@
+# names.py
+import time
+from collections import OrderedDict
+
+class NameCache:
+    """Per-guild display-name cache with a TTL and LRU eviction.
+
+    ``resolve`` answers from the cache, then from the guild's local member
+    cache, and fetches whatever is still missing with one batched
+    ``guild.query_members(user_ids=...)`` call per 100 ids. Member events
+    keep entries fresh via ``put``/``forget``.
+    """
+
+    QUERY_BATCH = 100  # Discord's limit for a member query by id
+
+    def __init__(self, ttl=3600, capacity=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._names = OrderedDict()  # (guild_id, user_id) -> (display_name, expires_at)
+
+    def get(self, guild_id, user_id):
+        key = (guild_id, str(user_id))
+        entry = self._names.get(key)
+        if entry is None or entry[1] < self.clock():
+            if entry is not None:
+                del self._names[key]
+            self.misses += 1
+            return None
+        self._names.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, guild_id, user_id, name):
+        key = (guild_id, str(user_id))
+        self._names[key] = (name, self.clock() + self.ttl)
+        self._names.move_to_end(key)
+        while len(self._names) > self.capacity:
+            self._names.popitem(last=False)
+
+    def forget(self, guild_id, user_id):
+        self._names.pop((guild_id, str(user_id)), None)
+
+    async def resolve(self, guild, user_ids):
+        """``{user_id: display_name}`` for every id; unknown members (or no guild, as in DMs) fall back to "User <id>"."""
+        if guild is None:
+            return {uid: f"User {uid}" for uid in map(str, user_ids)}
+        names, missing = {}, []
+        for uid in map(str, user_ids):
+            name = self.get(guild.id, uid)
+            if name is None:
+                member = guild.get_member(int(uid))
+                if member:
+                    name = member.display_name
+                    self.put(guild.id, uid, name)
+            if name is None:
+                missing.append(uid)
+            else:
+                names[uid] = name
+        for i in range(0, len(missing), self.QUERY_BATCH):
+            batch = missing[i:i + self.QUERY_BATCH]
+            self.fetches += 1
+            try:
+                members = await guild.query_members(user_ids=[int(uid) for uid in batch], limit=len(batch), cache=True)
+            except Exception as e:  # timeouts, missing intents, HTTP errors
+                print(f"⚠️ Member lookup failed for {len(batch)} users: {e}")
+                continue
+            for member in members:
+                self.put(guild.id, member.id, member.display_name)
+                names[str(member.id)] = member.display_name
+            for uid in batch:
+                if uid not in names:
+                    # Not in the guild: cache the fallback too so we don't query them again until it expires
+                    names[uid] = f"User {uid}"
+                    self.put(guild.id, uid, names[uid])
+        for uid in missing:
+            names.setdefault(uid, f"User {uid}")
+        return names
+
+    def stats(self):
+        return {"entries": len(self._names), "hits": self.hits, "misses": self.misses, "fetches": self.fetches}
@@ -0,0 +1,103 @@
+# numeric.py
+from array import array
+
+class NumericPropBook:
+    """Open bets of one numeric prop as parallel arrays of bet ids, predictions and stakes.
+
+    A bet pays ``stake * (1 + 100 / max(1, |result - prediction|))``.
+    Grading a result is one pass over two flat arrays instead of a walk over
+    bet records. For previews the book also keeps the stake grouped by
+    distinct prediction, so a liability curve over many candidate results
+    costs O(candidates x distinct predictions).
+    """
+
+    def __init__(self):
+        self.bet_ids = []
+        self.predictions = array("d")
+        self.stakes = array("q")
+        self._by_prediction = {}  # prediction -> total stake
+
+    def __len__(self):
+        return len(self.bet_ids)
+
+    def add(self, bet):
+        prediction = float(bet["selection"])
+        self.bet_ids.append(bet["id"])
+        self.predictions.append(prediction)
+        self.stakes.append(bet["amount"])
+        self._by_prediction[prediction] = self._by_prediction.get(prediction, 0) + bet["amount"]
+
+    def payouts(self, actual):
+        """Exact payout of every bet (in ``bet_ids`` order) for a result."""
+        return [int(stake * (1 + 100 / max(1, abs(actual - prediction))))
+                for prediction, stake in zip(self.predictions, self.stakes)]
+
+    def liability(self, actual):
+        """Total payout for a result, from the grouped stakes (within a coin per bet of the exact sum)."""
+        return total_payout(self._by_prediction.items(), actual)
+
+    def curve(self, results):
+        """``[(result, total payout), ...]`` for each candidate result."""
+        return liability_curve(self._by_prediction.items(), results)
+
+    def grouped(self):
+        """``[(prediction, total stake), ...]`` copied out, so it can be priced off the event loop."""
+        return list(self._by_prediction.items())
+
+    def staked(self):
+        return sum(self._by_prediction.values())
+
+def total_payout(grouped, actual):
+    return int(sum(stake * (1 + 100 / max(1, abs(actual - prediction))) for prediction, stake in grouped))
+
+def liability_curve(grouped, results):
+    return [(result, total_payout(grouped, result)) for result in results]
+
+def worst_case(grouped, low, high):
+    """``(result, total payout)`` of the costliest result in ``[low, high]``.
+
+    Each bet's payout is flat within 1 of its prediction and convex either
+    side of that, so the total is convex between the points ``p - 1``,
+    ``p`` and ``p + 1`` of every prediction and peaks at one of them (or at
+    an end of the range). Checking those is exact, at O(distinct
+    predictions^2).
+    """
+    candidates = {low, high}
+    for prediction, _ in grouped:
+        candidates.update(point for point in (prediction - 1, prediction, prediction + 1) if low <= point <= high)
+    return max(((result, total_payout(grouped, result)) for result in sorted(candidates)), key=lambda point: point[1])
+
+class NumericPropIndex:
+    """A NumericPropBook per open numeric prop, kept as bets are placed."""
+
+    def __init__(self):
+        self._books = {}  # matchup_id -> NumericPropBook
+
+    def add(self, matchup_id, bet):
+        self._books.setdefault(matchup_id, NumericPropBook()).add(bet)
+
+    def book(self, matchup_id):
+        return self._books.get(matchup_id) or NumericPropBook()
+
+    def pop(self, matchup_id):
+        return self._books.pop(matchup_id, None) or NumericPropBook()
+
+    def rebuild(self, matchups):
+        """Index the open bets of every numeric prop; returns the ids of bets whose prediction isn't a number."""
+        self._books = {}
+        skipped = []
+        for mid, matchup in matchups.items():
+            if matchup.get("prop_type") != "numeric":
+                continue
+            for bet in matchup.get("bets", {}).values():
+                if bet.get("resolved"):
+                    continue
+                try:
+                    float(bet["selection"])
+                except (TypeError, ValueError):
+                    skipped.append(bet["id"])
+                    continue
+                self.add(mid, bet)
+        if skipped:
+            print(f"⚠️ Skipped {len(skipped)} numeric prop bets with a non-numeric prediction (graded as losses): {', '.join(skipped[:10])}")
+        return skipped
@@ -0,0 +1,137 @@
+# odds.py
+
+def implied_decimal_from_moneyline(ml: int):
+    """Convert moneyline to decimal odds."""
+    return (ml / 100 + 1) if ml > 0 else (100 / abs(ml) + 1)
+
+def moneyline_from_decimal(dec: float):
+    """Convert decimal odds to moneyline."""
+    return int(round((dec - 1) * 100)) if dec >= 2 else int(round(-100 / (dec - 1)))
+
+FIXED_SIDES = {"overunder": ("OVER", "UNDER")}  # matchup type -> its sides, whatever teams it names
+
+def market_sides(matchup):
+    """The upper-cased selections a matchup can settle on, or None when they are open-ended."""
+    if matchup["type"] in FIXED_SIDES:
+        return list(FIXED_SIDES[matchup["type"]])
+    if matchup["type"] == "prop":
+        return [option.upper() for option in matchup["options"]] if matchup.get("options") else None
+    if matchup.get("home"):
+        return [side.upper() for side in (matchup["home"], matchup.get("away")) if side]
+    return None
+
+class OddsEngine:
+    """Prices every selection of a matchup at once.
+
+    ``table`` returns ``{SELECTION: decimal odds}`` keyed by the upper-cased
+    selection, plus a ``None`` entry for any selection not listed.
+    """
+
+    name = None
+
+    def table(self, matchup, volumes):
+        raise NotImplementedError
+
+class LegacyOdds(OddsEngine):
+    """The original formula: home/away odds shift with the spread volume on each side.
+
+    Props are priced flat at 1.0 (their payouts are fixed at settlement).
+    """
+
+    name = "legacy"
+
+    def table(self, matchup, volumes):
+        if matchup["type"] == "prop":
+            return {None: 1.0}
+        home, away = matchup.get("home"), matchup.get("away")
+        home_vol = volumes.staked(matchup["id"], "spread", home)
+        away_vol = volumes.staked(matchup["id"], "spread", away)
+        total = home_vol + away_vol
+        if total == 0:
+            home_ml = away_ml = -110
+        else:
+            home_share = home_vol / total
+            away_share = away_vol / total
+            home_ml = moneyline_from_decimal(1.8 + (away_share - home_share) * 0.5)
+            away_ml = moneyline_from_decimal(1.8 + (home_share - away_share) * 0.5)
+        table = {None: 1.9}
+        # Away first so a matchup with identical names quotes the home price, as before
+        if away: table[away.upper()] = implied_decimal_from_moneyline(away_ml)
+        if home: table[home.upper()] = implied_decimal_from_moneyline(home_ml)
+        return table
+
+class PoolOdds(OddsEngine):
+    """Vig-aware odds from the share of the stake pool on each selection.
+
+    Every selection gets ``prior`` coins of phantom stake so thin markets
+    don't swing wildly. Its probability is its share of the pool, and its
+    odds are ``1 / (p * (1 + margin))``, clamped to ``[min_odds, max_odds]``.
+    Matchups with a fixed set of sides (see ``market_sides``) price exactly
+    those. Open-ended choice props price every choice seen so far, plus one
+    slot for a choice nobody has picked yet (the ``None`` entry). Numeric
+    props stay flat since they settle by distance to the result.
+    """
+
+    name = "pool"
+
+    def __init__(self, margin=0.05, prior=100, min_odds=1.01, max_odds=50.0):
+        self.margin = margin
+        self.prior = prior
+        self.min_odds = min_odds
+        self.max_odds = max_odds
+
+    def table(self, matchup, volumes):
+        if matchup.get("prop_type") == "numeric":
+            return {None: 1.0}
+        stakes = volumes.stakes(matchup["id"], matchup["type"])
+        sides = market_sides(matchup)
+        if sides:
+            slots = len(sides)
+        else:
+            sides = [sel for sel, amount in stakes.items() if amount > 0]
+            slots = len(sides) + 1
+        amounts = [stakes.get(side, 0) + self.prior for side in sides]
+        pool = sum(amounts) + (slots - len(sides)) * self.prior
+        table = {side: self._odds(amount / pool) for side, amount in zip(sides, amounts)}
+        # A pick that is neither side of a matchup can't win, so it gets no long-shot price
+        table[None] = self._odds(self.prior / pool) if slots > len(sides) else self.min_odds
+        return table
+
+    def _odds(self, probability):
+        return round(min(self.max_odds, max(self.min_odds, 1 / (probability * (1 + self.margin)))), 3)
+
+ENGINES = {engine.name: engine for engine in (LegacyOdds, PoolOdds)}
+
+class QuoteBook:
+    """Quote tables per matchup, recomputed only when its volume or its sides change."""
+
+    def __init__(self, engine, volumes):
+        self.engine = engine
+        self.volumes = volumes
+        self._tables = {}  # matchup_id -> (cache key, table)
+
+    def table(self, matchup):
+        mid = matchup["id"]
+        key = (self.volumes.version(mid), matchup["type"], matchup.get("home"), matchup.get("away"), matchup.get("prop_type"))
+        cached = self._tables.get(mid)
+        if cached and cached[0] == key:
+            return cached[1]
+        table = self.engine.table(matchup, self.volumes)
+        self._tables[mid] = (key, table)
+        return table
+
+    def price(self, matchup, selection):
+        table = self.table(matchup)
+        return table.get(str(selection).upper(), table[None])
+
+    def reprice(self, matchups, engine=None):
+        """Drop every cached table (switching engine if given) and price these matchups again."""
+        if engine is not None:
+            self.engine = engine
+        self._tables = {}
+        for matchup in matchups:
+            self.table(matchup)
+        return len(matchups)
+
+    def forget(self, matchup_id):
+        self._tables.pop(matchup_id, None)
@@ -0,0 +1,137 @@
+# parlay_builder.py
+import discord
+from odds import FIXED_SIDES
+
+PARLAY_MIN_LEGS = 2
+PARLAY_MAX_LEGS = 5
+SELECT_OPTION_LIMIT = 25  # Discord's cap on options per select menu
+
+def parlay_sides(matchup):
+    """The picks offered for one parlay leg, or None if the matchup can't be a leg.
+
+    Numeric props and choice props without a fixed list of options have no
+    sides to pick from, so they are left out of parlays.
+    """
+    if matchup["type"] in FIXED_SIDES:
+        return list(FIXED_SIDES[matchup["type"]])
+    if matchup["type"] == "prop":
+        return list(matchup["options"]) if matchup.get("prop_type") != "numeric" and matchup.get("options") else None
+    return [side for side in (matchup.get("home"), matchup.get("away")) if side] or None
+
+class ParlayBuilder(discord.ui.View):
+    """Parlay slip built from components: matchups, then one side per matchup, then a stake modal.
+
+    Nothing waits on chat messages; each step is an interaction callback.
+    Matchups are offered SELECT_OPTION_LIMIT per page, with buttons to move
+    between pages; picks carry over from page to page. ``place(picks,
+    amount)`` receives ``[(matchup_id, selection), ...]`` and returns the
+    bet slip embed, or an error string to show instead.
+    """
+
+    def __init__(self, owner_id, matchups, place, timeout=180):
+        super().__init__(timeout=timeout)
+        self.owner_id = owner_id
+        self.place = place
+        self.matchups = {m["id"]: m for m in matchups}
+        self.pages = [list(self.matchups)[i:i + SELECT_OPTION_LIMIT] for i in range(0, len(self.matchups), SELECT_OPTION_LIMIT)]
+        self.page = 0
+        self.chosen = []  # matchup ids in the order they were picked, across pages
+        self.sides = None
+
+        self.previous = discord.ui.Button(label="◀ Prev", style=discord.ButtonStyle.secondary, row=1)
+        self.next = discord.ui.Button(label="Next ▶", style=discord.ButtonStyle.secondary, row=1)
+        self.pick_sides = discord.ui.Button(label="Pick sides", style=discord.ButtonStyle.primary, row=1)
+        self.previous.callback = lambda interaction: self.turn(interaction, -1)
+        self.next.callback = lambda interaction: self.turn(interaction, 1)
+        self.pick_sides.callback = self.on_pick_sides
+        self.render()
+
+    def render(self):
+        """Rebuild the components for the current page and picks."""
+        self.clear_items()
+        page = self.pages[self.page]
+        self.games = discord.ui.Select(
+            placeholder=(f"Choose {PARLAY_MIN_LEGS}–{PARLAY_MAX_LEGS} matchups (page {self.page + 1}/{len(self.pages)}, "
+                         f"{len(self.chosen)} picked)"),
+            min_values=0,
+            max_values=len(page),
+            options=[discord.SelectOption(label=self.matchups[mid]["title"][:100], value=mid,
+                                          description=f"Type: {self.matchups[mid]['type']}", default=mid in self.chosen)
+                     for mid in page],
+            row=0
+        )
+        self.games.callback = self.on_games
+        self.add_item(self.games)
+        if len(self.pages) > 1:
+            self.previous.disabled = self.page == 0
+            self.next.disabled = self.page == len(self.pages) - 1
+            self.add_item(self.previous)
+            self.add_item(self.next)
+        self.pick_sides.disabled = not PARLAY_MIN_LEGS <= len(self.chosen) <= PARLAY_MAX_LEGS
+        self.add_item(self.pick_sides)
+        if self.sides:
+            self.add_item(self.sides)
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id == self.owner_id:
+            return True
+        await interaction.response.send_message("❌ This parlay slip isn't yours.", ephemeral=True)
+        return False
+
+    async def turn(self, interaction, step):
+        self.page = min(max(self.page + step, 0), len(self.pages) - 1)
+        self.render()
+        await interaction.response.edit_message(view=self)
+
+    async def on_games(self, interaction):
+        page = set(self.pages[self.page])
+        chosen = [mid for mid in self.chosen if mid not in page]
+        chosen += [mid for mid in self.games.values if mid not in chosen]
+        if len(chosen) > PARLAY_MAX_LEGS:
+            self.render()  # put the menu back to the picks that still stand
+            await interaction.response.edit_message(view=self)
+            return await interaction.followup.send(f"❌ A parlay has at most {PARLAY_MAX_LEGS} legs.", ephemeral=True)
+        if chosen != self.chosen:
+            self.chosen, self.sides = chosen, None
+        self.render()
+        await interaction.response.edit_message(view=self)
+
+    async def on_pick_sides(self, interaction):
+        self.sides = discord.ui.Select(
+            placeholder="Pick one side per matchup",
+            min_values=len(self.chosen),
+            max_values=len(self.chosen),
+            options=[discord.SelectOption(label=f"{side} — {self.matchups[mid]['title']}"[:100], value=f"{mid}|{side}")
+                     for mid in self.chosen for side in parlay_sides(self.matchups[mid])],
+            row=2
+        )
+        self.sides.callback = self.on_sides
+        self.render()
+        await interaction.response.edit_message(view=self)
+
+    async def on_sides(self, interaction):
+        picks = [tuple(value.split("|", 1)) for value in self.sides.values]
+        if len({mid for mid, _ in picks}) != len(picks):
+            return await interaction.response.send_message("❌ Pick exactly one side per matchup.", ephemeral=True)
+        await interaction.response.send_modal(ParlayStakeModal(self, picks))
+
+class ParlayStakeModal(discord.ui.Modal, title="Parlay Stake"):
+    stake = discord.ui.TextInput(label="Total stake", placeholder="Whole coins", max_length=12)
+
+    def __init__(self, builder, picks):
+        super().__init__()
+        self.builder = builder
+        self.picks = picks
+
+    async def on_submit(self, interaction):
+        # Placing the bet takes locks and persists; defer so that never races the 3s deadline
+        await interaction.response.defer(thinking=True)
+        try:
+            amount = int(self.stake.value.strip())
+        except ValueError:
+            return await interaction.followup.send("❌ Invalid stake amount.")
+        result = await self.builder.place(self.picks, amount)
+        if isinstance(result, discord.Embed):
+            self.builder.stop()
+            return await interaction.followup.send(embed=result)
+        await interaction.followup.send(result)
@@ -0,0 +1,63 @@
+# parlays.py
+
+class ParlayIndex:
+    """Reverse index from matchup id to the pending parlays with a leg on it.
+
+    Settling a matchup pops its entry and touches only those parlays, so
+    the cost is O(legs on that matchup) instead of a scan of every user's
+    pending bets.
+    """
+
+    def __init__(self):
+        self._legs = {}  # matchup_id -> {bet_id: user_id}
+
+    def add(self, bet):
+        for leg in bet["selection"]:
+            if "won" not in leg:
+                self._legs.setdefault(leg["matchup_id"], {})[bet["id"]] = bet["user_id"]
+
+    def discard(self, bet):
+        """Forget a parlay that was decided before all of its legs were."""
+        for leg in bet["selection"]:
+            entries = self._legs.get(leg["matchup_id"])
+            if entries:
+                entries.pop(bet["id"], None)
+                if not entries:
+                    del self._legs[leg["matchup_id"]]
+
+    def pop(self, matchup_id):
+        """Return (and drop) ``[(user_id, bet_id), ...]`` for parlays with a leg on this matchup."""
+        return [(uid, bid) for bid, uid in self._legs.pop(matchup_id, {}).items()]
+
+    def grade(self, matchup_id, users, wins, payout):
+        """Grade the legs on a settled matchup: ``(decided, graded_paths)``.
+
+        ``wins(selection)`` says whether a leg's pick won and ``payout(bet)``
+        prices a parlay whose legs all won. A losing leg decides its parlay
+        at once (paying 0); parlays with legs still open come back as the
+        ledger paths of the bets whose legs changed.
+        """
+        decided, graded_paths = [], []
+        for uid, bet_id in self.pop(matchup_id):
+            bet = users.get(uid, {}).get("bets", {}).get(bet_id)
+            if not bet:
+                continue
+            for leg in bet["selection"]:
+                if leg["matchup_id"] == matchup_id:
+                    leg["won"] = wins(leg["selection"])
+            legs = bet["selection"]
+            if any(leg.get("won") is False for leg in legs):
+                self.discard(bet)
+                decided.append((bet, 0))
+            elif all(leg.get("won") for leg in legs):
+                decided.append((bet, payout(bet)))
+            else:
+                graded_paths.append(("users", uid, "bets", bet_id))
+        return decided, graded_paths
+
+    def rebuild(self, users):
+        self._legs = {}
+        for user in users.values():
+            for bet in user.get("bets", {}).values():
+                if bet.get("kind") == "parlay" and not bet.get("resolved"):
+                    self.add(bet)
@@ -0,0 +1,111 @@
+# rules.py
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+Award = namedtuple("Award", "kind name reward")  # kind: "achievement", "challenge" or "progress"
+
+# Optional rule conditions: (rule value, user, bet, payout) -> bool
+CONDITIONS = {
+    "kind": lambda value, user, bet, payout: bet is not None and bet["kind"] == value,
+    "min_amount": lambda value, user, bet, payout: bet is not None and bet["amount"] >= value,
+    "won": lambda value, user, bet, payout: payout is not None and (payout > 0) == value,
+    "min_payout": lambda value, user, bet, payout: payout is not None and payout >= value,
+    "min_balance": lambda value, user, bet, payout: user["balance"] >= value,
+    "min_stats": lambda value, user, bet, payout: all(user["stats"][stat] >= n for stat, n in value.items()),
+}
+RULE_KEYS = {"name", "id", "event", "description", "reward", "goal", "measure"}
+
+def week_key(now):
+    """ISO date of the Monday (UTC) starting the week that contains ``now``."""
+    day = datetime.fromtimestamp(now, timezone.utc).date()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def empty_week(key):
+    return {"week_start": key, "progress": {}, "claimed": []}
+
+def touched_fields(awards):
+    """User fields a list of awards changed, for the caller to persist."""
+    fields = set()
+    for award in awards:
+        fields.add("weekly" if award.kind in ("challenge", "progress") else "achievements")
+        if award.reward:
+            fields.add("balance")
+    return fields
+
+class RuleEngine:
+    """Achievement and weekly-challenge rules, indexed by the event that can satisfy them.
+
+    Rules are plain dicts (see ``constants.py``): an ``event``, optional
+    conditions from ``CONDITIONS`` and a ``reward``; challenges also have
+    an ``id``, a ``goal`` and an optional ``measure`` ("amount" to count
+    the stake instead of 1). An event is only checked against the rules
+    filed under it. A user's weekly window rolls over the first time an
+    event touches it in a new week; ``weekly_view`` never writes.
+    """
+
+    def __init__(self, achievements, challenges, clock=time.time):
+        self.clock = clock
+        self.challenges = list(challenges)
+        self._achievements = {}  # event -> [rule]
+        self._challenges = {}
+        for rules, index in ((achievements, self._achievements), (self.challenges, self._challenges)):
+            for rule in rules:
+                unknown = set(rule) - RULE_KEYS - set(CONDITIONS)
+                if unknown:
+                    raise ValueError(f"Rule {rule.get('name') or rule.get('id')} has unknown keys: {', '.join(sorted(unknown))}")
+                index.setdefault(rule["event"], []).append(rule)
+
+    def events(self):
+        return set(self._achievements) | set(self._challenges)
+
+    def apply(self, event, user, bet=None, payout=None):
+        """Progress and award every rule this event satisfies; returns the Awards (rewards already credited)."""
+        awards = []
+        for rule in self._achievements.get(event, ()):
+            if rule["name"] not in user["achievements"] and self._matches(rule, user, bet, payout):
+                user["achievements"].append(rule["name"])
+                awards.append(self._credit(user, Award("achievement", rule["name"], rule.get("reward", 0))))
+
+        rules = self._challenges.get(event, ())
+        matching = [rule for rule in rules if self._matches(rule, user, bet, payout)]
+        if matching:
+            week = self._current_week(user)
+            for rule in matching:
+                if rule["id"] in week["claimed"]:
+                    continue
+                step = bet["amount"] if rule.get("measure") == "amount" and bet is not None else 1
+                week["progress"][rule["id"]] = week["progress"].get(rule["id"], 0) + step
+                if week["progress"][rule["id"]] >= rule["goal"]:
+                    week["claimed"].append(rule["id"])
+                    awards.append(self._credit(user, Award("challenge", rule["description"], rule.get("reward", 0))))
+                else:
+                    awards.append(Award("progress", rule["id"], 0))
+        return awards
+
+    def weekly_view(self, user):
+        """``[(rule, progress, claimed)]`` for the current week, without rolling the stored window over."""
+        week = (user.get("weekly") if user else None) or {}
+        if week.get("week_start") != week_key(self.clock()) or "claimed" not in week:
+            week = empty_week(None)
+        return [(rule, week["progress"].get(rule["id"], 0), rule["id"] in week["claimed"]) for rule in self.challenges]
+
+    def _current_week(self, user):
+        key = week_key(self.clock())
+        week = user.get("weekly")
+        if not week or week.get("week_start") != key or "claimed" not in week:
+            week = user["weekly"] = empty_week(key)
+        return week
+
+    def _matches(self, rule, user, bet, payout):
+        for key, value in rule.items():
+            check = CONDITIONS.get(key)
+            if check and not check(value, user, bet, payout):
+                return False
+        return True
+
+    @staticmethod
+    def _credit(user, award):
+        if award.reward:
+            user["balance"] += award.reward
+        return award
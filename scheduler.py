@@ -0,0 +1,61 @@
+# scheduler.py
+import asyncio, heapq, time
+
+class LockScheduler:
+    """Locks matchups at their deadlines from one sleeping task.
+
+    Deadlines sit in a min-heap; the task sleeps until the earliest one (or
+    until a new deadline is scheduled) and never scans the matchups.
+    Cancelled or rescheduled entries stay in the heap and are skipped when
+    popped. ``on_due(matchup_id)`` is awaited for each deadline reached.
+    """
+
+    def __init__(self, on_due, clock=time.time):
+        self.on_due = on_due
+        self.clock = clock
+        self._heap = []       # (deadline, matchup_id)
+        self._deadlines = {}  # matchup_id -> live deadline
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, matchup_id, deadline):
+        self._deadlines[matchup_id] = deadline
+        heapq.heappush(self._heap, (deadline, matchup_id))
+        self._wakeup.set()  # the sleeper recomputes its timeout from the new heap top
+
+    def cancel(self, matchup_id):
+        self._deadlines.pop(matchup_id, None)
+
+    def rebuild(self, deadlines):
+        """Replace the schedule with ``{matchup_id: deadline}``."""
+        self._deadlines = dict(deadlines)
+        self._heap = [(deadline, mid) for mid, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, mid = heapq.heappop(self._heap)
+                if self._deadlines.get(mid) != deadline:
+                    continue  # cancelled or rescheduled
+                del self._deadlines[mid]
+                try:
+                    await self.on_due(mid)
+                except Exception as e:
+                    print(f"⚠️ Scheduled lock failed for {mid}: {e}")
+            timeout = max(0, self._heap[0][0] - self.clock()) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
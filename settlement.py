@@ -0,0 +1,107 @@
+# settlement.py
+import asyncio, time
+from metrics import FINE_BUCKETS
+from rules import touched_fields
+
+EMBED_DESCRIPTION_LIMIT = 4000  # Discord allows 4096; leave room for markup
+
+def calculate_payout(bet):
+    """Calculate payout for single or parlay bets."""
+    if bet["kind"] == "parlay":
+        combined_odds = 1
+        for leg in bet["selection"]:
+            combined_odds *= leg["odds"]
+        return int(bet["amount"] * combined_odds)
+    return int(bet["amount"] * bet["odds"])
+
+class Settlement:
+    """Graded bets of one matchup, grouped by user, ready to preview or commit."""
+
+    def __init__(self, matchup_id, graded):
+        self.matchup_id = matchup_id
+        self.by_user = {}
+        for bet, payout in graded:
+            self.by_user.setdefault(bet["user_id"], []).append((bet, payout))
+        self.bet_count = sum(len(entries) for entries in self.by_user.values())
+        self.staked = sum(bet["amount"] for entries in self.by_user.values() for bet, _ in entries)
+        self.payout = sum(payout for entries in self.by_user.values() for _, payout in entries)
+        self.winners = [(bet, payout) for entries in self.by_user.values() for bet, payout in entries if payout > 0]
+
+    @classmethod
+    def combine(cls, settlements):
+        """One Settlement over several matchups, so a whole slate commits as a single batch."""
+        return cls(None, [pair for s in settlements for entries in s.by_user.values() for pair in entries])
+
+    def summary(self, fmt=str):
+        """Liability report shown before (or instead of) committing; ``fmt`` formats amounts."""
+        net = self.staked - self.payout
+        return (f"Bets: {self.bet_count} from {len(self.by_user)} users\n"
+                f"Total staked: {fmt(self.staked)}\n"
+                f"Total payout: {fmt(self.payout)} across {len(self.winners)} winning bets\n"
+                f"House net: {'-' if net < 0 else '+'}{fmt(abs(net))}")
+
+class SettlementEngine:
+    """Applies a Settlement in chunks: one pass per user, one persisted change per chunk.
+
+    ``get_user`` and ``record`` are the bot's own accessors, so the engine
+    works with whichever storage engine is active. Between chunks it yields
+    to the event loop so a big matchup never stalls other commands. Each
+    graded bet is published as "bet_settled" on ``events``, and whatever
+    the handlers change is persisted in the same chunk.
+    """
+
+    def __init__(self, get_user, record, chunk_size=500, metrics=None, events=None):
+        self.get_user = get_user
+        self.record = record
+        self.chunk_size = chunk_size
+        self.metrics = metrics
+        self.events = events
+
+    async def commit(self, settlement):
+        started = time.perf_counter()
+        paths, in_chunk = [], 0
+        for uid, entries in settlement.by_user.items():
+            user = self.get_user(uid)
+            won = [payout for _, payout in entries if payout > 0]
+            user["balance"] += sum(won)
+            user["stats"]["won"] += sum(won)
+            user["stats"]["bets_won"] += len(won)
+            user["stats"]["lost"] += sum(bet["amount"] for bet, payout in entries if payout <= 0)
+            user["stats"]["bets_lost"] += len(entries) - len(won)
+            awards = []
+            for bet, payout in entries:
+                bet["payout"] = payout
+                bet["resolved"] = True
+                user["history"].append(bet)
+                user["bets"].pop(bet["id"], None)
+                paths += [("users", uid, "bets", bet["id"]), ("users", uid, "history", len(user["history"]) - 1)]
+                if bet["kind"] != "parlay":  # parlays live only on the user
+                    paths.append(("matchups", bet["matchup_id"], "bets", bet["id"]))
+                if self.events:
+                    awards += self.events.publish("bet_settled", user=user, bet=bet, payout=payout)
+            paths += [("users", uid, "balance"), ("users", uid, "stats")]
+            paths += [("users", uid, field) for field in sorted(touched_fields(awards) - {"balance"})]
+            in_chunk += len(entries)
+            if in_chunk >= self.chunk_size:
+                self.record("bets_settled", *paths)
+                paths, in_chunk = [], 0
+                await asyncio.sleep(0)
+        if paths:
+            self.record("bets_settled", *paths)
+        if self.metrics and settlement.bet_count:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe("sportsbook_settle_seconds", elapsed)
+            self.metrics.observe("sportsbook_settle_seconds_per_bet", elapsed / settlement.bet_count, FINE_BUCKETS)
+
+def paginate(lines, limit=EMBED_DESCRIPTION_LIMIT):
+    """Split lines into pages that each fit one embed description."""
+    pages, page, size = [], [], 0
+    for line in lines:
+        if page and size + len(line) + 1 > limit:
+            pages.append("\n".join(page))
+            page, size = [], 0
+        page.append(line[:limit])
+        size += len(line) + 1
+    if page:
+        pages.append("\n".join(page))
+    return pages
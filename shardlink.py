@@ -0,0 +1,85 @@
+# shardlink.py
+import asyncio, itertools, json
+
+class Peer:
+    """One end of a JSON-lines RPC link over a stream (the coordinator's Unix socket).
+
+    Both ends can call each other: ``request(method, params)`` sends
+    ``{"id", "method", "params"}`` and awaits the matching ``{"id", "result"|"error"}``, while
+    incoming requests are dispatched to ``handlers[method](**params)``
+    (plain functions or coroutines).
+    """
+
+    def __init__(self, reader, writer, handlers=None):
+        self.reader = reader
+        self.writer = writer
+        self.handlers = handlers or {}
+        self._ids = itertools.count(1)
+        self._waiting = {}  # request id -> Future
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._read())
+        return self._task
+
+    async def request(self, method, params=None, timeout=10):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        await self._send({"id": request_id, "method": method, "params": params or {}})
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiting.pop(request_id, None)
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+        self.writer.close()
+
+    async def _send(self, message):
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await self.writer.drain()
+
+    async def _read(self):
+        try:
+            while line := await self.reader.readline():
+                message = json.loads(line)
+                if "method" in message:
+                    asyncio.create_task(self._answer(message))
+                elif message.get("id") in self._waiting:
+                    future = self._waiting[message["id"]]
+                    if "error" in message:
+                        future.set_exception(RemoteError(message["error"]))
+                    else:
+                        future.set_result(message.get("result"))
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("shard link closed"))
+
+    async def _answer(self, message):
+        handler = self.handlers.get(message["method"])
+        try:
+            if handler is None:
+                raise KeyError(f"unknown method {message['method']}")
+            result = handler(**message.get("params", {}))
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply = {"id": message["id"], "result": result}
+        except Exception as e:
+            reply = {"id": message["id"], "error": f"{type(e).__name__}: {e}"}
+        try:
+            await self._send(reply)
+        except ConnectionError:
+            pass
+
+class RemoteError(Exception):
+    pass
+
+async def connect(path, handlers):
+    """Open a link to the coordinator's socket and start reading from it."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    peer = Peer(reader, writer, handlers)
+    peer.start()
+    return peer
@@ -0,0 +1,90 @@
+# slate.py
+import csv, io, json, time
+from models import to_epoch
+
+PROP_TYPES = ("choice", "numeric")
+MAX_ERRORS = 20  # problems listed before the rest are only counted
+
+def read_rows(filename, data):
+    """Rows of a CSV (header line) or JSON (list of objects) attachment as dicts."""
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON must be a list of objects")
+        return rows
+    try:
+        return [{key.strip().lower(): value for key, value in row.items() if key} for row in csv.DictReader(io.StringIO(text))]
+    except csv.Error as e:
+        raise ValueError(str(e)) from e
+
+def parse_slate(rows, now=None):
+    """Validate every slate row before anything is created.
+
+    Returns ``(entries, errors)``: one dict of Matchup fields per row, and
+    one "Row n: ..." line per problem. Callers insert nothing unless
+    ``errors`` is empty.
+    """
+    now = int(time.time()) if now is None else now
+    entries, errors = [], []
+    for n, row in enumerate(rows, start=1):
+        problems = []
+        field = lambda key: str(row.get(key) or "").strip()
+        kind, title = field("type").lower(), field("title")
+        if not kind: problems.append("missing type")
+        if not title: problems.append("missing title")
+        entry = {"type": kind, "title": title}
+
+        if kind == "prop":
+            prop_type = field("prop_type").lower() or "choice"
+            if prop_type not in PROP_TYPES:
+                problems.append(f"prop_type must be one of {', '.join(PROP_TYPES)}")
+            entry["prop_type"] = prop_type
+            options = row.get("options")
+            if isinstance(options, str):
+                options = [o.strip() for o in options.split("|") if o.strip()]
+            if options and not isinstance(options, list):
+                problems.append("options must be a list (or A|B|C in CSV)")
+            elif options:
+                if prop_type != "choice": problems.append("options only apply to choice props")
+                elif len(options) < 2: problems.append("a choice prop needs at least 2 options")
+                entry["options"] = [str(o) for o in options]
+        else:
+            entry["home"], entry["away"] = field("home") or None, field("away") or None
+            for key in ("spread", "overunder"):
+                try: entry[key] = float(row.get(key) or 0)
+                except (TypeError, ValueError): problems.append(f"{key} must be a number")
+
+        start = row.get("start_time")
+        if start not in (None, ""):
+            try:
+                entry["start_time"] = to_epoch(int(start) if str(start).isdigit() else start)
+                if entry["start_time"] <= now: problems.append("start_time is in the past")
+            except (TypeError, ValueError):
+                problems.append("start_time must be epoch seconds or ISO-8601")
+        elif kind != "prop":
+            entry["start_time"] = now + 3600  # same default as !addmatchup
+
+        errors += [f"Row {n}: {problem}" for problem in problems]
+        entries.append(entry)
+    return entries, errors
+
+def parse_results(rows):
+    """``[(matchup_id, result or None)]`` from a results file; an empty result means lock only."""
+    results, errors, seen = [], [], set()
+    for n, row in enumerate(rows, start=1):
+        mid = str(row.get("matchup_id") or row.get("id") or "").strip()
+        result = str(row.get("result") or "").strip() or None
+        if not mid:
+            errors.append(f"Row {n}: missing matchup_id")
+        elif mid in seen:
+            errors.append(f"Row {n}: {mid} is listed twice")
+        seen.add(mid)
+        results.append((mid, result))
+    return results, errors
+
+def error_report(errors):
+    lines = errors[:MAX_ERRORS]
+    if len(errors) > MAX_ERRORS:
+        lines.append(f"...and {len(errors) - MAX_ERRORS} more")
+    return "\n".join(lines)
@@ -0,0 +1,335 @@
+# storage.py
+import json, os, pickle, sqlite3, threading, time
+from ledger import Ledger
+from models import as_json, encode
+
+def io_stats():
+    """Running I/O totals an engine keeps for the metrics endpoint."""
+    return {"serialize_seconds": 0.0, "write_seconds": 0.0, "bytes_written": 0}
+
+def write_json(filename, data, stats=None):
+    """Atomically write JSON so neither a crash nor the sync worker ever sees a half-written file."""
+    started = time.perf_counter()
+    text = json.dumps(data, indent=4, default=encode)
+    serialized = time.perf_counter()
+    tmp = f"{filename}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+    if stats is not None:
+        stats["serialize_seconds"] += serialized - started
+        stats["write_seconds"] += time.perf_counter() - serialized
+        stats["bytes_written"] += len(text)
+
+def freeze(mapping, keys):
+    """Pickled copy of ``mapping``'s entries for ``keys``: quick to take on the event loop, safe to read from a thread."""
+    return pickle.dumps({key: mapping[key] for key in keys if key in mapping}, pickle.HIGHEST_PROTOCOL)
+
+def thaw(slices):
+    """One dict from the slices ``freeze`` produced."""
+    merged = {}
+    for data in slices:
+        merged.update(pickle.loads(data))
+    return merged
+
+def read_json(filename):
+    try:
+        with open(filename, "r") as f:
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+class JsonStorage:
+    """Default engine: users.json/matchups.json snapshots plus the write-ahead ledger."""
+
+    def __init__(self, users_file, matchups_file, ledger_file, mirror=None):
+        self.users_file = users_file
+        self.matchups_file = matchups_file
+        self.stats = io_stats()
+        self.ledger = Ledger(ledger_file, default=encode, stats=self.stats)
+        self.mirror = mirror
+
+    @property
+    def pending(self):
+        """Changes written since the last compaction."""
+        return self.ledger.count
+
+    def load(self):
+        """Load both snapshots and replay the ledger tail on top of them."""
+        state = {"users": read_json(self.users_file), "matchups": read_json(self.matchups_file)}
+        if self.ledger.replay(state):
+            print(f"🔁 Replayed {self.ledger.count} ledger entries")
+        return state["users"], state["matchups"]
+
+    def record(self, op, changes, state):
+        self.ledger.append(op, changes)
+        self._mark_dirty(self.ledger.path)
+
+    def compact(self, users, matchups):
+        """Write fresh snapshots of both files, then empty the ledger they now cover."""
+        self.ledger.sync()
+        write_json(self.users_file, users, self.stats)
+        write_json(self.matchups_file, matchups, self.stats)
+        self.ledger.truncate()
+        self._mark_dirty(self.users_file, self.matchups_file, self.ledger.path)
+
+    # --- Background compaction ---
+    # The caller freezes the state a slice at a time between commands, so the
+    # slices may come from different moments. That is safe because every
+    # change made after ``begin_compaction`` stays in the ledger and is
+    # replayed over the snapshot, and ledger values are absolute.
+    def begin_compaction(self):
+        return self.ledger.mark()
+
+    def write_snapshots(self, users, matchups):
+        """Write frozen copies of the state (from a worker thread; touches only the snapshot files)."""
+        write_json(self.users_file, users, self.stats)
+        write_json(self.matchups_file, matchups, self.stats)
+
+    def end_compaction(self, mark):
+        """Drop the ledger records the new snapshots cover, keeping those logged while they were written."""
+        self.ledger.drop(mark)
+        self._mark_dirty(self.users_file, self.matchups_file, self.ledger.path)
+
+    def close(self):
+        self.ledger.close()
+
+    def _mark_dirty(self, *filenames):
+        if self.mirror:
+            for filename in filenames:
+                self.mirror.mark_dirty(filename)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id    TEXT PRIMARY KEY,
+    balance    INTEGER NOT NULL,
+    last_claim TEXT,
+    data       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matchups (
+    matchup_id TEXT PRIMARY KEY,
+    type       TEXT,
+    locked     INTEGER NOT NULL DEFAULT 0,
+    settled    INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bets (
+    bet_id     TEXT PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    matchup_id TEXT,
+    kind       TEXT,
+    amount     INTEGER NOT NULL,
+    resolved   INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    user_id TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    bet_id  TEXT,
+    data    TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+);
+CREATE INDEX IF NOT EXISTS bets_user_id ON bets (user_id);
+CREATE INDEX IF NOT EXISTS bets_matchup_id ON bets (matchup_id);
+CREATE INDEX IF NOT EXISTS bets_resolved ON bets (resolved);
+"""
+
+class SqliteStorage:
+    """SQLite engine in WAL mode with one row per user, matchup, bet and history entry.
+
+    ``record`` receives the same ``(path, value)`` changes the JSON ledger
+    logs and turns them into targeted row upserts/deletes, all inside one
+    transaction per operation, so there is no ledger to compact. The JSON
+    snapshots the GitHub mirror pushes are exported on a timer by ``start``,
+    from a background thread reading its own consistent view of the
+    database; ``compact`` exports from memory right away (startup, shutdown).
+    """
+
+    pending = 0  # changes are in the database as soon as they are recorded
+
+    def __init__(self, db_file, users_file=None, matchups_file=None, mirror=None):
+        self.db_file = db_file
+        self.users_file = users_file
+        self.matchups_file = matchups_file
+        self.mirror = mirror
+        self.changes = 0  # recorded since the last export
+        self.stats = io_stats()
+        # Opened on the startup worker thread, used from the event loop afterwards (never both at once)
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._export_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def is_empty(self):
+        return not self.conn.execute("SELECT 1 FROM users UNION ALL SELECT 1 FROM matchups LIMIT 1").fetchone()
+
+    def load(self):
+        return read_state(self.conn)
+
+    def import_state(self, users, matchups):
+        """One-shot migration of whole in-memory state (e.g. from the JSON files)."""
+        with self.conn:
+            for uid, user in users.items():
+                self._write_user(uid, user, deep=True)
+            for mid, matchup in matchups.items():
+                self._write_matchup(mid, matchup, deep=True)
+
+    def record(self, op, changes, state):
+        started = time.perf_counter()
+        with self.conn:
+            for path, *_ in changes:
+                self._apply(state, path)
+        self.changes += 1
+        self.stats["write_seconds"] += time.perf_counter() - started
+
+    def compact(self, users, matchups):
+        with self._export_lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._write_snapshots(users, matchups)
+        self.changes = 0
+
+    def start(self, interval):
+        """Export the JSON snapshots every ``interval`` seconds, when anything changed, from a background thread."""
+        if self._thread or not (self.users_file and self.matchups_file):
+            return
+        self._thread = threading.Thread(target=self._export_every, args=(interval,), name="sqlite-export", daemon=True)
+        self._thread.start()
+
+    def export(self):
+        """Write the JSON snapshots from one read transaction on a separate connection (safe from any thread)."""
+        changes = self.changes
+        with self._export_lock:
+            conn = sqlite3.connect(self.db_file, isolation_level=None)
+            try:
+                conn.execute("BEGIN")  # every SELECT below sees the same snapshot of the WAL
+                users, matchups = read_state(conn)
+                conn.execute("COMMIT")
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")  # never waits on the event loop's writes
+            finally:
+                conn.close()
+            self._write_snapshots(users, matchups)
+        self.changes -= changes
+
+    def close(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.conn.close()
+
+    def _export_every(self, interval):
+        while not self._stopping.wait(interval):
+            if self.changes:
+                try:
+                    self.export()
+                except (sqlite3.Error, OSError) as e:
+                    print(f"⚠️ SQLite JSON export failed: {e}")
+
+    def _write_snapshots(self, users, matchups):
+        if self.users_file and self.matchups_file:
+            write_json(self.users_file, users, self.stats)
+            write_json(self.matchups_file, matchups, self.stats)
+            if self.mirror:
+                self.mirror.mark_dirty(self.users_file)
+                self.mirror.mark_dirty(self.matchups_file)
+
+    # --- Row mapping ---
+    def _apply(self, state, path):
+        table, key, *rest = path
+        if table == "users":
+            user = state["users"].get(key)
+            if user is None:
+                self.conn.execute("DELETE FROM users WHERE user_id = ?", (key,))
+                self.conn.execute("DELETE FROM history WHERE user_id = ?", (key,))
+            elif rest[:1] == ["bets"] and len(rest) > 1:
+                bet = user["bets"].get(rest[1])
+                if bet is not None:
+                    self._write_bet(bet)
+                else:
+                    # Leaving the pending set means the bet was resolved (it lives on in history)
+                    self.conn.execute("UPDATE bets SET resolved = 1 WHERE bet_id = ?", (rest[1],))
+            elif rest == ["history"]:
+                # The whole hot window was replaced (older entries moved to the archive)
+                self.conn.execute("DELETE FROM history WHERE user_id = ?", (key,))
+                for seq, entry in enumerate(user["history"]):
+                    self._write_history(key, seq, entry)
+            elif rest[:1] == ["history"] and len(rest) > 1:
+                seq = rest[1]
+                if seq < len(user["history"]):
+                    self._write_history(key, seq, user["history"][seq])
+                else:
+                    self.conn.execute("DELETE FROM history WHERE user_id = ? AND seq >= ?", (key, seq))
+            else:
+                self._write_user(key, user, deep=not rest)
+        elif table == "matchups":
+            matchup = state["matchups"].get(key)
+            if matchup is None:
+                self.conn.execute("DELETE FROM matchups WHERE matchup_id = ?", (key,))
+                self.conn.execute("DELETE FROM bets WHERE matchup_id = ? AND resolved = 1", (key,))
+            elif rest[:1] == ["bets"] and len(rest) > 1:
+                bet = matchup["bets"].get(rest[1])
+                if bet is not None:
+                    self._write_bet(bet)
+                else:
+                    self.conn.execute("DELETE FROM bets WHERE bet_id = ?", (rest[1],))
+            else:
+                self._write_matchup(key, matchup, deep=not rest)
+
+    def _write_user(self, uid, user, deep=False):
+        data = {k: v for k, v in as_json(user).items() if k not in ("bets", "history")}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, balance, last_claim, data) VALUES (?, ?, ?, ?)",
+            (uid, data.get("balance", 0), data.get("last_claim"), json.dumps(data, default=encode))
+        )
+        if deep:
+            for bet in user.get("bets", {}).values():
+                self._write_bet(bet)
+            self.conn.execute("DELETE FROM history WHERE user_id = ?", (uid,))
+            for seq, entry in enumerate(user.get("history", [])):
+                self._write_history(uid, seq, entry)
+
+    def _write_matchup(self, mid, matchup, deep=False):
+        data = {k: v for k, v in as_json(matchup).items() if k != "bets"}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO matchups (matchup_id, type, locked, settled, data) VALUES (?, ?, ?, ?, ?)",
+            (mid, matchup.get("type"), int(bool(matchup.get("locked"))), int(bool(matchup.get("settled"))), json.dumps(data, default=encode))
+        )
+        if deep:
+            for bet in matchup.get("bets", {}).values():
+                self._write_bet(bet)
+
+    def _write_bet(self, bet):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO bets (bet_id, user_id, matchup_id, kind, amount, resolved, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (bet["id"], bet["user_id"], bet.get("matchup_id"), bet.get("kind"), bet["amount"], int(bool(bet.get("resolved"))), json.dumps(bet, default=encode))
+        )
+
+    def _write_history(self, uid, seq, entry):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO history (user_id, seq, bet_id, data) VALUES (?, ?, ?, ?)",
+            (uid, seq, entry.get("id"), json.dumps(entry, default=encode))
+        )
+
+def read_state(conn):
+    """``(users, matchups)`` as plain dicts from the SQLite tables."""
+    users, matchups = {}, {}
+    for uid, data in conn.execute("SELECT user_id, data FROM users"):
+        users[uid] = dict(json.loads(data), bets={}, history=[])
+    for uid, data in conn.execute("SELECT user_id, data FROM history ORDER BY user_id, seq"):
+        if uid in users:
+            users[uid]["history"].append(json.loads(data))
+    for mid, data in conn.execute("SELECT matchup_id, data FROM matchups"):
+        matchups[mid] = dict(json.loads(data), bets={})
+    for data, resolved in conn.execute("SELECT data, resolved FROM bets"):
+        bet = json.loads(data)
+        if not resolved and bet["user_id"] in users:
+            users[bet["user_id"]]["bets"][bet["id"]] = bet
+        if bet.get("matchup_id") in matchups:
+            matchups[bet["matchup_id"]]["bets"][bet["id"]] = bet
+    return users, matchups
@@ -0,0 +1,78 @@
+from admission import AdmissionControl
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def gate(clock, saturated=None, **kwargs):
+    options = dict(user_capacity=10, user_rate=0.5, global_capacity=300, global_rate=100.0,
+                   costs={"bet": 3}, default_cost=1, saturated=saturated, clock=clock)
+    options.update(kwargs)
+    return AdmissionControl(**options)
+
+def test_user_bucket_empties_then_refills_with_the_clock():
+    clock = FakeClock()
+    admission = gate(clock)
+    assert [admission.admit(1, "bet").admitted for _ in range(4)] == [True, True, True, False]
+
+    rejected = admission.admit(1, "bet")
+    assert rejected.reason == "user"
+    assert rejected.retry_after == 4.0  # 1 token left, 2 more at 0.5/s
+
+    clock.now = 3.9
+    assert not admission.admit(1, "bet").admitted
+    clock.now = 4.0
+    assert admission.admit(1, "bet").admitted
+    assert admission.admit(2, "bet").admitted  # other users have their own bucket
+
+def test_refill_never_exceeds_capacity():
+    clock = FakeClock()
+    admission = gate(clock)
+    clock.now = 1_000_000.0
+    assert sum(admission.admit(1, "balance").admitted for _ in range(20)) == 10
+
+def test_shared_bucket_limits_everyone_together():
+    clock = FakeClock()
+    admission = gate(clock, global_capacity=30, global_rate=10.0)
+    decisions = [admission.admit(uid, "bet") for uid in range(20)]
+    assert sum(d.admitted for d in decisions) == 10
+    assert {d.reason for d in decisions if not d.admitted} == {"global"}
+    assert decisions[-1].retry_after == 0.3
+
+    clock.now = 0.3
+    assert admission.admit(99, "bet").admitted
+    assert admission.stats["rejected_global"] == 10
+
+def test_writes_are_shed_while_saturated_but_reads_pass():
+    clock = FakeClock()
+    saturated = [True]
+    admission = gate(clock, saturated=lambda: saturated[0])
+    shed = admission.admit(1, "bet")
+    assert (shed.admitted, shed.reason, shed.retry_after) == (False, "shed", 0.0)
+    assert admission.admit(1, "balance").admitted
+
+    saturated[0] = False
+    # Shedding charged nothing, so the bucket still has room for three bets
+    assert [admission.admit(1, "bet").admitted for _ in range(3)] == [True, True, True]
+    assert admission.stats["shed"] == 1
+
+def test_only_the_first_rejection_of_a_streak_notifies():
+    clock = FakeClock()
+    admission = gate(clock, user_capacity=1, user_rate=1.0)
+    assert admission.admit(1, "balance").admitted
+    assert [admission.admit(1, "balance").notify for _ in range(3)] == [True, False, False]
+
+    clock.now = 1.0
+    assert admission.admit(1, "balance").admitted
+    assert admission.admit(1, "balance").notify
+
+def test_least_recently_used_buckets_are_evicted():
+    clock = FakeClock()
+    admission = gate(clock, user_capacity=1, user_rate=0.001, max_users=2)
+    for uid in (1, 2, 1, 3):  # 1 is used again, so 2 is the one evicted
+        admission.admit(uid, "balance")
+    assert not admission.admit(1, "balance").admitted
+    assert admission.admit(2, "balance").admitted  # came back full
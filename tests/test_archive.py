@@ -0,0 +1,44 @@
+import json, os
+
+from archive import HistoryArchive
+
+def bets(uid, start, n):
+    return [{"id": f"b_{uid}_{i}", "placed_at": 1000 + i, "amount": 10} for i in range(start, start + n)]
+
+def test_submitted_batches_are_readable_once_written(tmp_path):
+    archive = HistoryArchive(str(tmp_path), segment_entries=25)
+    futures = [archive.submit({"u1": bets("u1", i * 10, 10), "u2": bets("u2", i * 10, 5)}) for i in range(6)]
+    for future in futures:
+        future.result(timeout=10)
+    assert archive.count("u1") == 60 and archive.count("u2") == 30
+    assert [bet["id"] for bet in archive.read("u1", 0, 3)] == ["b_u1_59", "b_u1_58", "b_u1_57"]
+    assert [bet["id"] for bet in archive.read("u2", 27, 5)] == ["b_u2_2", "b_u2_1", "b_u2_0"]
+    archive.close()
+
+    reopened = HistoryArchive(str(tmp_path), segment_entries=25)
+    assert reopened.count("u1") == 60 and reopened.segment == archive.segment
+
+def test_unindexed_members_are_recovered_and_a_torn_one_cut(tmp_path):
+    archive = HistoryArchive(str(tmp_path), index_interval=3600)
+    archive.submit({"u1": bets("u1", 0, 10)}).result(timeout=10)
+    archive.close()
+    indexed = os.path.getsize(archive._segment_path(archive.segment))
+
+    # Two more members reach the segment but the index is never saved again, and a third is torn
+    archive = HistoryArchive(str(tmp_path), index_interval=3600)
+    archive.submit({"u1": bets("u1", 10, 10)}).result(timeout=10)
+    archive.submit({"u2": bets("u2", 0, 4)}).result(timeout=10)
+    path = archive._segment_path(archive.segment)
+    written = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00partial")
+    with open(os.path.join(str(tmp_path), "index.json")) as f:
+        assert json.load(f)["segment_bytes"] == indexed
+
+    recovered = HistoryArchive(str(tmp_path))
+    assert recovered.count("u1") == 20 and recovered.count("u2") == 4
+    assert os.path.getsize(path) == written
+    assert [bet["id"] for bet in recovered.read("u1", 0, 1)] == ["b_u1_19"]
+    recovered.submit({"u2": bets("u2", 4, 1)}).result(timeout=10)
+    assert [bet["id"] for bet in recovered.read("u2", 0, 5)] == [f"b_u2_{i}" for i in range(4, -1, -1)]
+    recovered.close()
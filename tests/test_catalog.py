@@ -0,0 +1,32 @@
+import json
+
+from catalog import MatchupCatalog
+
+def matchup(mid, kind="spread", locked=False, settled=False, **extra):
+    return {"id": mid, "type": kind, "locked": locked, "settled": settled, **extra}
+
+def test_matchups_move_between_status_buckets():
+    catalog = MatchupCatalog("unused.jsonl")
+    matchups = {"m_1": matchup("m_1"), "m_2": matchup("m_2", "prop"), "m_3": matchup("m_3", locked=True)}
+    catalog.rebuild(matchups)
+    assert [m["id"] for m in catalog.open()] == ["m_1", "m_2"]
+    assert [m["id"] for m in catalog.open("prop")] == ["m_2"]
+
+    matchups["m_1"]["settled"] = True
+    catalog.update(matchups["m_1"])
+    catalog.remove("m_2")
+    assert catalog.open() == [] and catalog.count("locked") == 1 and catalog.count("settled") == 1
+
+def test_eviction_goes_by_settled_at_and_keeps_unstamped_matchups(tmp_path):
+    archive_file = tmp_path / "archive.jsonl"
+    catalog = MatchupCatalog(str(archive_file))
+    catalog.rebuild({
+        "old": matchup("old", settled=True, settled_at=1_000),
+        "recent": matchup("recent", settled=True, settled_at=5_000, start_time=1_000),
+        "legacy": matchup("legacy", settled=True, start_time=1_000),  # left for the loader to stamp
+        "open": matchup("open", start_time=1_000),
+    })
+    assert [m["id"] for m in catalog.evict(2_000)] == ["old"]
+    assert [json.loads(line)["id"] for line in archive_file.read_text().splitlines()] == ["old"]
+    assert sorted(m["id"] for m in catalog.listing("settled")) == ["legacy", "recent"]
+    assert catalog.evict(2_000) == []
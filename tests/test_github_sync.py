@@ -0,0 +1,245 @@
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from github_sync import GitHubSync
+
+class FakeGitHub:
+    """Local stand-in for the Git Data API endpoints GitHubSync calls, for one repo and branch."""
+
+    def __init__(self):
+        self.calls = []  # [(method, path, payload)]
+        self.failures = []  # [(method, path suffix, status)] answered once each, in order of arrival
+        self.head = "c0"
+        self.trees = {"t0": {}}  # tree sha -> {path: content}
+        self.commits = {"c0": "t0"}  # commit sha -> tree sha
+        self.parents = {"c0": []}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.handle(self, "GET")
+
+            def do_POST(self):
+                fake.handle(self, "POST")
+
+            def do_PATCH(self):
+                fake.handle(self, "PATCH")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def files(self):
+        return self.trees[self.commits[self.head]]
+
+    def move_head(self, files):
+        """Someone else commits to the branch."""
+        with self._lock:
+            self.head = self._commit(self._tree(self.commits[self.head], files), [self.head])
+
+    def handle(self, request, method):
+        length = int(request.headers.get("Content-Length") or 0)
+        payload = json.loads(request.rfile.read(length)) if length else None
+        path = request.path.split("/repos/owner/repo/", 1)[1]
+        with self._lock:
+            self.calls.append((method, path, payload))
+            status, body = self._route(method, path, payload)
+        data = json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.send_header("X-RateLimit-Remaining", str(5000 - len(self.calls)))
+        request.send_header("X-RateLimit-Limit", "5000")
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _route(self, method, path, payload):
+        for failure in self.failures:
+            if failure[0] == method and path.endswith(failure[1]):
+                self.failures.remove(failure)
+                return failure[2], {"message": "injected"}
+        if method == "GET" and path == "git/ref/heads/main":
+            return 200, {"object": {"sha": self.head}}
+        if method == "GET" and path.startswith("git/commits/"):
+            return 200, {"tree": {"sha": self.commits[path.rsplit("/", 1)[1]]}}
+        if method == "POST" and path == "git/trees":
+            if payload["base_tree"] not in self.trees:
+                return 422, {"message": "base tree not found"}
+            return 201, {"sha": self._tree(payload["base_tree"], {e["path"]: e["content"] for e in payload["tree"]})}
+        if method == "POST" and path == "git/commits":
+            return 201, {"sha": self._commit(payload["tree"], payload["parents"])}
+        if method == "PATCH" and path == "git/refs/heads/main":
+            if self.parents.get(payload["sha"]) != [self.head]:
+                return 422, {"message": "Update is not a fast forward"}
+            self.head = payload["sha"]
+            return 200, {"object": {"sha": self.head}}
+        return 404, {"message": "Not Found"}
+
+    def _tree(self, base, files):
+        sha = f"t{len(self.trees)}"
+        self.trees[sha] = {**self.trees[base], **files}
+        return sha
+
+    def _commit(self, tree, parents):
+        sha = f"c{len(self.commits)}"
+        self.commits[sha] = tree
+        self.parents[sha] = parents
+        return sha
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # GitHubSync pushes files by their relative names
+    fake = FakeGitHub()
+    yield fake
+    fake.server.shutdown()
+
+def write(name, content):
+    with open(name, "w") as f:
+        f.write(content)
+
+def endpoints(calls):
+    return [(method, path) for method, path, _ in calls]
+
+def test_files_go_up_as_one_tree_commit_and_ref_update(github):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", '{"1": 500}')
+    write("matchups.json", "{}")
+    assert sync.push_files(["users.json", "matchups.json"])
+    assert endpoints(github.calls) == [("GET", "git/ref/heads/main"), ("GET", "git/commits/c0"),
+                                       ("POST", "git/trees"), ("POST", "git/commits"),
+                                       ("PATCH", "git/refs/heads/main")]
+    assert github.files() == {"users.json": '{"1": 500}', "matchups.json": "{}"}
+    assert github.calls[3][2]["parents"] == ["c0"]
+    assert sync.stats["pushes"] == 1 and sync.stats["api_calls"] == 5
+    assert sync.stats["ratelimit_remaining"] == 4995
+
+def test_unchanged_files_are_not_pushed_again(github):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", '{"1": 500}')
+    write("matchups.json", "{}")
+    assert sync.push_files(["users.json", "matchups.json"])
+    github.calls.clear()
+
+    assert sync.push_files(["users.json", "matchups.json"])
+    assert github.calls == []
+
+    write("users.json", '{"1": 450}')
+    assert sync.push_files(["users.json", "matchups.json"])
+    assert [entry["path"] for entry in github.calls[0][2]["tree"]] == ["users.json"]
+
+def test_worker_coalesces_a_burst_of_saves_and_flushes_on_stop(github):
+    sync = GitHubSync("owner/repo", "token", interval=0.2, api_url=github.url)
+    sync.start()
+    for balance in range(20):
+        write("users.json", f'{{"1": {balance}}}')
+        sync.mark_dirty("users.json")
+        sync.mark_dirty("matchups.json" if balance % 2 else "users.json")
+        write("matchups.json", f'{{"m": {balance}}}')
+    deadline = time.monotonic() + 5
+    while sync.stats["pushes"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sync.stats["pushes"] == 1
+    assert github.files() == {"users.json": '{"1": 19}', "matchups.json": '{"m": 19}'}
+
+    write("users.json", '{"1": "final"}')
+    sync.mark_dirty("users.json")
+    sync.stop()
+    assert sync.stats["pushes"] == 2 and github.files()["users.json"] == '{"1": "final"}'
+
+def test_steady_state_pushes_reuse_the_cached_head_and_tree(github):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", "1")
+    assert sync.push_files(["users.json"])
+    for n in range(2, 6):
+        github.calls.clear()
+        write("users.json", str(n))
+        assert sync.push_files(["users.json"])
+        assert endpoints(github.calls) == [("POST", "git/trees"), ("POST", "git/commits"), ("PATCH", "git/refs/heads/main")]
+    assert github.files()["users.json"] == "5"
+
+@pytest.mark.parametrize("status", [409, 422])
+def test_a_conflict_refetches_the_head_and_retries(github, status):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", "1")
+    write("matchups.json", "{}")
+    assert sync.push_files(["users.json", "matchups.json"])
+    github.calls.clear()
+
+    github.move_head({"README.md": "someone else's commit"})
+    github.failures.append(("PATCH", "git/refs/heads/main", status))
+    write("users.json", "2")
+    assert sync.push_files(["users.json", "matchups.json"])
+    assert endpoints(github.calls) == [("POST", "git/trees"), ("POST", "git/commits"), ("PATCH", "git/refs/heads/main"),
+                                       ("GET", "git/ref/heads/main"), ("GET", "git/commits/c2"),
+                                       ("POST", "git/trees"), ("POST", "git/commits"), ("PATCH", "git/refs/heads/main")]
+    assert github.calls[6][2]["parents"] == ["c2"]
+    assert github.files() == {"users.json": "2", "matchups.json": "{}", "README.md": "someone else's commit"}
+    assert sync.stats["pushes"] == 2 and sync.stats["push_failures"] == 0
+
+    # The blob cache was dropped with the head, so an unchanged file is checked against GitHub again
+    github.calls.clear()
+    assert sync.push_files(["users.json", "matchups.json"])
+    assert [entry["path"] for entry in github.calls[0][2]["tree"]] == ["matchups.json"]
+
+def test_a_branch_that_keeps_moving_gives_up_after_the_retries(github):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", "1")
+    github.failures += [("PATCH", "git/refs/heads/main", 422)] * 3
+    assert not sync.push_files(["users.json"], retries=2)
+    assert sync.stats["push_failures"] == 1
+    assert github.files() == {}
+
+def test_a_rejected_push_backs_off_and_keeps_the_files_dirty(github):
+    sync = GitHubSync("owner/repo", "token", interval=0.1, api_url=github.url)
+    github.failures += [("GET", "git/ref/heads/main", 401)] * 20
+    write("users.json", "1")
+    sync.start()
+    sync.mark_dirty("users.json")
+    time.sleep(1.0)
+    # Waits of 0.1, 0.2, 0.4 and 0.8s leave room for four attempts where retrying every interval would make ten
+    assert 2 <= len(github.calls) <= 5
+    assert set(endpoints(github.calls)) == {("GET", "git/ref/heads/main")}
+    assert sync.failing() and sync.queue_depth() == 1
+
+    github.failures.clear()
+    sync.stop()  # the final flush still tries once
+    assert github.files() == {"users.json": "1"}
+    assert not sync.failing() and sync._backoff_until is None
+
+def test_backoff_doubles_up_to_the_cap(github):
+    sync = GitHubSync("owner/repo", "token", interval=5, api_url=github.url, max_backoff=30)
+    write("users.json", "1")
+    waits = []
+    for _ in range(5):
+        github.failures.append(("GET", "git/ref/heads/main", 403))
+        started = time.monotonic()
+        assert not sync.push_files(["users.json"])
+        waits.append(round(sync._backoff_until - started))
+    assert waits == [5, 10, 20, 30, 30]
+
+    # Other failures count as failing but don't hold the worker back any further
+    sync._backoff_until = None
+    github.failures.append(("POST", "git/trees", 500))
+    assert not sync.push_files(["users.json"])
+    assert sync._backoff_until is None
+
+def test_a_failing_mirror_does_not_count_as_behind(github):
+    sync = GitHubSync("owner/repo", "token", api_url=github.url)
+    write("users.json", "1")
+    github.failures.append(("GET", "git/ref/heads/main", 500))
+    sync.mark_dirty("users.json")
+    now = time.monotonic()
+    sync.flush()
+    assert sync.failing() and sync.lag(now + 3600) > 3600
+    assert not sync.behind(60, now + 3600)  # shedding writes wouldn't bring GitHub back
+
+    sync.flush()
+    assert not sync.failing()
+    sync.mark_dirty("users.json")
+    assert sync.behind(60, time.monotonic() + 61)
@@ -0,0 +1,84 @@
+import threading, time, uuid
+
+from ids import EPOCH_MS, MAX_SEQUENCE, IdGenerator, code_ms, id_bounds, id_time
+
+class FakeClock:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms * 1_000_000
+
+def test_ids_are_unique_and_ordered_across_threads_and_workers():
+    generators = [IdGenerator(worker) for worker in (0, 1, 1023)]
+    issued = [[] for _ in range(16)]
+
+    def mint(out, generator):
+        out += [generator.next("b") for _ in range(5000)]
+
+    threads = [threading.Thread(target=mint, args=(out, generators[i % len(generators)])) for i, out in enumerate(issued)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    every = [i for out in issued for i in out]
+    assert len(set(every)) == len(every) == 80_000
+    for out in issued:
+        assert out == sorted(out)  # one thread sees its generator's ids strictly increase
+
+def test_clock_stepping_back_never_reissues_or_reorders():
+    clock = FakeClock(EPOCH_MS + 10_000)
+    generator = IdGenerator(clock=clock)
+    issued = [generator.next("b") for _ in range(3)]
+    clock.ms -= 5_000
+    issued += [generator.next("b") for _ in range(3)]
+    clock.ms += 5_001
+    issued += [generator.next("b") for _ in range(3)]
+    assert issued == sorted(set(issued))
+    assert code_ms(issued[-1]) == 10_001
+
+def test_sequence_overflow_moves_on_to_the_next_millisecond():
+    clock = FakeClock(EPOCH_MS + 42)
+    generator = IdGenerator(clock=clock)
+    issued = [generator.next("b") for _ in range(MAX_SEQUENCE + 3)]
+    assert issued == sorted(set(issued))
+    assert [code_ms(i) for i in issued[MAX_SEQUENCE - 1:]] == [42, 42, 43, 43]
+
+    clock.ms += 1  # the real clock catches up to the borrowed millisecond
+    assert generator.next("b") > issued[-1]
+
+def test_observe_skips_past_ids_already_in_the_data():
+    stored = [IdGenerator(worker=3, clock=FakeClock(EPOCH_MS + 50_000)).next("b") for _ in range(2)]
+    generator = IdGenerator(worker=3, clock=FakeClock(EPOCH_MS + 1_000))  # restarted onto a clock that is behind
+    generator.observe(stored + ["b_123456", "m_7"])
+    fresh = generator.next("b")
+    assert fresh > max(stored)
+    assert code_ms(fresh) == 50_001
+
+    generator.observe(["b_123456"])  # only legacy ids: nothing changes
+    assert generator.next("b") > fresh
+
+def test_bounds_cover_ids_created_in_the_range():
+    clock = FakeClock(EPOCH_MS + 1_000_000)
+    generator = IdGenerator(worker=7, clock=clock)
+    inside = generator.next("b")
+    clock.ms += 5_000
+    after = generator.next("b")
+    low, high = id_bounds("b", id_time(inside), id_time(inside) + 1)
+    assert low <= inside <= high < after
+    assert code_ms("b_123456") is None and id_time("b_123456") is None
+
+def test_generation_is_cheap():
+    # Loose on purpose: a guard against an accidental slow path, not a benchmark of the machine
+    generator = IdGenerator()
+    count = 100_000
+    started = time.perf_counter()
+    for _ in range(count):
+        generator.next("b")
+    elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(count):
+        f"b_{uuid.uuid4().hex}"
+    baseline = time.perf_counter() - started
+    assert elapsed < max(2.0, 3 * baseline), f"{count} ids took {elapsed:.2f}s (uuid4: {baseline:.2f}s)"
@@ -0,0 +1,61 @@
+import random, time
+
+from leaderboard import CATEGORIES, Leaderboard, stat_value
+
+def random_user(rng):
+    return {"balance": rng.randint(0, 5000),
+            "stats": {category: rng.randint(0, 300) for category in CATEGORIES if category != "balance"}}
+
+def naive_top(users, category, k):
+    ranked = sorted(users.items(), key=lambda item: (-stat_value(item[1], category), item[0]))
+    return [(uid, stat_value(user, category)) for uid, user in ranked[:k]]
+
+def test_rankings_follow_updates_like_a_full_sort():
+    rng = random.Random(9)
+    users = {f"{rng.choice(['', '5:', '7:'])}{i}": random_user(rng) for i in range(2000)}
+    users["legacy"] = {"money": 10}  # old records with no balance or stats rank as zeros
+    board = Leaderboard(group=lambda uid: int(uid.split(":")[0]) if ":" in uid else None)
+    board.rebuild(users)
+    for step in range(5000):
+        uid = rng.choice(sorted(users))
+        if rng.random() < 0.05:
+            del users[uid]
+            board.update(uid, None)
+        else:
+            users[uid] = random_user(rng)
+            board.update(uid, users[uid])
+        if step % 1000 == 0:
+            users[f"new_{step}"] = random_user(rng)
+            board.update(f"new_{step}", users[f"new_{step}"])
+
+    for group in (None, 5, 7):
+        members = {uid: user for uid, user in users.items() if board.group(uid) == group}
+        assert board.size(group) == len(members)
+        for category in CATEGORIES:
+            expected = naive_top(members, category, 10)
+            assert board.top(category, 10, group) == expected
+            ranked = naive_top(members, category, len(members))
+            for position in (0, len(ranked) // 2, len(ranked) - 1):
+                assert board.rank(category, ranked[position][0]) == position + 1
+    assert board.top_all("balance", 10) == naive_top(users, "balance", 10)
+
+def test_top_k_beats_sorting_every_user():
+    rng = random.Random(90)
+    users = {str(10**17 + i): random_user(rng) for i in range(100_000)}
+    board = Leaderboard()
+    board.rebuild(users)
+
+    started = time.perf_counter()
+    for category in CATEGORIES:
+        naive = naive_top(users, category, 10)
+    sort_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(100):
+        for category in CATEGORIES:
+            indexed = board.top(category, 10)
+            board.rank(category, "100000000000050000")
+    index_seconds = (time.perf_counter() - started) / 100
+    assert indexed == naive
+    # Loose on purpose; in practice the index answers thousands of times faster
+    assert index_seconds * 50 < sort_seconds, f"sort {sort_seconds * 1e3:.1f}ms vs index {index_seconds * 1e3:.3f}ms"
@@ -0,0 +1,86 @@
+import asyncio, random
+
+from locks import LockManager
+
+async def place(locks, balances, stakes, uid, mid, amount):
+    """The check-then-deduct shape of place_bet, with an await where persistence used to block."""
+    async with locks.hold(users=[uid], matchups=[mid]):
+        if balances[uid] < amount:
+            return False
+        balance = balances[uid]
+        await asyncio.sleep(0)
+        balances[uid] = balance - amount
+        stakes[mid] += amount
+        return True
+
+async def parlay(locks, balances, stakes, uid, mids, amount):
+    async with locks.hold(users=[uid], matchups=mids):
+        if balances[uid] < amount:
+            return False
+        balance = balances[uid]
+        await asyncio.sleep(0)
+        balances[uid] = balance - amount
+        for mid in mids:
+            stakes[mid] += amount / len(mids)
+        return True
+
+def test_concurrent_bets_conserve_balances():
+    rng = random.Random(5)
+    users = [str(10**17 + i) for i in range(50)]
+    matchups = [f"m_{i}" for i in range(20)]
+    balances = {uid: 1000 for uid in users}
+    stakes = {mid: 0 for mid in matchups}
+
+    async def run():
+        locks = LockManager(stripes=8)  # few stripes, so unrelated users share locks too
+        jobs = []
+        for _ in range(5000):
+            uid = rng.choice(users)
+            if rng.random() < 0.2:
+                jobs.append(parlay(locks, balances, stakes, uid, rng.sample(matchups, rng.randint(2, 5)), rng.randint(1, 100)))
+            else:
+                jobs.append(place(locks, balances, stakes, uid, rng.choice(matchups), rng.randint(1, 100)))
+        return await asyncio.wait_for(asyncio.gather(*jobs), timeout=30)  # a deadlock fails here
+
+    placed = asyncio.run(run())
+    assert any(placed) and not all(placed)  # some bets had to be refused for lack of funds
+    assert all(balance >= 0 for balance in balances.values())
+    assert sum(balances.values()) + round(sum(stakes.values())) == 1000 * len(users)
+
+def test_unlocked_bets_overspend():
+    """The same workload without locks loses money, so the test above really exercises the locks."""
+    balances = {"u": 100}
+
+    async def bet():
+        if balances["u"] >= 100:
+            balance = balances["u"]
+            await asyncio.sleep(0)
+            balances["u"] = balance - 100
+            return True
+        return False
+
+    async def run():
+        return await asyncio.gather(*(bet() for _ in range(10)))
+
+    assert sum(asyncio.run(run())) > 1
+
+def test_matchup_locks_are_dropped_once_nobody_holds_them():
+    locks = LockManager()
+    order = []
+
+    async def hold(mid, n):
+        async with locks.hold(matchups=[mid]):
+            order.append((mid, n, "in"))
+            await asyncio.sleep(0)
+            order.append((mid, n, "out"))
+
+    async def run():
+        await asyncio.gather(*(hold(f"typo_{i}", 0) for i in range(1000)))
+        assert len(locks._matchup_locks) == 0
+        order.clear()
+        # Waiters keep the lock alive, so holders of one id still take turns
+        await asyncio.gather(*(hold("m_1", n) for n in range(3)))
+        assert len(locks._matchup_locks) == 0
+
+    asyncio.run(run())
+    assert order == [("m_1", n, step) for n in range(3) for step in ("in", "out")]
@@ -0,0 +1,61 @@
+import json, random, tracemalloc
+
+from models import Bet, decode_state, encode
+
+def legacy_state(n_users, bets_per_user, rng):
+    """Users and matchups as the JSON files hold them: every bet written out under its user and its matchup."""
+    users, matchups = {}, {f"m_{i}": {"id": f"m_{i}", "type": "spread", "title": f"Game {i}", "home": "Hawks",
+                                      "away": "Owls", "spread": -3.5, "bets": {}, "locked": False, "settled": False,
+                                      "result": None} for i in range(20)}
+    for u in range(n_users):
+        uid = str(10**17 + u)
+        bets = {}
+        for b in range(bets_per_user):
+            mid = rng.choice(sorted(matchups))
+            bet = {"id": f"b_{u}_{b}", "user_id": uid, "matchup_id": mid, "kind": "spread",
+                   "selection": rng.choice(["Hawks", "Owls"]), "amount": rng.randint(1, 500), "odds": 1.9,
+                   "placed_at": f"2025-09-{rng.randint(1, 28):02d}T12:{rng.randint(0, 59):02d}:00", "resolved": False,
+                   "payout": 0}
+            bets[bet["id"]] = bet
+            matchups[mid]["bets"][bet["id"]] = bet
+        users[uid] = {"balance": 500, "bets": bets, "history": [], "achievements": ["first_bet"],
+                      "last_claim": "2025-09-01T08:00:00",
+                      "stats": {"spent": 0, "won": 0, "lost": 0, "bets_won": 0, "bets_lost": 0},
+                      "weekly": {"bets": bets_per_user}, "nickname": "kept as extra"}
+    return users, matchups
+
+def test_records_round_trip_to_the_same_json():
+    users, matchups = legacy_state(50, 10, random.Random(10))
+    text = json.dumps({"users": users, "matchups": matchups}, sort_keys=True)
+    loaded = json.loads(text)
+    decoded_users, decoded_matchups = decode_state(loaded["users"], loaded["matchups"])
+    again = json.dumps({"users": decoded_users, "matchups": decoded_matchups}, default=encode, sort_keys=True)
+    assert json.loads(again) == json.loads(text)
+
+    bet = decoded_users[str(10**17)]["bets"]["b_0_0"]
+    assert isinstance(bet, Bet) and isinstance(bet["placed_at"], int)
+    assert decoded_matchups[bet["matchup_id"]]["bets"]["b_0_0"] is bet  # one object per bet id
+    assert decoded_users[str(10**17)]["nickname"] == "kept as extra"
+
+def allocated(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        state = build()
+        return tracemalloc.get_traced_memory()[0] - before, state
+    finally:
+        tracemalloc.stop()
+
+def test_records_use_less_memory_per_bet_than_dicts():
+    n_users, bets_per_user = 800, 25
+    users, matchups = legacy_state(n_users, bets_per_user, random.Random(100))
+    text = json.dumps({"users": users, "matchups": matchups})
+    del users, matchups
+
+    # json.loads gives every copy of a bet its own dict, as the bot held them before records
+    dict_bytes, _ = allocated(lambda: json.loads(text))
+    record_bytes, _ = allocated(lambda: decode_state(**json.loads(text)))
+    n_bets = n_users * bets_per_user
+    per_dict, per_record = dict_bytes / n_bets, record_bytes / n_bets
+    # Loose on purpose; in practice records take well under half
+    assert per_record < 0.75 * per_dict, f"dicts {per_dict:.0f} B/bet, records {per_record:.0f} B/bet"
@@ -0,0 +1,94 @@
+import asyncio, random, time
+
+import pytest
+
+from numeric import NumericPropBook, NumericPropIndex, worst_case
+
+def prop(mid="p_1", bets=()):
+    return {"id": mid, "type": "prop", "prop_type": "numeric", "title": "Total points?", "bets": {b["id"]: b for b in bets},
+            "locked": False, "settled": False, "result": None}
+
+def bet(bid, selection, amount, resolved=False):
+    return {"id": bid, "user_id": "1", "matchup_id": "p_1", "kind": "prop", "prop_type": "numeric",
+            "selection": selection, "amount": amount, "odds": 1.0, "placed_at": 0, "resolved": resolved, "payout": None}
+
+def per_bet(predictions, stakes, actual):
+    """The original settle_prop loop, one bet at a time."""
+    return [int(stake * (1 + 100 / max(1, abs(actual - float(p))))) for p, stake in zip(predictions, stakes)]
+
+def test_rebuild_skips_predictions_that_are_not_numbers(capsys):
+    index = NumericPropIndex()
+    skipped = index.rebuild({"p_1": prop(bets=[bet("b_1", 21.5, 100), bet("b_2", "LOTS", 50), bet("b_3", 7, 10, resolved=True)])})
+    assert skipped == ["b_2"]
+    assert index.book("p_1").bet_ids == ["b_1"]
+    assert "b_2" in capsys.readouterr().out
+
+def test_book_payouts_match_grading_each_bet():
+    rng = random.Random(17)
+    book = NumericPropBook()
+    bets = [bet(f"b_{i}", rng.choice([rng.randint(0, 60), rng.uniform(0, 60)]), rng.randint(1, 500)) for i in range(2000)]
+    for b in bets:
+        book.add(b)
+    for actual in (0, 17, 23.5, 60):
+        exact = per_bet([b["selection"] for b in bets], [b["amount"] for b in bets], actual)
+        assert book.payouts(actual) == exact
+        assert abs(book.liability(actual) - sum(exact)) <= len(bets)  # grouped stakes round once, not per bet
+    grouped = book.grouped()
+    result, payout = worst_case(grouped, 0, 60)
+    assert payout >= max(total for _, total in book.curve([x / 4 for x in range(241)]))
+
+def test_grading_100k_bets_per_prop():
+    rng = random.Random(170)
+    book = NumericPropBook()
+    predictions = [rng.randint(0, 80) for _ in range(100_000)]
+    stakes = [rng.randint(1, 500) for _ in range(100_000)]
+    for i, (p, stake) in enumerate(zip(predictions, stakes)):
+        book.add({"id": f"b_{i}", "selection": p, "amount": stake})
+
+    started = time.perf_counter()
+    per_bet(predictions, stakes, 42)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    payouts = book.payouts(42)
+    payout_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    curve = book.curve(range(0, 81))
+    curve_seconds = time.perf_counter() - started
+
+    assert len(payouts) == 100_000 and len(curve) == 81
+    # Loose on purpose: grading shouldn't be slower than the old loop, and an 81-point
+    # curve over grouped predictions should cost less than grading once
+    assert payout_seconds < 2 * loop_seconds + 0.05, f"loop {loop_seconds:.3f}s vs book {payout_seconds:.3f}s"
+    assert curve_seconds < loop_seconds, f"81-point curve took {curve_seconds:.3f}s"
+
+@pytest.fixture
+def bot(tmp_path):
+    main = pytest.importorskip("main")
+    import loadsim
+    loadsim.install({}, {}, str(tmp_path))
+    yield main
+    main.archive.close()
+
+def test_bet_refuses_props_and_settlement_grades_bets_outside_the_book(bot):
+    bot.MATCHUPS["p_1"] = bot.Matchup.from_json(prop())
+    bot.catalog.add(bot.MATCHUPS["p_1"])
+    bot.USERS["1"] = bot.User.from_json({"balance": 1000, "bets": {}, "history": [], "stats": {}})
+
+    assert asyncio.run(bot.place_bet("1", "p_1", "lots", 10)).startswith("❌")
+    assert asyncio.run(bot.place_prop_bet("1", "p_1", "lots", 10)).startswith("❌")
+    assert bot.USERS["1"]["balance"] == 1000 and not bot.MATCHUPS["p_1"]["bets"]
+    asyncio.run(bot.place_prop_bet("1", "p_1", "20", 100))
+
+    # Stored before !bet refused props: one prediction that isn't a number, one that is but never reached the book
+    for legacy in (bet("b_old_1", "LOTS", 50), bet("b_old_2", "21", 40)):
+        record = bot.Bet.from_json(legacy)
+        bot.MATCHUPS["p_1"]["bets"][record["id"]] = bot.USERS["1"]["bets"][record["id"]] = record
+    settlement = bot.grade_matchup(bot.MATCHUPS["p_1"], "20")
+    payouts = {b["id"]: payout for b, payout in settlement.by_user["1"]}
+    assert sorted(payouts.values()) == [0, 40 * 101, 100 * 101]
+    assert payouts["b_old_1"] == 0 and payouts["b_old_2"] == 40 * 101
+
+    before = bot.USERS["1"]["balance"]
+    asyncio.run(bot.settler.commit(settlement))
+    assert all(b["resolved"] for b in bot.MATCHUPS["p_1"]["bets"].values())
+    assert bot.USERS["1"]["balance"] - before >= 100 * 101 + 40 * 101  # plus any achievement rewards
@@ -0,0 +1,97 @@
+import random, time
+
+from odds import LegacyOdds, PoolOdds, QuoteBook, implied_decimal_from_moneyline, moneyline_from_decimal
+from volume import VolumeIndex
+
+def game(mid, kind="spread", **extra):
+    return {"id": mid, "type": kind, "home": "Hawks", "away": "Owls", "bets": {}, **extra}
+
+def place(volumes, matchup, selection, amount, kind=None):
+    bet = {"id": f"b_{len(matchup['bets'])}", "kind": kind or matchup["type"], "selection": selection, "amount": amount}
+    matchup["bets"][bet["id"]] = bet
+    volumes.add(matchup["id"], bet)
+
+def original_moneylines(matchup):
+    """calculate_dynamic_moneylines as it was before odds engines, rescanning the bets."""
+    home_vol = sum(b["amount"] for b in matchup["bets"].values() if b["kind"] == "spread" and b["selection"].upper() == matchup["home"].upper())
+    away_vol = sum(b["amount"] for b in matchup["bets"].values() if b["kind"] == "spread" and b["selection"].upper() == matchup["away"].upper())
+    total = home_vol + away_vol
+    if total == 0:
+        return -110, -110
+    home_share, away_share = home_vol / total, away_vol / total
+    return (moneyline_from_decimal(1.8 + (away_share - home_share) * 0.5),
+            moneyline_from_decimal(1.8 + (home_share - away_share) * 0.5))
+
+def test_legacy_engine_keeps_the_original_prices():
+    rng = random.Random(16)
+    volumes = VolumeIndex()
+    matchup = game("m_1")
+    engine = LegacyOdds()
+    for _ in range(300):
+        place(volumes, matchup, rng.choice(["Hawks", "owls", "OVER"]), rng.randint(1, 500),
+              kind=rng.choice(["spread", "spread", "overunder"]))
+        home_ml, away_ml = original_moneylines(matchup)
+        table = engine.table(matchup, volumes)
+        assert table["HAWKS"] == implied_decimal_from_moneyline(home_ml)
+        assert table["OWLS"] == implied_decimal_from_moneyline(away_ml)
+
+def test_pool_engine_prices_every_option_with_the_margin():
+    volumes = VolumeIndex()
+    engine = PoolOdds(margin=0.05, prior=100)
+    prop = game("p_1", "prop", prop_type="choice", options=["Red", "Blue", "Green"])
+    place(volumes, prop, "Red", 600)
+    place(volumes, prop, "blue", 200)
+    table = engine.table(prop, volumes)
+    assert set(table) == {"RED", "BLUE", "GREEN", None}
+    assert table["RED"] < table["BLUE"] < table["GREEN"]
+    assert abs(sum(1 / table[side] for side in ("RED", "BLUE", "GREEN")) - 1.05) < 0.01
+    assert table[None] == engine.min_odds  # not one of the options
+
+    totals = game("t_1", "overunder")
+    place(volumes, totals, "OVER", 300)
+    assert set(engine.table(totals, volumes)) == {"OVER", "UNDER", None}
+
+class CountingEngine(LegacyOdds):
+    def __init__(self):
+        self.priced = 0
+
+    def table(self, matchup, volumes):
+        self.priced += 1
+        return super().table(matchup, volumes)
+
+def test_quotes_are_cached_until_the_volume_changes():
+    volumes = VolumeIndex()
+    engine = CountingEngine()
+    book = QuoteBook(engine, volumes)
+    matchup = game("m_1")
+    first = book.price(matchup, "hawks")
+    assert [book.price(matchup, side) for side in ("Hawks", "OWLS", "nobody")] == [first, book.table(matchup)["OWLS"], 1.9]
+    assert engine.priced == 1
+
+    place(volumes, matchup, "Hawks", 500)
+    assert book.price(matchup, "Hawks") < first  # money on a side shortens its price
+    assert engine.priced == 2
+
+def test_repricing_10k_matchups():
+    rng = random.Random(160)
+    volumes = VolumeIndex()
+    matchups = []
+    for i in range(10_000):
+        kind = rng.choice(["spread", "overunder", "prop"])
+        extra = {"prop_type": "choice", "options": ["A", "B", "C", "D"]} if kind == "prop" else {}
+        matchup = game(f"m_{i}", kind, **extra)
+        for _ in range(rng.randint(0, 5)):
+            place(volumes, matchup, rng.choice(["Hawks", "Owls", "OVER", "UNDER", "A", "B"]), rng.randint(1, 500))
+        matchups.append(matchup)
+    book = QuoteBook(LegacyOdds(), volumes)
+
+    started = time.perf_counter()
+    assert book.reprice(matchups, PoolOdds()) == 10_000
+    reprice_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for matchup in matchups:
+        book.price(matchup, "A")
+    cached_seconds = time.perf_counter() - started
+    # Loose on purpose; in practice a full reprice takes tens of milliseconds
+    assert reprice_seconds < 2.0, f"repricing 10k matchups took {reprice_seconds:.2f}s"
+    assert cached_seconds < reprice_seconds
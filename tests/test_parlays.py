@@ -0,0 +1,95 @@
+import asyncio, itertools, json
+
+import pytest
+
+from models import decode_state, encode
+from parlays import ParlayIndex
+from settlement import Settlement, SettlementEngine, calculate_payout
+
+STAKE = 100
+
+def make_state(legs, bettors=3):
+    """``bettors`` users, each with one parlay picking HOME on matchups m_0..m_<legs-1> at odds 2."""
+    matchups = {f"m_{i}": {"id": f"m_{i}", "type": "game", "title": f"Game {i}", "home": "HOME", "away": "AWAY",
+                           "bets": {}, "locked": True, "settled": False, "result": None} for i in range(legs)}
+    users = {}
+    for n in range(bettors):
+        uid = str(100 + n)
+        bet = {"id": f"b_{uid}", "user_id": uid, "matchup_id": None, "kind": "parlay", "selection":
+               [{"matchup_id": mid, "selection": "HOME", "odds": 2.0} for mid in matchups],
+               "amount": STAKE, "odds": 2.0 ** legs, "placed_at": 0, "resolved": False, "payout": None}
+        users[uid] = {"balance": 1000 - STAKE, "bets": {bet["id"]: bet}, "history": [],
+                      "stats": {"spent": STAKE}, "achievements": [], "last_claim": None}
+    return decode_state(users, matchups)
+
+def settle(index, engine, users, matchup_id, winner):
+    decided, graded_paths = index.grade(matchup_id, users, lambda selection: selection == winner, calculate_payout)
+    asyncio.run(engine.commit(Settlement(matchup_id, decided)))
+    return decided, graded_paths
+
+def setup(legs):
+    users, matchups = make_state(legs)
+    index = ParlayIndex()
+    index.rebuild(users)
+    records = []
+    engine = SettlementEngine(users.__getitem__, lambda kind, *paths: records.append(kind))
+    return users, matchups, index, engine
+
+@pytest.mark.parametrize("legs", [2, 3, 4, 5])
+def test_winning_parlay_pays_once_in_any_settle_order(legs):
+    for order in itertools.permutations(range(legs)):
+        users, matchups, index, engine = setup(legs)
+        for step, i in enumerate(order):
+            decided, graded_paths = settle(index, engine, users, f"m_{i}", "HOME")
+            if step < legs - 1:
+                assert decided == [] and len(graded_paths) == len(users)
+            else:
+                assert [payout for _, payout in decided] == [int(STAKE * 2 ** legs)] * len(users)
+        for user in users.values():
+            assert user["bets"] == {} and len(user["history"]) == 1
+            assert user["balance"] == 1000 - STAKE + int(STAKE * 2 ** legs)
+            assert user["stats"]["bets_won"] == 1
+        assert index._legs == {}
+
+@pytest.mark.parametrize("legs", [2, 3, 4, 5])
+def test_losing_leg_decides_parlay_immediately(legs):
+    for loser in range(legs):
+        users, matchups, index, engine = setup(legs)
+        for i in range(loser):
+            settle(index, engine, users, f"m_{i}", "HOME")
+        decided, _ = settle(index, engine, users, f"m_{loser}", "AWAY")
+        assert [payout for _, payout in decided] == [0] * len(users)
+        assert index._legs == {}  # the remaining legs were dropped from the index
+        for i in range(loser + 1, legs):
+            assert settle(index, engine, users, f"m_{i}", "HOME") == ([], [])
+        for user in users.values():
+            assert user["balance"] == 1000 - STAKE
+            assert user["stats"]["bets_lost"] == 1 and user["stats"]["lost"] == STAKE
+
+@pytest.mark.parametrize("legs", [2, 3, 5])
+def test_index_rebuilds_from_saved_state(legs):
+    users, matchups, index, engine = setup(legs)
+    settle(index, engine, users, "m_0", "HOME")
+    # Round-trip through JSON the way load_data does, then rebuild the index from scratch
+    saved = json.loads(json.dumps({"users": users, "matchups": matchups}, default=encode))
+    users, matchups = decode_state(saved["users"], saved["matchups"])
+    rebuilt = ParlayIndex()
+    rebuilt.rebuild(users)
+    assert set(rebuilt._legs) == {f"m_{i}" for i in range(1, legs)}
+    assert all(len(entries) == len(users) for entries in rebuilt._legs.values())
+
+    engine.get_user = users.__getitem__
+    for i in range(1, legs):
+        decided, _ = settle(rebuilt, engine, users, f"m_{i}", "HOME")
+    assert [payout for _, payout in decided] == [int(STAKE * 2 ** legs)] * len(users)
+    assert rebuilt._legs == {}
+
+def test_parlay_legs_offer_each_matchups_real_sides():
+    from parlay_builder import parlay_sides
+    assert parlay_sides({"type": "spread", "home": "Hawks", "away": "Owls"}) == ["Hawks", "Owls"]
+    assert parlay_sides({"type": "overunder", "home": "Hawks", "away": "Owls"}) == ["OVER", "UNDER"]
+    assert parlay_sides({"type": "prop", "prop_type": "choice", "options": ["Red", "Blue", "Green"]}) == ["Red", "Blue", "Green"]
+    # Nothing to pick from a menu, so these can't be legs
+    assert parlay_sides({"type": "prop", "prop_type": "choice"}) is None
+    assert parlay_sides({"type": "prop", "prop_type": "numeric"}) is None
+    assert parlay_sides({"type": "spread"}) is None
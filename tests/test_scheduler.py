@@ -0,0 +1,83 @@
+import asyncio, random
+
+from scheduler import LockScheduler
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.now
+
+async def settle_loop():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def advance(scheduler, clock, now):
+    """Move the fake clock and let the sleeping task notice, as a timeout expiring would."""
+    clock.now = now
+    scheduler._wakeup.set()
+    await settle_loop()
+
+def test_due_deadlines_lock_in_order_skipping_cancelled_and_rescheduled():
+    rng = random.Random(15)
+    deadlines = {f"m_{i}": rng.uniform(1, 10_000) for i in range(10_000)}
+    cancelled = set(rng.sample(sorted(deadlines), 1000))
+    moved = {mid: deadlines[mid] + 5_000 for mid in rng.sample(sorted(set(deadlines) - cancelled), 1000)}
+    expected = {**{mid: d for mid, d in deadlines.items() if mid not in cancelled}, **moved}
+
+    async def run():
+        clock = FakeClock()
+        locked = []
+
+        async def on_due(mid):
+            locked.append((clock.now, mid))
+
+        scheduler = LockScheduler(on_due, clock=clock)
+        scheduler.rebuild(deadlines)
+        task = scheduler.start()
+        await settle_loop()
+        for mid in cancelled:
+            scheduler.cancel(mid)
+        for mid, deadline in moved.items():
+            scheduler.schedule(mid, deadline)
+        for now in range(0, 16_000, 250):
+            await advance(scheduler, clock, now)
+            # Every deadline reached is locked by now, and none before its time
+            assert len(locked) == sum(1 for deadline in expected.values() if deadline <= now)
+        assert all(expected[mid] <= at for at, mid in locked)
+        task.cancel()
+        return locked, scheduler
+
+    locked, scheduler = asyncio.run(run())
+    assert [mid for _, mid in locked] == sorted(expected, key=expected.get)
+    assert len(scheduler) == 0
+
+def test_idle_scheduler_does_not_poll_the_clock():
+    async def run():
+        clock = FakeClock()
+        due = []
+
+        async def on_due(mid):
+            due.append(mid)
+
+        scheduler = LockScheduler(on_due, clock=clock)
+        task = scheduler.start()
+        await settle_loop()
+        idle_calls = clock.calls
+        await asyncio.sleep(0.05)
+        assert clock.calls == idle_calls  # nothing scheduled: no wakeups at all
+
+        scheduler.schedule("m_far", 1_000_000)  # fake seconds away, so effectively forever
+        await settle_loop()
+        sleeping_calls = clock.calls
+        await asyncio.sleep(0.05)
+        assert clock.calls == sleeping_calls and due == []
+
+        await advance(scheduler, clock, 1_000_000)
+        assert due == ["m_far"]
+        task.cancel()
+
+    asyncio.run(run())
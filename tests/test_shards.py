@@ -0,0 +1,109 @@
+import asyncio, json, os, signal, socket, subprocess, sys, time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import shardlink
+from coordinator import migrate_root_state, shard_dir, shard_of
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOME_GUILD = 1401259843834216000
+
+def legacy_state(directory):
+    """users.json and matchups.json as a single-process deployment from before the guild split left them."""
+    with open(os.path.join(directory, "users.json"), "w") as f:
+        json.dump({"111": {"balance": 525, "bets": {}, "history": [], "achievements": [], "last_claim": None,
+                           "stats": {"spent": 25, "won": 0, "lost": 0, "bets_won": 0, "bets_lost": 0}}}, f)
+    with open(os.path.join(directory, "matchups.json"), "w") as f:
+        json.dump({"m_1": {"id": "m_1", "type": "spread", "title": "Hawks vs Owls", "home": "Hawks", "away": "Owls",
+                           "spread": -3.5, "bets": {}, "locked": False, "settled": False, "result": None}}, f)
+
+def test_root_state_moves_into_the_home_guilds_shard(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy_state(tmp_path)
+    os.makedirs("history")
+    assert sorted(migrate_root_state(4, HOME_GUILD)) == ["history", "matchups.json", "users.json"]
+    home = shard_dir(shard_of(HOME_GUILD, 4))
+    assert sorted(os.listdir(home)) == ["history", "matchups.json", "users.json"]
+    assert not os.path.exists("users.json")
+    assert migrate_root_state(4, HOME_GUILD) == []  # nothing left to move on the next start
+
+def test_root_state_without_a_home_guild_refuses_to_start(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy_state(tmp_path)
+    with pytest.raises(SystemExit, match="HOME_GUILD_ID"):
+        migrate_root_state(4, None)
+    os.makedirs(shard_dir(shard_of(HOME_GUILD, 4)))
+    with open(os.path.join(shard_dir(shard_of(HOME_GUILD, 4)), "users.json"), "w") as f:
+        f.write("{}")
+    with pytest.raises(SystemExit, match="users.json"):
+        migrate_root_state(4, HOME_GUILD)
+    assert sorted(os.listdir(tmp_path)) == ["matchups.json", "shards", "users.json"]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def until_ready(path, shards, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            peer = await shardlink.connect(path, {})
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        try:
+            stats = await peer.request("broadcast", {"method": "stats"})
+        finally:
+            peer.close()
+        if len(stats) == shards and all(s.get("ready") for s in stats.values()):
+            return stats
+        await asyncio.sleep(0.2)
+    raise TimeoutError("shards never became ready")
+
+async def ask(path, method, params):
+    peer = await shardlink.connect(path, {})
+    try:
+        return await peer.request(method, params)
+    finally:
+        peer.close()
+
+def test_shard_processes_serve_migrated_state_through_the_coordinator(tmp_path):
+    pytest.importorskip("discord")
+    legacy_state(tmp_path)
+    sock = str(tmp_path / "coordinator.sock")
+    env = {**os.environ, "COORDINATOR_SOCKET": sock, "HOME_GUILD_ID": str(HOME_GUILD), "GITHUB_REPO": "",
+           "GITHUB_TOKEN": "", "PYTHONPATH": ROOT}
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "coordinator.py"), "--shards", "2", "--stub",
+                             "--port", str(free_port())], cwd=tmp_path, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        stats = asyncio.run(until_ready(sock, 2))
+        home = shard_of(HOME_GUILD, 2)
+        assert {int(shard): s["users"] for shard, s in stats.items()} == {home: 1, 1 - home: 0}
+        assert {int(shard): s["matchups"] for shard, s in stats.items()} == {home: 1, 1 - home: 0}
+        top = asyncio.run(ask(sock, "global_top", {"category": "balance", "k": 10}))
+        assert [row[:3] for row in top] == [[home, "111", 525]]
+    finally:
+        proc.send_signal(signal.SIGINT)
+        output = proc.communicate(timeout=60)[0]
+    assert proc.returncode == 0, output
+    assert not os.path.exists(tmp_path / "users.json")
+    with open(tmp_path / shard_dir(home) / "users.json") as f:
+        assert json.load(f)["111"]["balance"] == 525
+
+def guild(gid, joined):
+    return SimpleNamespace(id=gid, name=f"Guild {gid}", me=SimpleNamespace(joined_at=datetime(2025, 1, joined, tzinfo=timezone.utc)))
+
+def test_the_guild_joined_first_keeps_the_legacy_accounts(monkeypatch):
+    main = pytest.importorskip("main")
+    older, newer = guild(900, 1), guild(100, 20)
+    assert main.first_joined([newer, older]) is older
+    assert main.first_joined([]) is None
+
+    monkeypatch.setattr(main, "HOME_GUILD_ID", older.id)
+    assert main.member_key(older, 111) == "111"  # the account stored before the split
+    assert main.member_key(None, 111) == "111"  # DMs reach it too
+    assert main.member_key(newer, 111) == "100:111"
@@ -0,0 +1,61 @@
+import asyncio, json
+
+import pytest
+
+from slate import parse_slate
+
+NOW = 1_750_000_000
+
+def test_every_row_is_checked_before_anything_is_created():
+    entries, errors = parse_slate([
+        {"type": "spread", "title": "Hawks vs Owls", "home": "Hawks", "away": "Owls", "spread": "-3.5", "start_time": NOW + 60},
+        {"type": "prop", "title": "MVP?", "options": "Ana|Bo|Cy"},
+        {"type": "prop", "title": "Total points?", "prop_type": "numeric", "options": ["1", "2"]},
+        {"type": "prop", "title": "Coin toss?", "options": ["Heads"]},
+        {"type": "spread", "title": "", "spread": "lots", "start_time": NOW - 60},
+    ], now=NOW)
+    assert entries[1]["options"] == ["Ana", "Bo", "Cy"]
+    assert errors == ["Row 3: options only apply to choice props",
+                      "Row 4: a choice prop needs at least 2 options",
+                      "Row 5: missing title", "Row 5: spread must be a number", "Row 5: start_time is in the past"]
+
+@pytest.fixture
+def bot(tmp_path):
+    main = pytest.importorskip("main")
+    import loadsim
+    loadsim.install({}, {}, str(tmp_path))
+    yield main, loadsim
+    main.archive.close()
+
+def attach(loadsim, name, rows):
+    admin = loadsim.FakeMember("1", administrator=True)
+    return loadsim.FakeContext(loadsim.FakeGuild(loadsim.FakeChannel()), admin,
+                               [loadsim.FakeAttachment(name, json.dumps(rows).encode())])
+
+def test_imported_choice_props_are_parlay_legs_on_their_options(bot):
+    main, loadsim = bot
+    asyncio.run(main.import_slate(attach(loadsim, "slate.json", [
+        {"type": "spread", "title": "Hawks vs Owls", "home": "Hawks", "away": "Owls", "spread": -3.5},
+        {"type": "prop", "title": "MVP?", "options": ["Ana", "Bo", "Cy"]},
+        {"type": "prop", "title": "Total points?", "prop_type": "numeric"},
+    ])))
+    by_title = {m["title"]: m for m in main.MATCHUPS.values()}
+    game, mvp, total = by_title["Hawks vs Owls"], by_title["MVP?"], by_title["Total points?"]
+    assert [m["id"] for m in main.catalog.open() if main.parlay_sides(m)] == [game["id"], mvp["id"]]
+
+    main.USERS["7"] = main.User.from_json({"balance": 1000, "bets": {}, "history": [], "stats": {}})
+    place = lambda picks: asyncio.run(main.place_parlay("7", picks, 100))
+    assert place([(game["id"], "Hawks"), (mvp["id"], "Option1")]).startswith("❌ Pick one of Ana, Bo, Cy")
+    assert place([(game["id"], "Hawks"), (total["id"], "30")]).startswith("❌ Total points? can't be a parlay leg")
+    assert main.USERS["7"]["balance"] == 1000
+    assert not isinstance(place([(game["id"], "Hawks"), (mvp["id"], "bo")]), str)
+    assert main.USERS["7"]["balance"] == 900
+
+    # A result that isn't one of the options is refused for the whole file
+    asyncio.run(main.import_results(attach(loadsim, "results.json", [
+        {"matchup_id": game["id"], "result": "Hawks"}, {"matchup_id": mvp["id"], "result": "Dee"}])))
+    assert not game["settled"] and not mvp["settled"]
+    asyncio.run(main.import_results(attach(loadsim, "results.json", [
+        {"matchup_id": game["id"], "result": "Hawks"}, {"matchup_id": mvp["id"], "result": "Bo"}])))
+    assert game["settled"] and mvp["settled"]
+    assert main.USERS["7"]["balance"] > 900  # both legs won
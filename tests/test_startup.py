@@ -0,0 +1,64 @@
+import json, os, random, subprocess, sys
+
+import pytest
+
+from health import create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_bot(code, data_dir):
+    """Run ``code`` after importing main in a fresh interpreter with its state in ``data_dir``; returns its JSON output."""
+    pytest.importorskip("discord")
+    env = {**os.environ, "DATA_DIR": str(data_dir), "GITHUB_REPO": "", "GITHUB_TOKEN": "", "PYTHONPATH": ROOT}
+    script = f"import json, time\nstarted = time.perf_counter()\nimport main\n{code}"
+    out = subprocess.run([sys.executable, "-c", script], env=env, cwd=str(data_dir), capture_output=True, text=True, timeout=300)
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def write_state(data_dir, n_users, bets_per_user, rng):
+    matchups = {f"m_{i}": {"id": f"m_{i}", "type": "spread", "title": f"Game {i}", "home": "Hawks", "away": "Owls",
+                           "spread": -3.5, "bets": {}, "locked": False, "settled": False, "result": None} for i in range(200)}
+    users = {}
+    for u in range(n_users):
+        uid = str(10**17 + u)
+        bets = {}
+        for b in range(bets_per_user):
+            mid = f"m_{rng.randrange(200)}"
+            bet = {"id": f"b_{u}_{b}", "user_id": uid, "matchup_id": mid, "kind": "spread",
+                   "selection": rng.choice(["HAWKS", "OWLS"]), "amount": rng.randint(1, 500), "odds": 1.9,
+                   "placed_at": "2025-09-06T12:00:00", "resolved": False, "payout": None}
+            bets[bet["id"]] = matchups[mid]["bets"][bet["id"]] = bet
+        users[uid] = {"balance": 500, "bets": bets, "history": [], "achievements": [], "last_claim": None,
+                      "stats": {"spent": 0, "won": 0, "lost": 0, "bets_won": 0, "bets_lost": 0}}
+    with open(os.path.join(data_dir, "users.json"), "w") as f:
+        json.dump(users, f)
+    with open(os.path.join(data_dir, "matchups.json"), "w") as f:
+        json.dump(matchups, f)
+
+def test_importing_main_reads_and_starts_nothing(tmp_path):
+    result = run_bot("import threading\n"
+                     "print(json.dumps({'seconds': time.perf_counter() - started, 'threads': threading.active_count(),\n"
+                     "                  'users': len(main.USERS), 'ready': main.STARTUP['ready']}))", tmp_path)
+    assert result["threads"] == 1 and result["users"] == 0 and not result["ready"]
+    assert os.listdir(tmp_path) == []
+
+def test_health_answers_503_until_ready():
+    status = {"ready": False, "users": 0}
+    client = create_app(lambda: status).test_client()
+    assert client.get("/").status_code == 200
+    assert client.get("/health").status_code == 503
+    status.update(ready=True, users=5)
+    response = client.get("/health")
+    assert response.status_code == 200 and response.get_json() == {"ready": True, "users": 5}
+
+def test_loading_a_large_state(tmp_path):
+    n_users, bets_per_user = 20_000, 5
+    write_state(tmp_path, n_users, bets_per_user, random.Random(18))
+    result = run_bot("started = time.perf_counter()\n"
+                     "main.load_data()\n"
+                     "print(json.dumps({'seconds': time.perf_counter() - started, 'users': len(main.USERS),\n"
+                     "                  'matchups': len(main.MATCHUPS), 'open': len(main.catalog.open()),\n"
+                     "                  'leaderboard': len(main.rankings)}))", tmp_path)
+    assert (result["users"], result["matchups"], result["open"], result["leaderboard"]) == (n_users, 200, 200, n_users)
+    # Loose on purpose; in practice 100k bets load in a few seconds
+    assert result["seconds"] < 60, f"loading {n_users * bets_per_user} bets took {result['seconds']:.1f}s"
@@ -0,0 +1,65 @@
+import random, time
+
+from odds import LegacyOdds
+from volume import VolumeIndex
+
+def matchup(mid, bets):
+    return {"id": mid, "type": "spread", "home": "Hawks", "away": "Owls", "bets": {bet["id"]: bet for bet in bets}}
+
+def random_bets(rng, mid, n):
+    return [{"id": f"b_{mid}_{i}", "kind": rng.choice(["spread", "overunder"]),
+             "selection": rng.choice(["Hawks", "hawks", "Owls", "OVER", "under"]), "amount": rng.randint(1, 500)}
+            for i in range(n)]
+
+def test_running_totals_match_a_rebuild_after_adds_and_removes():
+    rng = random.Random(6)
+    matchups = {f"m_{i}": matchup(f"m_{i}", []) for i in range(20)}
+    volumes = VolumeIndex()
+    for step in range(20_000):
+        mid = rng.choice(sorted(matchups))
+        bets = matchups[mid]["bets"]
+        if bets and rng.random() < 0.3:
+            bet = bets.pop(rng.choice(sorted(bets)))
+            volumes.remove(mid, bet)
+        else:
+            bet = random_bets(rng, mid, 1)[0]
+            bet["id"] = f"b_{step}"
+            bets[bet["id"]] = bet
+            volumes.add(mid, bet)
+    assert volumes.verify(matchups) == []
+
+    fresh = VolumeIndex()
+    fresh.rebuild(matchups)
+    for mid in matchups:
+        assert volumes.total(mid) == fresh.total(mid) == sum(bet["amount"] for bet in matchups[mid]["bets"].values())
+        assert volumes.by_selection(mid) == fresh.by_selection(mid)
+        assert volumes.stakes(mid, "spread") == fresh.stakes(mid, "spread")
+
+def test_verify_reports_drifted_matchups():
+    rng = random.Random(7)
+    matchups = {mid: matchup(mid, random_bets(rng, mid, 50)) for mid in ("m_1", "m_2", "m_3")}
+    volumes = VolumeIndex()
+    volumes.rebuild(matchups)
+    assert volumes.verify(matchups) == []
+
+    matchups["m_2"]["bets"]["b_m_2_0"]["amount"] += 1  # changed without going through the index
+    volumes.add("m_4", {"id": "b_x", "kind": "spread", "selection": "Hawks", "amount": 5})  # no such matchup
+    assert volumes.verify(matchups) == ["m_2", "m_4"]
+
+def quote_seconds(n_bets, quotes=2000):
+    volumes = VolumeIndex()
+    game = matchup("m_1", random_bets(random.Random(n_bets), "m_1", n_bets))
+    volumes.rebuild({"m_1": game})
+    engine = LegacyOdds()
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(quotes):
+            engine.table(game, volumes)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def test_quote_latency_stays_flat_as_bets_grow():
+    # Loose on purpose: a rescan would be ~1000x slower at 100k bets than at 100
+    small, large = quote_seconds(100), quote_seconds(100_000)
+    assert large < 3 * small + 0.01, f"100 bets: {small * 1e6 / 2000:.1f}µs/quote, 100k bets: {large * 1e6 / 2000:.1f}µs/quote"
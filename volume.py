@@ -0,0 +1,76 @@
+# volume.py
+
+class VolumeIndex:
+    """Running stake totals per matchup so odds quotes never rescan the bets.
+
+    For each matchup it keeps the overall total, the total per selection (as
+    displayed by ``!volume``) and the total per bet kind and upper-cased
+    selection (what the odds formula reads). ``add``/``remove`` are O(1);
+    ``rebuild`` recomputes everything from the stored bets after a load.
+    Every change stamps the matchup with a new ``version`` so cached quotes
+    know when to reprice.
+    """
+
+    def __init__(self):
+        self._volumes = {}
+        self._changes = 0  # never reset, so versions stay unique across rebuilds
+
+    def add(self, matchup_id, bet, sign=1):
+        vol = self._volumes.get(matchup_id)
+        if vol is None:
+            vol = self._volumes[matchup_id] = {"total": 0, "by_selection": {}, "by_kind": {}}
+        self._changes += 1
+        vol["version"] = self._changes
+        amount = bet["amount"] * sign
+        vol["total"] += amount
+        by_sel = vol["by_selection"]
+        by_sel[bet["selection"]] = by_sel.get(bet["selection"], 0) + amount
+        by_kind = vol["by_kind"].setdefault(bet["kind"], {})
+        key = str(bet["selection"]).upper()
+        by_kind[key] = by_kind.get(key, 0) + amount
+
+    def remove(self, matchup_id, bet):
+        self.add(matchup_id, bet, sign=-1)
+
+    def discard(self, matchup_id):
+        self._volumes.pop(matchup_id, None)
+
+    def version(self, matchup_id):
+        return self._volumes.get(matchup_id, {}).get("version", 0)
+
+    def total(self, matchup_id):
+        return self._volumes.get(matchup_id, {}).get("total", 0)
+
+    def by_selection(self, matchup_id):
+        """Stake per selection, skipping selections whose bets were all removed."""
+        return {sel: amt for sel, amt in self._volumes.get(matchup_id, {}).get("by_selection", {}).items() if amt}
+
+    def staked(self, matchup_id, kind, selection):
+        """Stake on one selection for one bet kind (selection compared case-insensitively)."""
+        vol = self._volumes.get(matchup_id)
+        if not vol or selection is None:
+            return 0
+        return vol["by_kind"].get(kind, {}).get(str(selection).upper(), 0)
+
+    def stakes(self, matchup_id, kind):
+        """``{SELECTION: stake}`` for one bet kind."""
+        vol = self._volumes.get(matchup_id)
+        return dict(vol["by_kind"].get(kind, {})) if vol else {}
+
+    def rebuild(self, matchups):
+        self._volumes = {}
+        for mid, matchup in matchups.items():
+            for bet in matchup.get("bets", {}).values():
+                self.add(mid, bet)
+
+    def verify(self, matchups):
+        """Return the ids of matchups whose running totals disagree with their stored bets."""
+        fresh = VolumeIndex()
+        fresh.rebuild(matchups)
+        return sorted(mid for mid in set(self._volumes) | set(fresh._volumes)
+                      if self._summary(mid) != fresh._summary(mid))
+
+    def _summary(self, matchup_id):
+        vol = self._volumes.get(matchup_id, {"total": 0, "by_kind": {}})
+        by_kind = {kind: {sel: amt for sel, amt in sels.items() if amt} for kind, sels in vol["by_kind"].items()}
+        return vol["total"], self.by_selection(matchup_id), {kind: sels for kind, sels in by_kind.items() if sels}